@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Asyncio product pipeline for mainZ
+Keeps several products in flight at once. Each external service (OpenAI, Shopify,
+Google Trends) gets its own concurrency cap instead of fixed sleeps between products.
+"""
+
+import asyncio
+import logging
+import time
+
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+import mainZ
+import metrics
+from image_cache import get_image_cache
+from shopify_client import AsyncShopifyClient
+
+# Default per-service caps. Trends is the strictest: pytrends is blocking and
+# Google throttles aggressively, so it runs one request at a time in a thread.
+DEFAULT_OPENAI_CONCURRENCY = 8
+DEFAULT_SHOPIFY_CONCURRENCY = 2
+DEFAULT_TRENDS_CONCURRENCY = 1
+
+
+class ServiceLimits:
+    """One semaphore per external service"""
+    def __init__(self, openai=DEFAULT_OPENAI_CONCURRENCY, shopify=DEFAULT_SHOPIFY_CONCURRENCY,
+                 trends=DEFAULT_TRENDS_CONCURRENCY):
+        self.openai = asyncio.Semaphore(openai)
+        self.shopify = asyncio.Semaphore(shopify)
+        self.trends = asyncio.Semaphore(trends)
+
+
+async def describe_image_async(aclient, limits, url):
+    """Async version of mainZ.describe_image; cache lookups (which download the image) run in a thread"""
+    analysis, fp = await asyncio.to_thread(get_image_cache().lookup, url)
+    if analysis is None:
+        async with limits.openai:
+            resp = await aclient.chat.completions.create(**mainZ.image_request(url))
+        analysis = resp.choices[0].message.content
+        if analysis:
+            await asyncio.to_thread(get_image_cache().store, url, fp, analysis)
+    return analysis
+
+
+async def analyze_images_async(aclient, limits, keyword, urls):
+    """Async version of mainZ.analyze_images"""
+    results = await asyncio.gather(
+        *(describe_image_async(aclient, limits, url) for url in mainZ.image_urls(urls)),
+        return_exceptions=True
+    )
+    analyses = [r for r in results if isinstance(r, str) and r]
+    if analyses:
+        return mainZ.assemble_image_analysis(keyword, analyses)
+    try:
+        async with limits.openai:
+            resp = await aclient.chat.completions.create(**mainZ.text_analysis_request(keyword, urls))
+        return resp.choices[0].message.content
+    except Exception:
+        return f"Billedanalyse ikke tilgængelig for {keyword}."
+
+
+async def get_keywords_data_async(limits, keyword, use_trends, region, language):
+    """Run the blocking Trends lookup in a worker thread under the Trends cap"""
+    if not use_trends:
+        return mainZ.get_keywords_data(keyword, False, region, language)
+    # The Trends stage is timed inside get_keywords_data; waiting for the cap is not part of it
+    async with limits.trends:
+        return await asyncio.to_thread(mainZ.get_keywords_data, keyword, True, region, language)
+
+
+async def stream_content_async(aclient, limits, request, keywords_data):
+    """Async version of mainZ.stream_content"""
+    for _ in range(mainZ.STREAM_ATTEMPTS):
+        async with limits.openai:
+            tracker = mainZ.ContentStream()
+            error = None
+            with metrics.timer('generation'):
+                stream = await aclient.chat.completions.create(**request, stream=True, stream_options={'include_usage': True})
+                try:
+                    async for chunk in stream:
+                        tracker.add(chunk)
+                except ValueError as e:
+                    await stream.close()
+                    error = e
+            if error:
+                tracker.finish(keywords_data, error)
+                continue
+        return tracker.finish(keywords_data)
+    return {}
+
+
+async def request_content_async(aclient, limits, request, keywords_data):
+    """Async version of mainZ.request_content"""
+    if mainZ.STREAM_GENERATION:
+        return await stream_content_async(aclient, limits, request, keywords_data)
+    async with limits.openai:
+        with metrics.timer('generation'):
+            resp = await aclient.chat.completions.create(**request)
+    mainZ.record_prompt_usage(resp.usage)
+    return mainZ.parse_smart_content(resp.choices[0].message.content, keywords_data)
+
+
+async def generate_smart_content_async(aclient, limits, keywords_data, analysis, product):
+    """Async version of mainZ.generate_content"""
+    prompt = mainZ.build_content_prompt(keywords_data, analysis, product)
+    try:
+        return await request_content_async(aclient, limits, mainZ.content_request(prompt), keywords_data)
+    except Exception as e:
+        logging.error(f"❌ ChatGPT content generation failed: {e}")
+        return {}
+
+
+async def generate_fused_content_async(aclient, limits, keywords_data, urls, product):
+    """Async version of mainZ.generate_fused_content"""
+    prompt = mainZ.build_content_prompt(keywords_data, mainZ.FUSED_IMAGE_NOTE, product)
+    try:
+        return await request_content_async(aclient, limits, mainZ.fused_content_request(prompt, urls), keywords_data)
+    except Exception as e:
+        logging.warning(f"⚠️ Fused content generation failed: {e}")
+        return {}
+
+
+async def update_product_async(shopify, limits, prod, data, selected_fields):
+    """Async version of mainZ.update_product; pacing and retries come from the shared Shopify bucket"""
+    payload = mainZ.build_update_payload(prod, data, selected_fields)
+    async with limits.shopify:
+        with metrics.timer('update'):
+            r = await shopify.put(f"products/{prod['id']}.json", json=payload)
+    r.raise_for_status()
+    return True
+
+
+async def optimize_product_async(aclient, shopify, limits, prod, selected_fields, use_trends=True,
+                                 region='DK', language='da-DK', apply=None):
+    """Async version of mainZ.optimize_product"""
+    kw = mainZ.extract_keyword(prod.get('title',''))
+    imgs = '\n'.join([i['src'] for i in prod.get('images',[])[:3]])
+    keywords_data = await get_keywords_data_async(limits, kw, use_trends, region, language)
+    fingerprint = mainZ.content_fingerprint(keywords_data, prod, imgs, selected_fields)
+    content = await asyncio.to_thread(mainZ.get_cached_content, fingerprint)
+    if content:
+        logging.info(f"♻️ Reusing generated content for product {prod['id']} (inputs unchanged)")
+    else:
+        if mainZ.FUSED_GENERATION and mainZ.image_urls(imgs):
+            content = await generate_fused_content_async(aclient, limits, keywords_data, imgs, prod)
+            if not content:
+                logging.info("↩️ Falling back to separate image analysis and content generation")
+        if not content:
+            with metrics.timer('image_analysis'):
+                analysis = await analyze_images_async(aclient, limits, kw, imgs)
+            content = await generate_smart_content_async(aclient, limits, keywords_data, analysis, prod)
+        await asyncio.to_thread(mainZ.store_content, fingerprint, content)
+    if not content:
+        return False
+    if apply:
+        # apply can block (a bulk collector submits a full file and waits for the mutation)
+        return await asyncio.to_thread(apply, prod, content, selected_fields)
+    return await update_product_async(shopify, limits, prod, content, selected_fields)
+
+
+async def count_openai_request(request):
+    """Request hook of the async OpenAI client (httpx awaits async clients' hooks)"""
+    metrics.count_openai_request(request)
+
+
+async def run_pipeline(products, selected_fields, use_trends=True, region='DK', language='da-DK',
+                       concurrency=4, openai_concurrency=DEFAULT_OPENAI_CONCURRENCY,
+                       shopify_concurrency=DEFAULT_SHOPIFY_CONCURRENCY,
+                       trends_concurrency=DEFAULT_TRENDS_CONCURRENCY, apply=None):
+    """Optimize products with up to `concurrency` of them in flight; returns run stats.
+
+    `apply` replaces the Shopify PUT (e.g. to queue updates for a bulk mutation).
+    """
+    limits = ServiceLimits(openai_concurrency, shopify_concurrency, trends_concurrency)
+    stats = {'processed': 0, 'successful': 0, 'failed': 0, 'latencies': []}
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    started = time.monotonic()
+
+    async def producer():
+        # Products may be a lazy page-by-page iterator; pull it off the event loop
+        products_iter = iter(products)
+        idx = 0
+        while True:
+            prod = await asyncio.to_thread(next, products_iter, None)
+            if prod is None:
+                break
+            idx += 1
+            await queue.put((idx, prod))
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def worker(aclient, shopify):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            idx, prod = item
+            logging.info(f"Processing {idx}: {prod['id']} - {prod.get('title', 'No title')[:50]}...")
+            t0 = time.monotonic()
+            try:
+                ok = await optimize_product_async(aclient, shopify, limits, prod, selected_fields,
+                                                  use_trends, region, language, apply)
+            except Exception as e:
+                ok = False
+                logging.error(f"❌ Error processing product {prod['id']}: {e}")
+            else:
+                if ok:
+                    logging.info(f"✅ Successfully updated product {prod['id']}")
+                else:
+                    logging.warning(f"❌ Failed to update product {prod['id']}")
+            stats['processed'] += 1
+            stats['successful' if ok else 'failed'] += 1
+            metrics.inc(metrics.PRODUCTS, result='success' if ok else 'failed')
+            stats['latencies'].append(time.monotonic() - t0)
+
+    aclient = AsyncOpenAI(api_key=mainZ.API, http_client=DefaultAsyncHttpxClient(
+        event_hooks={'request': [count_openai_request]}))
+    shopify = AsyncShopifyClient(mainZ.get_shopify(), max_connections=shopify_concurrency)
+    try:
+        await asyncio.gather(producer(), *(worker(aclient, shopify) for _ in range(concurrency)))
+    finally:
+        await shopify.aclose()
+        await aclient.close()
+
+    stats['elapsed'] = time.monotonic() - started
+    stats['products_per_minute'] = stats['processed'] / stats['elapsed'] * 60 if stats['elapsed'] else 0
+    return stats
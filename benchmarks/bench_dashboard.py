@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Load test: dashboard requests against the production server
+Seeds a job database with a finished job (products, keyword analyses, log lines), starts
+gunicorn (wsgi:app) with 1, 2 and 4 web processes in turn and hammers /api/status,
+/api/logs and /api/get-product-history from several client processes. Reports requests
+per second and latency for each worker count; throughput should grow with the workers
+up to the number of CPU cores.
+
+    python benchmarks/bench_dashboard.py --workers 1 2 4 --seconds 10
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from job_store import JobStore
+
+WORDS = ['køkken', 'kage', 'skraber', 'kaffe', 'maskine', 'baby', 'have', 'plante', 'lampe', 'led',
+         'opbevaring', 'boks', 'holder', 'telefon', 'silikone', 'stol', 'kontor', 'gaming', 'mus', 'te']
+TYPES = ['', 'Køkkenredskaber', 'Baby & Børn', 'Have', 'Belysning', 'Kontor', 'Gaming']
+
+
+def seed(path, products):
+    """A finished job with products keyword analyses and a full log; returns the job id"""
+    store = JobStore(path)
+    job_id = store.create_job({'fields': ['title', 'body_html'], 'limit': None, 'skip_trends': False})
+    store.start_job(job_id)
+    rng = random.Random(7)
+    for i in range(products):
+        title = ' '.join(rng.sample(WORDS, 3)).capitalize()
+        store.add_task(job_id, {'id': i, 'title': title, 'product_type': rng.choice(TYPES)}, None)
+    store.discovery_done(job_id, None)
+    while True:
+        task = store.claim_task('bench')
+        if task is None:
+            break
+        keywords = [{'keyword': ' '.join(rng.sample(WORDS, 2)), 'seo_score': {'total_score': rng.uniform(50, 95), 'grade': 'B'}}
+                    for _ in range(10)]
+        keywords.sort(key=lambda k: k['seo_score']['total_score'], reverse=True)
+        store.finish_task(task, {
+            'success': True, 'keyword_count': 10, 'trends_ok': True,
+            'score_sum': sum(k['seo_score']['total_score'] for k in keywords),
+            'keywords': {
+                'product_id': task['product_id'], 'product_title': task['product']['title'], 'keywords': keywords,
+                'total_keywords': 10, 'best_keyword': keywords[0]['keyword'],
+                'best_score': keywords[0]['seo_score']['total_score'], 'avg_score': 70
+            }
+        })
+        store.add_event('log', {'timestamp': '12:00:00', 'message': f'✅ Successfully updated product {task["product_id"]}', 'type': 'success'}, keep=1000)
+    store.finish_job_if_done(job_id)
+    return job_id
+
+
+def client(port, job_id, seconds, threads):
+    """Request loop of one client process; returns the latencies in seconds"""
+    paths = [f'/api/status?job_id={job_id}', '/api/logs?since=0&limit=50',
+             f'/api/get-product-history?job_id={job_id}&per_page=20&page=3']
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.time() + seconds
+
+    def loop():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        mine = []
+        n = 0
+        while time.time() < deadline:
+            start = time.perf_counter()
+            conn.request('GET', paths[n % len(paths)])
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                raise RuntimeError(f'HTTP {response.status}')
+            mine.append(time.perf_counter() - start)
+            n += 1
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+
+    pool = [threading.Thread(target=loop) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return latencies
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/logs?limit=1')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def run(workers, args, env, job_id, port):
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=ROOT, env=dict(env, WEB_WORKERS=str(workers), WEB_BIND=f'127.0.0.1:{port}'),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(port)
+        with ProcessPoolExecutor(args.clients) as pool:
+            futures = [pool.submit(client, port, job_id, args.seconds, args.threads) for _ in range(args.clients)]
+            latencies = sorted(l for future in futures for l in future.result())
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        'workers': workers,
+        'requests_per_second': round(len(latencies) / args.seconds, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=4, help='client processes')
+    parser.add_argument('--threads', type=int, default=8, help='connections per client process')
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--port', type=int, default=5077)
+    args = parser.parse_args()
+
+    try:
+        import gunicorn
+    except ImportError:
+        sys.exit('gunicorn is not installed: pip install gunicorn')
+
+    workdir = tempfile.mkdtemp(prefix='bench_dashboard_')
+    try:
+        env = dict(os.environ, JOB_DB_PATH=os.path.join(workdir, 'jobs.db'),
+                   CACHE_DB_PATH=os.path.join(workdir, 'cache.db'))
+        job_id = seed(env['JOB_DB_PATH'], args.products)
+        print(f"Seeded job {job_id} with {args.products} products; {os.cpu_count()} CPU cores")
+        print(f"{args.clients} client processes x {args.threads} connections, {args.seconds:g}s per run")
+        results = []
+        for workers in args.workers:
+            result = run(workers, args, env, job_id, args.port)
+            results.append(result)
+            print(f"  {workers} web workers: {result['requests_per_second']:>8.1f} req/s  "
+                  f"p50 {result['p50_ms']:.1f} ms  p95 {result['p95_ms']:.1f} ms")
+        print(json.dumps(results))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
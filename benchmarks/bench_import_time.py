@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold import time of mainZ and flask_backend
+Imports each module in fresh interpreters with python -X importtime and reports the
+median cumulative import time, plus which heavy dependencies (openai, pytrends, pandas,
+numpy, httpx) got loaded on the way. With --ref the same is measured for another git
+revision (e.g. --ref HEAD~1), extracted to a temporary directory with git archive.
+
+    python benchmarks/bench_import_time.py --runs 7 --ref HEAD~1
+"""
+
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ['mainZ', 'flask_backend']
+HEAVY = ['openai', 'pytrends', 'pandas', 'numpy', 'httpx', 'requests', 'PIL']
+PROBE = "import sys, {module}; print('loaded:' + ','.join(m for m in {heavy!r} if m in sys.modules))"
+
+
+def import_time(source, module, env):
+    """(cumulative import time in ms, heavy modules loaded) of one cold import"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE.format(module=module, heavy=HEAVY)],
+        cwd=source, env=env, capture_output=True, text=True
+    )
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and line.rsplit('|', 1)[-1].strip() == module:
+            cumulative = int(line.split('|')[1])
+            loaded = [l for l in result.stdout.splitlines() if l.startswith('loaded:')][-1][len('loaded:'):]
+            return cumulative / 1000, loaded
+    raise RuntimeError(f"import {module} failed in {source}:\n{result.stderr[-2000:]}")
+
+
+def measure(source, runs, env):
+    report = {}
+    for module in MODULES:
+        times = []
+        for _ in range(runs):
+            ms, loaded = import_time(source, module, env)
+            times.append(ms)
+        report[module] = (statistics.median(times), loaded)
+    return report
+
+
+def extract(ref, directory):
+    archive = subprocess.run(['git', 'archive', ref], cwd=ROOT, capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--ref', help='git revision to compare against')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench_import_') as workdir:
+        env = dict(os.environ, CACHE_DB_PATH=os.path.join(workdir, 'cache.db'),
+                   JOB_DB_PATH=os.path.join(workdir, 'jobs.db'))
+        # Older revisions refuse to import without credentials; placeholders keep the comparison fair
+        for name in ('SHOPIFY_STORE_NAME', 'SHOPIFY_ADMIN_TOKEN', 'OPENAI_API_KEY'):
+            env.setdefault(name, 'benchmark')
+
+        results = {'working tree': measure(ROOT, args.runs, env)}
+        if args.ref:
+            source = os.path.join(workdir, 'ref')
+            extract(args.ref, source)
+            # Warm the ref's bytecode once so both sides compare imports, not compilation
+            subprocess.run([sys.executable, '-m', 'compileall', '-q', source], env=env)
+            results[args.ref] = measure(source, args.runs, env)
+
+        print(f"Median of {args.runs} cold imports:")
+        for label, report in results.items():
+            for module, (ms, loaded) in report.items():
+                print(f"  {label:>14}  {module:<14} {ms:8.1f} ms   heavy modules: {loaded or 'none'}")
+        if args.ref:
+            for module in MODULES:
+                before, after = results[args.ref][module][0], results['working tree'][module][0]
+                print(f"  {module}: {before / after:.1f}x faster")
+
+        # No credentials at all: importing must still work
+        bare = {k: v for k, v in env.items() if k not in ('SHOPIFY_STORE_NAME', 'SHOPIFY_ADMIN_TOKEN', 'OPENAI_API_KEY')}
+        for module in MODULES:
+            import_time(ROOT, module, bare)
+        print("✅ mainZ and flask_backend import without credentials")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Benchmark: end-to-end optimization throughput against local fake services
+Starts the fake Shopify, OpenAI and Google Trends servers from fake_services.py and runs
+the real pipeline against them in a fresh process per mode, with empty caches:
+
+    cli      mainZ.main(), one product at a time
+    async    mainZ.main() with --concurrency (the async pipeline)
+    backend  a backend optimization job (/api/start, processed by the job worker pool)
+
+Reports products/min, p50/p95 per-product latency and peak RSS per mode, and appends one
+JSON line per benchmark run to --output so results can be compared across commits.
+Trends pacing sleeps (--trends-delay and the spacing between Trends requests) are
+skipped by default so the numbers show the pipeline's own cost; --pacing real keeps them.
+Shopify rate limiting is never skipped: it is part of what is measured.
+
+    python benchmarks/bench_pipeline.py --products 50 --modes cli async backend --openai-latency 0.8
+"""
+
+import argparse
+import json
+import os
+import platform
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fake_services
+
+MODES = ['cli', 'async', 'backend']
+TRENDS_HOST = 'https://trends.google.com/trends'
+
+
+class NoSleep:
+    """Stand-in for the time module whose sleep() returns at once"""
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    @staticmethod
+    def sleep(seconds):
+        pass
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def redirect_trends(base_url):
+    """Point pytrends at the fake Trends endpoints"""
+    import pytrends.request as trends_request
+    trends_request.BASE_TRENDS_URL = f'{base_url}{fake_services.TRENDS_PREFIX}'
+    for name in dir(trends_request.TrendReq):
+        value = getattr(trends_request.TrendReq, name)
+        if name.endswith('_URL') and isinstance(value, str):
+            setattr(trends_request.TrendReq, name, value.replace(TRENDS_HOST, trends_request.BASE_TRENDS_URL))
+
+
+def timed(function, latencies, outcomes):
+    def wrapper(*args, **kwargs):
+        start = time.monotonic()
+        result = None
+        try:
+            result = function(*args, **kwargs)
+            return result
+        finally:
+            latencies.append(time.monotonic() - start)
+            outcomes.append(bool(result))
+    return wrapper
+
+
+def timed_async(function, latencies, outcomes):
+    async def wrapper(*args, **kwargs):
+        start = time.monotonic()
+        result = None
+        try:
+            result = await function(*args, **kwargs)
+            return result
+        finally:
+            latencies.append(time.monotonic() - start)
+            outcomes.append(bool(result))
+    return wrapper
+
+
+def run_cli(config, latencies, outcomes):
+    import mainZ
+    mainZ.optimize_product = timed(mainZ.optimize_product, latencies, outcomes)
+    argv = ['mainZ.py', '--fields', *config['fields'], '--limit', str(config['products']), '--no-content-cache']
+    if config['skip_trends']:
+        argv.append('--skip-trends')
+    if config['pacing'] == 'none':
+        argv += ['--trends-delay', '0']
+    if config['mode'] == 'async':
+        import async_pipeline
+        async_pipeline.optimize_product_async = timed_async(async_pipeline.optimize_product_async, latencies, outcomes)
+        argv += ['--concurrency', str(config['concurrency'])]
+    argv += shlex.split(config['cli_args'])
+    sys.argv = argv
+    start = time.monotonic()
+    mainZ.main()
+    return time.monotonic() - start
+
+
+def run_backend(config, latencies, outcomes):
+    import flask_backend
+    job_workers = flask_backend.get_job_workers()
+    job_workers.process = timed(job_workers.process, latencies, outcomes)
+    job_workers.poll_interval = 0.2
+    job_workers.start()
+    start = time.monotonic()
+    response = flask_backend.app.test_client().post('/api/start', json={
+        'fields': config['fields'], 'limit': config['products'], 'skip_trends': config['skip_trends']
+    }).get_json()
+    if not response.get('success'):
+        raise RuntimeError(response.get('error'))
+    while flask_backend.get_job_store().get_job(response['job_id'])['status'] in ('queued', 'running'):
+        time.sleep(0.1)
+    elapsed = time.monotonic() - start
+    stats = flask_backend.get_job_store().job_stats(response['job_id'])
+    # Task results are dicts: count successes from the store, not from the wrapper
+    outcomes[:] = [True] * stats['successful'] + [False] * stats['failed']
+    return elapsed
+
+
+def child(config):
+    """One benchmark mode, run in this (fresh) process; prints a RESULT line"""
+    if not config['skip_trends']:
+        redirect_trends(config['base_url'])
+    if config['pacing'] == 'none':
+        import mainZ
+        import trends_batch
+        mainZ.time = NoSleep()
+        trends_batch.time = NoSleep()
+
+    latencies, outcomes = [], []
+    runner = run_backend if config['mode'] == 'backend' else run_cli
+    elapsed = runner(config, latencies, outcomes)
+    processed = len(outcomes)
+    result = {
+        'mode': config['mode'],
+        'processed': processed,
+        'successful': sum(outcomes),
+        'elapsed_s': round(elapsed, 2),
+        'products_per_minute': round(processed / elapsed * 60, 1) if elapsed else 0,
+        'latency_p50_s': round(percentile(latencies, 0.5), 3) if latencies else None,
+        'latency_p95_s': round(percentile(latencies, 0.95), 3) if latencies else None,
+        'peak_rss_mb': peak_rss_mb()
+    }
+    print('RESULT:' + json.dumps(result), flush=True)
+
+
+def run_mode(mode, args, workdir):
+    """Fresh fake services, caches and process for one mode; returns its result dict"""
+    server = fake_services.start(**fake_services.options(args))
+    rundir = tempfile.mkdtemp(prefix=f'{mode}_', dir=workdir)
+    env = dict(os.environ,
+               SHOPIFY_STORE_NAME='benchmark.myshopify.com', SHOPIFY_ADMIN_TOKEN='benchmark', OPENAI_API_KEY='benchmark',
+               SHOPIFY_API_BASE=f'{server.base_url}{fake_services.API_PREFIX}', OPENAI_BASE_URL=f'{server.base_url}/v1',
+               CACHE_DB_PATH=os.path.join(rundir, 'cache.db'), JOB_DB_PATH=os.path.join(rundir, 'jobs.db'),
+               CONTENT_CACHE_MODE='off', JOB_WORKERS=str(args.job_workers),
+               PYTHONPATH=os.pathsep.join([ROOT, os.path.dirname(os.path.abspath(__file__))]))
+    config = {'mode': mode, 'base_url': server.base_url, 'products': args.products, 'fields': args.fields,
+              'skip_trends': args.skip_trends, 'pacing': args.pacing, 'concurrency': args.concurrency,
+              'cli_args': args.cli_args}
+    try:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', json.dumps(config)],
+                              cwd=rundir, env=env, capture_output=True, text=True, timeout=args.timeout)
+        lines = [l for l in proc.stdout.splitlines() if l.startswith('RESULT:')]
+        if proc.returncode or not lines:
+            raise RuntimeError(f"{mode} run failed (exit {proc.returncode}):\n{proc.stderr[-3000:]}")
+        if args.verbose:
+            sys.stderr.write(proc.stderr)
+        result = json.loads(lines[-1][len('RESULT:'):])
+        with urllib.request.urlopen(f'{server.base_url}/_stats') as response:
+            result['service_calls'] = json.load(response)
+    finally:
+        server.shutdown()
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == '--child':
+        return child(json.loads(sys.argv[2]))
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--fields', nargs='+', default=['title', 'body_html', 'seo_title', 'seo_description'])
+    parser.add_argument('--skip-trends', action='store_true')
+    parser.add_argument('--pacing', choices=['none', 'real'], default='none',
+                        help='none skips the Trends pacing sleeps (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=4, help='products in flight in async mode')
+    parser.add_argument('--job-workers', type=int, default=4, help='JOB_WORKERS in backend mode')
+    parser.add_argument('--cli-args', default='', help='extra mainZ.py options for cli/async, e.g. "--fused --stream"')
+    parser.add_argument('--output', default='pipeline_benchmark.jsonl', help='results file, one JSON line per run')
+    parser.add_argument('--timeout', type=float, default=1800, help='seconds per mode')
+    parser.add_argument('-v', '--verbose', action='store_true', help='show the pipeline logs')
+    fake_services.add_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"🧪 {args.products} products per mode | OpenAI {args.openai_latency}s, Trends {args.trends_latency}s, "
+          f"Shopify {args.shopify_latency}s | error rate {args.error_rate:.0%} | pacing: {args.pacing}")
+    runs = []
+    with tempfile.TemporaryDirectory(prefix='bench_pipeline_') as workdir:
+        for mode in args.modes:
+            result = run_mode(mode, args, workdir)
+            runs.append(result)
+            p50 = f"{result['latency_p50_s']:.2f}s" if result['latency_p50_s'] is not None else 'n/a'
+            p95 = f"{result['latency_p95_s']:.2f}s" if result['latency_p95_s'] is not None else 'n/a'
+            print(f"  {mode:>8}: {result['products_per_minute']:>7.1f} products/min  "
+                  f"{result['successful']}/{result['processed']} updated  p50 {p50}  p95 {p95}  "
+                  f"peak RSS {result['peak_rss_mb']} MB")
+            trends = result['service_calls'].get('trends', {})
+            if not args.skip_trends and not trends.get('payloads'):
+                print("  ⚠️ No Trends payload reached the fake server, every keyword came from the fallback path "
+                      "(pytrends 4.9.2 needs urllib3<2)")
+
+    record = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'verbose', 'timeout')},
+        'runs': runs
+    }
+    with open(args.output, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    print(f"📝 Results appended to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
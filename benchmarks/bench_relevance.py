@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: keyword relevance scoring per product
+Scores 23 candidate keywords for each product (what /api/analyze-keywords does) three
+ways: the original string-scanning implementation, score_relevance without a product
+context, and score_relevance with one product_context per product. All three must agree.
+
+    python benchmarks/bench_relevance.py --products 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_backend import AdvancedSEOScorer
+from bench_seo_scoring import WORDS, TYPES
+
+CANDIDATES_PER_PRODUCT = 23
+
+
+def original_score_relevance(scorer, keyword, product_title, product_type, related_keywords=None):
+    """score_relevance as it was before product contexts, for comparison"""
+    keyword_lower = keyword.lower()
+    title_lower = product_title.lower()
+    type_lower = (product_type or '').lower()
+    score = 40
+    if keyword_lower in title_lower:
+        score += 35
+    keyword_words = set(keyword_lower.split())
+    title_words = set(title_lower.split())
+    score += min(25, len(keyword_words.intersection(title_words)) * 12)
+    if type_lower and any(word in type_lower for word in keyword_words):
+        score += 20
+    for category, related_terms in scorer.danish_product_terms.items():
+        if category in keyword_lower or category in title_lower:
+            if any(term in keyword_lower or term in title_lower for term in related_terms):
+                score += 15
+                break
+    if related_keywords and len(related_keywords) > 0:
+        score += min(10, len(related_keywords) * 2)
+    if 'køkken' in keyword_lower and any(word in title_lower for word in ['kage', 'mad', 'bagning', 'kaffe']):
+        score += 10
+    elif 'baby' in keyword_lower and any(word in title_lower for word in ['barn', 'lille', 'sikker']):
+        score += 10
+    elif 'have' in keyword_lower and any(word in title_lower for word in ['plante', 'blomst', 'udendørs']):
+        score += 10
+    return min(98, score)
+
+
+def make_products(count, seed=7):
+    rng = random.Random(seed)
+    phrases = [' '.join(rng.choices(WORDS, k=rng.randint(1, 4))) for _ in range(500)]
+    products = []
+    for _ in range(count):
+        title = ' '.join(rng.choices(WORDS, k=rng.randint(3, 8))).title()
+        candidates = [' '.join(title.lower().split()[:n]) for n in (1, 2, 3)]
+        candidates += rng.sample(phrases, CANDIDATES_PER_PRODUCT - len(candidates))
+        products.append((title, rng.choice(TYPES), candidates, candidates[3:]))
+    return products
+
+
+def timed(label, products, score, repeat=3):
+    """Best of repeat runs"""
+    elapsed = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [score(title, product_type, candidates, related) for title, product_type, candidates, related in products]
+        elapsed = min(elapsed, time.perf_counter() - start)
+    calls = len(products) * CANDIDATES_PER_PRODUCT
+    print(f"   {label:<22} {elapsed:.3f}s ({calls / elapsed:,.0f} keywords/s)")
+    return results, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyword relevance scoring microbenchmark")
+    parser.add_argument('--products', type=int, default=2000)
+    args = parser.parse_args()
+
+    scorer = AdvancedSEOScorer()
+    products = make_products(args.products)
+    print(f"📊 {args.products} products x {CANDIDATES_PER_PRODUCT} candidate keywords")
+
+    original, original_time = timed('original', products, lambda title, product_type, candidates, related: [
+        original_score_relevance(scorer, kw, title, product_type, related) for kw in candidates])
+    per_call, _ = timed('without context', products, lambda title, product_type, candidates, related: [
+        scorer.score_relevance(kw, title, product_type, related) for kw in candidates])
+
+    def with_context(title, product_type, candidates, related):
+        context = scorer.product_context(title, product_type)
+        return [scorer.score_relevance(kw, title, product_type, related, context) for kw in candidates]
+    shared, shared_time = timed('with product context', products, with_context)
+
+    print(f"   speedup:               {original_time / shared_time:.1f}x")
+    if not original == per_call == shared:
+        print("❌ Relevance scores differ from the original implementation")
+        sys.exit(1)
+    print("✅ Relevance scores match the original implementation")
+
+
+if __name__ == '__main__':
+    main()
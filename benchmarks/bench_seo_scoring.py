@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: scalar vs vectorized SEO scoring
+Scores the same (keyword, product) pairs with AdvancedSEOScorer.calculate_seo_score in a
+loop and with calculate_seo_scores in one batch, checks every result matches and prints
+the timings.
+
+    python benchmarks/bench_seo_scoring.py --pairs 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from flask_backend import AdvancedSEOScorer, VENDORS
+from seo_batch import score_records
+
+WORDS = ['køkken', 'kage', 'skraber', 'kaffe', 'maskine', 'baby', 'sikker', 'have', 'plante', 'blomst',
+         'lampe', 'led', 'hjem', 'opbevaring', 'boks', 'bil', 'holder', 'telefon', 'silikone', 'sæt',
+         'professionel', 'mini', 'ergonomisk', 'stol', 'kontor', 'gaming', 'mus', 'udendørs', 'bagning', 'te']
+TYPES = ['', 'Køkkenredskaber', 'Baby & Børn', 'Have', 'Belysning', 'Kontor', 'Biltilbehør', 'Gaming']
+
+
+def make_pairs(count, products=2000, keywords=5000, seed=42):
+    rng = random.Random(seed)
+    brands = [b for brand_list in VENDORS.values() for b in brand_list] or ['NordicLiving']
+    catalog = [(' '.join(rng.choices(WORDS, k=rng.randint(2, 6))).title() +
+                (f" {rng.choice(brands)}" if rng.random() < 0.2 else ''), rng.choice(TYPES))
+               for _ in range(products)]
+    phrases = [' '.join(rng.choices(WORDS, k=rng.randint(1, 8))) for _ in range(keywords)]
+    rows = []
+    for _ in range(count):
+        title, product_type = rng.choice(catalog)
+        rows.append({
+            'keyword': rng.choice(phrases) if rng.random() < 0.7 else ' '.join(title.lower().split()[:rng.randint(1, 3)]),
+            'product_title': title,
+            'product_type': product_type,
+            'interest': rng.choice([0, rng.randint(0, 100), round(rng.uniform(0, 100), 2)]),
+            'related_count': rng.randint(0, 8)
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scalar vs vectorized SEO scoring")
+    parser.add_argument('--pairs', type=int, default=100000)
+    args = parser.parse_args()
+
+    scorer = AdvancedSEOScorer()
+    pairs = make_pairs(args.pairs)
+    rows = pairs.to_dict('records')
+
+    start = time.perf_counter()
+    scalar = [scorer.calculate_seo_score(r['keyword'], {'interest': r['interest']}, r['product_title'],
+                                         r['product_type'], ['related'] * r['related_count']) for r in rows]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = scorer.calculate_seo_scores(pairs)
+    batch_time = time.perf_counter() - start
+
+    mismatches = [i for i, (a, b) in enumerate(zip(scalar, score_records(batch))) if a != b]
+    print(f"📊 {len(rows)} pairs")
+    print(f"   scalar:     {scalar_time:.2f}s ({len(rows) / scalar_time:,.0f} pairs/s)")
+    print(f"   vectorized: {batch_time:.2f}s ({len(rows) / batch_time:,.0f} pairs/s)")
+    print(f"   speedup:    {scalar_time / batch_time:.1f}x")
+    if mismatches:
+        i = mismatches[0]
+        print(f"❌ {len(mismatches)} results differ, first at row {i}:\n   {scalar[i]}\n   {score_records(batch.iloc[[i]])[0]}")
+        sys.exit(1)
+    print("✅ Vectorized results match the scalar path exactly")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the Shopify Admin API, the OpenAI chat endpoint and Google Trends
+One threaded HTTP server answers everything the optimizer calls, so the whole pipeline
+can run against it without credentials or network access:
+
+    Shopify   GET  /admin/api/2023-07/products.json      (since_id paging, X-Shopify-Shop-Api-Call-Limit)
+              POST /admin/api/2023-07/graphql.json       (tagged products, cost/throttleStatus)
+              PUT  /admin/api/2023-07/products/{id}.json
+    OpenAI    POST /v1/chat/completions                  (plain and streamed answers)
+    Trends    /trends/...                                (cookie, explore, widgets)
+    Images    GET  /images/{id}-{n}.png                  (a different small PNG per product)
+    Counters  GET  /_stats
+
+Every service has its own latency (seconds, +-25% jitter), error rate (HTTP 500) and
+rate limit (HTTP 429): a leaky bucket for Shopify REST and GraphQL, requests per minute
+for OpenAI and Trends. Run on its own it prints its base URL and serves until stopped:
+
+    python benchmarks/fake_services.py --products 200 --openai-latency 1.5 --error-rate 0.02
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_PREFIX = '/admin/api/2023-07'
+TRENDS_PREFIX = '/trends'
+
+WORDS = ['køkken', 'kage', 'skraber', 'kaffe', 'maskine', 'baby', 'have', 'plante', 'lampe', 'led',
+         'opbevaring', 'boks', 'holder', 'telefon', 'silikone', 'stol', 'kontor', 'gaming', 'mus', 'te',
+         'vandflaske', 'rygsæk', 'pude', 'tæppe', 'spejl', 'ur', 'kabel', 'oplader', 'skål', 'kurv']
+TYPES = ['', 'Køkkenredskaber', 'Baby & Børn', 'Have', 'Belysning', 'Kontor', 'Gaming']
+COLORS = ['Sort', 'Hvid', 'Grå', 'Blå', 'Grøn', 'Rød']
+
+IMAGE_ANSWER = ("Materiale: silikone og rustfrit stål. Form: aflang med afrundede kanter. "
+                "Farver: sort og grå. Størrelse: ca. 25 cm. Funktioner: hæng-øje, skridsikkert greb. "
+                "Brug: daglig brug i køkkenet. Sæt: 1 stk. Kvalitet: solid og let at rengøre.")
+
+
+def product(product_id, image_base):
+    """Deterministic test product in the REST products.json shape"""
+    rng = random.Random(product_id)
+    words = rng.sample(WORDS, 3)
+    colors = rng.sample(COLORS, rng.randint(1, 3))
+    return {
+        'id': product_id,
+        'admin_graphql_api_id': f'gid://shopify/Product/{product_id}',
+        'title': f"{' '.join(words).capitalize()} {rng.choice(['Pro', 'Mini', 'XL', 'Basic'])}",
+        'body_html': f"<p>{' '.join(rng.sample(WORDS, 8))}</p>",
+        'product_type': rng.choice(TYPES),
+        'vendor': 'Demo',
+        'tags': 'needs_update, demo',
+        'created_at': '2024-01-01T00:00:00Z',
+        'published_at': '2024-01-02T00:00:00Z',
+        'images': [{'src': f'{image_base}/images/{product_id}-{n}.png'} for n in range(rng.randint(1, 3))],
+        'options': [{'name': 'Farve', 'values': colors}],
+        'variants': [{
+            'title': color, 'price': f'{rng.randint(49, 499)}.00', 'compare_at_price': None,
+            'sku': f'SKU-{product_id}-{i}', 'barcode': '', 'weight': round(rng.uniform(0.1, 3), 2),
+            'weight_unit': 'kg', 'inventory_quantity': rng.randint(0, 50),
+            'option1': color, 'option2': None, 'option3': None
+        } for i, color in enumerate(colors)]
+    }
+
+
+def graphql_node(prod):
+    """The same product as a node of the optimizer's GraphQL products query"""
+    return {
+        'id': prod['admin_graphql_api_id'], 'title': prod['title'], 'bodyHtml': prod['body_html'],
+        'productType': prod['product_type'], 'vendor': prod['vendor'], 'tags': prod['tags'].split(', '),
+        'createdAt': prod['created_at'], 'publishedAt': prod['published_at'],
+        'images': {'edges': [{'node': {'url': i['src']}} for i in prod['images']]},
+        'options': prod['options'],
+        'variants': {'edges': [{'node': {
+            'title': v['title'], 'price': v['price'], 'compareAtPrice': v['compare_at_price'], 'sku': v['sku'],
+            'barcode': v['barcode'], 'weight': v['weight'], 'weightUnit': 'KILOGRAMS',
+            'inventoryQuantity': v['inventory_quantity'], 'selectedOptions': [{'value': v['option1']}]
+        }} for v in prod['variants']]}
+    }
+
+
+def png(seed, size=16):
+    """Small grayscale PNG with random pixels, so every image gets its own perceptual hash"""
+    rng = random.Random(seed)
+    raw = b''.join(b'\x00' + bytes(rng.randrange(256) for _ in range(size)) for _ in range(size))
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', size, size, 8, 0, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b'')
+
+
+class LeakyBucket:
+    """Shopify-style bucket: requests fill it, it drains at a fixed rate, full means 429"""
+    def __init__(self, size, leak_rate):
+        self.size = size
+        self.leak_rate = leak_rate
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, cost=1):
+        """(accepted, level after the request)"""
+        with self.lock:
+            now = time.monotonic()
+            self.level = max(0.0, self.level - (now - self.updated) * self.leak_rate)
+            self.updated = now
+            if self.level + cost > self.size:
+                return False, self.level
+            self.level += cost
+            return True, self.level
+
+
+class RateWindow:
+    """Requests per minute over a sliding window; rpm 0 means unlimited"""
+    def __init__(self, rpm):
+        self.rpm = rpm
+        self.calls = deque()
+        self.lock = threading.Lock()
+
+    def retry_after(self):
+        """0 when the request is allowed, otherwise seconds until it would be"""
+        if not self.rpm:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            while self.calls and self.calls[0] <= now - 60:
+                self.calls.popleft()
+            if len(self.calls) >= self.rpm:
+                return self.calls[0] + 60 - now
+            self.calls.append(now)
+            return 0
+
+
+class FakeServices:
+    """Configuration, rate limit state and request counters shared by the request handlers"""
+    def __init__(self, products=100, shopify_latency=0.05, openai_latency=0.5, trends_latency=0.3,
+                 image_latency=0.02, error_rate=0.0, shopify_error_rate=None, openai_error_rate=None,
+                 trends_error_rate=None, shopify_bucket=40, shopify_leak=2, graphql_bucket=1000,
+                 graphql_restore=50, openai_rpm=0, trends_rpm=0, stream_chunks=20, seed=1):
+        self.products = products
+        self.latency = {'shopify': shopify_latency, 'openai': openai_latency, 'trends': trends_latency, 'images': image_latency}
+        self.error_rate = {
+            'shopify': error_rate if shopify_error_rate is None else shopify_error_rate,
+            'openai': error_rate if openai_error_rate is None else openai_error_rate,
+            'trends': error_rate if trends_error_rate is None else trends_error_rate,
+            'images': 0.0
+        }
+        self.rest_bucket = LeakyBucket(shopify_bucket, shopify_leak)
+        self.graphql_bucket = LeakyBucket(graphql_bucket, graphql_restore)
+        self.windows = {'openai': RateWindow(openai_rpm), 'trends': RateWindow(trends_rpm)}
+        self.stream_chunks = stream_chunks
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.catalog = {}
+
+    def count(self, service, key):
+        with self.lock:
+            counters = self.stats.setdefault(service, {'requests': 0, 'errors': 0, 'rate_limited': 0})
+            counters[key] = counters.get(key, 0) + 1
+
+    def fails(self, service):
+        with self.lock:
+            return self.rng.random() < self.error_rate[service]
+
+    def wait(self, service):
+        latency = self.latency[service]
+        if latency:
+            with self.lock:
+                jitter = self.rng.uniform(0.75, 1.25)
+            time.sleep(latency * jitter)
+
+    def product(self, product_id, image_base):
+        if product_id not in self.catalog:
+            self.catalog[product_id] = product(product_id, image_base)
+        return self.catalog[product_id]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeServices/1.0'
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    @property
+    def base_url(self):
+        return f'http://{self.server.server_address[0]}:{self.server.server_address[1]}'
+
+    def send(self, status, body=b'', content_type='application/json', headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(raw or b'{}')
+        except ValueError:
+            return {}
+
+    def service(self, path):
+        if path.startswith(API_PREFIX):
+            return 'shopify'
+        if path.startswith('/v1/'):
+            return 'openai'
+        if path.startswith(TRENDS_PREFIX):
+            return 'trends'
+        if path.startswith('/images/'):
+            return 'images'
+        return None
+
+    def dispatch(self, method):
+        url = urlparse(self.path)
+        body = self.read_body() if method in ('POST', 'PUT') else {}
+        if url.path == '/_stats':
+            with self.fake.lock:
+                return self.send(200, self.fake.stats)
+        service = self.service(url.path)
+        if service is None:
+            return self.send(404, {'errors': 'Not Found'})
+        self.fake.count(service, 'requests')
+        self.fake.wait(service)
+        if self.fake.fails(service):
+            self.fake.count(service, 'errors')
+            return self.send(500, {'error': {'message': 'injected failure'}})
+        handler = getattr(self, f'{service}_{method.lower()}', None)
+        if handler is None:
+            return self.send(405, {'error': 'method not allowed'})
+        handler(url, parse_qs(url.query), body)
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    # Shopify
+
+    def rest_limited(self):
+        """Take one request from the REST bucket; answers 429 and returns None when it is full"""
+        ok, level = self.fake.rest_bucket.take()
+        limit = {'X-Shopify-Shop-Api-Call-Limit': f'{math.ceil(level)}/{self.fake.rest_bucket.size}'}
+        if not ok:
+            self.fake.count('shopify', 'rate_limited')
+            self.send(429, {'errors': 'Exceeded 2 calls per second for api client. Reduce request rates to resume uninterrupted service.'},
+                      headers=dict(limit, **{'Retry-After': '1.0'}))
+            return None
+        return limit
+
+    def shopify_get(self, url, query, body):
+        if not url.path.endswith('/products.json'):
+            return self.send(404, {'errors': 'Not Found'})
+        headers = self.rest_limited()
+        if headers is None:
+            return
+        since = int(query.get('since_id', ['0'])[0])
+        limit = int(query.get('limit', ['50'])[0])
+        ids = range(since + 1, min(since + limit, self.fake.products) + 1)
+        self.send(200, {'products': [self.fake.product(i, self.base_url) for i in ids]}, headers=headers)
+
+    def shopify_put(self, url, query, body):
+        match = re.search(r'/products/(\d+)\.json$', url.path)
+        if not match or 'product' not in body:
+            return self.send(404, {'errors': 'Not Found'})
+        headers = self.rest_limited()
+        if headers is None:
+            return
+        self.fake.count('shopify', 'updates')
+        self.send(200, {'product': dict(body['product'], id=int(match.group(1)))}, headers=headers)
+
+    def shopify_post(self, url, query, body):
+        if not url.path.endswith('/graphql.json'):
+            return self.send(404, {'errors': 'Not Found'})
+        variables = body.get('variables') or {}
+        if 'products(' not in body.get('query', ''):
+            return self.send(200, {'errors': [{'message': 'only the products query is supported by the fake'}]})
+        first = int(variables.get('first', 25))
+        cost = 2 + first * 5
+        ok, level = self.fake.graphql_bucket.take(cost)
+        bucket = self.fake.graphql_bucket
+        extensions = {'cost': {'requestedQueryCost': cost, 'actualQueryCost': cost if ok else 0, 'throttleStatus': {
+            'maximumAvailable': float(bucket.size), 'currentlyAvailable': int(bucket.size - level),
+            'restoreRate': float(bucket.leak_rate)}}}
+        if not ok:
+            self.fake.count('shopify', 'rate_limited')
+            return self.send(200, {'errors': [{'message': 'Throttled', 'extensions': {'code': 'THROTTLED'}}],
+                                   'extensions': extensions})
+        after = int(variables.get('after') or 0)
+        ids = range(after + 1, min(after + first, self.fake.products) + 1)
+        edges = [{'cursor': str(i), 'node': graphql_node(self.fake.product(i, self.base_url))} for i in ids]
+        end = after + len(edges)
+        self.send(200, {'data': {'products': {
+            'pageInfo': {'hasNextPage': end < self.fake.products, 'endCursor': str(end)}, 'edges': edges
+        }}, 'extensions': extensions})
+
+    # OpenAI
+
+    def openai_post(self, url, query, body):
+        if not url.path.endswith('/chat/completions'):
+            return self.send(404, {'error': {'message': 'Not Found'}})
+        retry_after = self.fake.windows['openai'].retry_after()
+        if retry_after:
+            self.fake.count('openai', 'rate_limited')
+            return self.send(429, {'error': {'message': 'Rate limit reached', 'type': 'requests', 'code': 'rate_limit_exceeded'}},
+                             headers={'retry-after': f'{retry_after:.1f}'})
+        messages = body.get('messages', [])
+        if messages and messages[0].get('role') == 'system':
+            content = self.content_answer(messages[-1].get('content'))
+        else:
+            content = IMAGE_ANSWER
+        prompt_tokens = len(json.dumps(messages, ensure_ascii=False)) // 4
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(content) // 4,
+                 'total_tokens': prompt_tokens + len(content) // 4,
+                 'prompt_tokens_details': {'cached_tokens': 0}}
+        if body.get('stream'):
+            return self.stream_answer(body.get('model', 'gpt-4o'), content, usage)
+        self.send(200, {
+            'id': 'chatcmpl-fake', 'object': 'chat.completion', 'created': int(time.time()), 'model': body.get('model', 'gpt-4o'),
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+            'usage': usage
+        })
+
+    def content_answer(self, prompt):
+        """Content JSON in the shape the optimizer asks for"""
+        text = prompt if isinstance(prompt, str) else ' '.join(p.get('text', '') for p in prompt or [] if isinstance(p, dict))
+        match = re.search(r"['\"]([^'\"\n]{3,60})['\"]", text)
+        keyword = match.group(1) if match else 'produkt'
+        return json.dumps({
+            'title': f'{keyword.capitalize()} - praktisk og holdbar',
+            'body_html': f'<p>{keyword.capitalize()} i høj kvalitet.</p><ul><li>Let at rengøre</li><li>Solid</li></ul>',
+            'product_type': 'Køkkenredskaber',
+            'vendor': 'NordLiv',
+            'seo_title': f'{keyword.capitalize()} | NordLiv',
+            'seo_description': f'Køb {keyword} online. Hurtig levering.',
+            'handle': re.sub(r'[^a-z0-9]+', '-', keyword.lower()).strip('-') or 'produkt'
+        }, ensure_ascii=False)
+
+    def stream_answer(self, model, content, usage):
+        """Server-sent chunks like the streaming chat API, usage in the last one"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        size = max(1, math.ceil(len(content) / self.fake.stream_chunks))
+        pieces = [content[i:i + size] for i in range(0, len(content), size)]
+        step = self.fake.latency['openai'] / max(len(pieces), 1) / 4
+
+        def event(choices, usage=None):
+            chunk = {'id': 'chatcmpl-fake', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                     'model': model, 'choices': choices, 'usage': usage}
+            self.wfile.write(f'data: {json.dumps(chunk, ensure_ascii=False)}\n\n'.encode('utf-8'))
+            self.wfile.flush()
+
+        for piece in pieces:
+            event([{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}])
+            if step:
+                time.sleep(step)
+        event([{'index': 0, 'delta': {}, 'finish_reason': 'stop'}])
+        event([], usage)
+        self.wfile.write(b'data: [DONE]\n\n')
+
+    # Google Trends
+
+    def trends_limited(self):
+        retry_after = self.fake.windows['trends'].retry_after()
+        if retry_after:
+            self.fake.count('trends', 'rate_limited')
+            self.send(429, 'Too Many Requests', content_type='text/html')
+            return True
+        return False
+
+    def trends_get(self, url, query, body):
+        if url.path.rstrip('/').endswith('/explore'):
+            # Cookie page pytrends visits first
+            return self.send(200, '<html></html>', content_type='text/html', headers={'Set-Cookie': 'NID=fake; Path=/'})
+        if self.trends_limited():
+            return
+        req = json.loads(query.get('req', ['{}'])[0])
+        if url.path.endswith('/widgetdata/multiline'):
+            return self.send(200, ")]}',\n" + json.dumps(self.timeline(req)))
+        if url.path.endswith('/widgetdata/relatedsearches'):
+            return self.send(200, ")]}',\n" + json.dumps(self.related(req)))
+        self.send(404, 'Not Found', content_type='text/html')
+
+    def trends_post(self, url, query, body):
+        if not url.path.endswith('/api/explore'):
+            return self.send(404, 'Not Found', content_type='text/html')
+        if self.trends_limited():
+            return
+        self.fake.count('trends', 'payloads')
+        req = json.loads(query.get('req', ['{}'])[0])
+        items = req.get('comparisonItem', [])
+        widgets = [{'id': 'TIMESERIES', 'token': 'fake', 'request': {
+            'comparisonItem': [{'complexKeywordsRestriction': {'keyword': [{'type': 'BROAD', 'value': i['keyword']}]}} for i in items]
+        }}]
+        for n, item in enumerate(items):
+            widgets.append({'id': f'RELATED_QUERIES_{n}' if len(items) > 1 else 'RELATED_QUERIES', 'token': 'fake', 'request': {
+                'restriction': {'complexKeywordsRestriction': {'keyword': [{'type': 'BROAD', 'value': item['keyword']}]}}
+            }})
+        self.send(200, ")]}'" + json.dumps({'widgets': widgets}))
+
+    def timeline(self, req):
+        """A year of weekly interest for each keyword of the payload"""
+        items = req.get('comparisonItem', [])
+        keywords = [i['complexKeywordsRestriction']['keyword'][0]['value'] for i in items]
+        rngs = [random.Random(k) for k in keywords]
+        levels = [rng.randint(5, 80) for rng in rngs]
+        start = int(time.time()) - 52 * 7 * 86400
+        points = []
+        for week in range(52):
+            values = [max(0, min(100, level + rng.randint(-10, 10))) for level, rng in zip(levels, rngs)]
+            points.append({'time': str(start + week * 7 * 86400), 'formattedTime': '', 'value': values,
+                           'hasData': [True] * len(values), 'isPartial': week == 51})
+        return {'default': {'timelineData': points}}
+
+    def related(self, req):
+        keyword = req['restriction']['complexKeywordsRestriction']['keyword'][0]['value']
+        rng = random.Random(keyword)
+        ranked = [{'query': f'{keyword} {w}', 'value': rng.randint(10, 100)} for w in rng.sample(WORDS, 5)]
+        ranked.sort(key=lambda q: q['value'], reverse=True)
+        return {'default': {'rankedList': [{'rankedKeyword': ranked}, {'rankedKeyword': ranked[:2]}]}}
+
+    # Product images
+
+    def images_get(self, url, query, body):
+        match = re.search(r'/images/(\d+)-(\d+)\.png$', url.path)
+        if not match:
+            return self.send(404, b'', content_type='image/png')
+        self.send(200, png(f'{match.group(1)}-{match.group(2)}'), content_type='image/png')
+
+
+def start(host='127.0.0.1', port=0, **options):
+    """Serve the fakes from a background thread; returns the server (base URL in server.base_url)"""
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.fake = FakeServices(**options)
+    server.base_url = f'http://{host}:{server.server_address[1]}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_arguments(parser):
+    """Command line options for the fake services, shared with the pipeline benchmark"""
+    group = parser.add_argument_group('fake services')
+    group.add_argument('--products', type=int, default=100, help='products tagged needs_update in the fake store')
+    group.add_argument('--shopify-latency', type=float, default=0.05, help='seconds per Shopify request')
+    group.add_argument('--openai-latency', type=float, default=0.5, help='seconds per OpenAI request')
+    group.add_argument('--trends-latency', type=float, default=0.3, help='seconds per Trends request')
+    group.add_argument('--image-latency', type=float, default=0.02, help='seconds per image download')
+    group.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with HTTP 500')
+    group.add_argument('--shopify-error-rate', type=float, help='overrides --error-rate for Shopify')
+    group.add_argument('--openai-error-rate', type=float, help='overrides --error-rate for OpenAI')
+    group.add_argument('--trends-error-rate', type=float, help='overrides --error-rate for Trends')
+    group.add_argument('--shopify-bucket', type=int, default=40, help='REST leaky bucket size')
+    group.add_argument('--shopify-leak', type=float, default=2, help='REST requests drained per second')
+    group.add_argument('--graphql-bucket', type=int, default=1000, help='GraphQL cost bucket size')
+    group.add_argument('--graphql-restore', type=float, default=50, help='GraphQL cost restored per second')
+    group.add_argument('--openai-rpm', type=int, default=0, help='OpenAI requests per minute before 429 (0: unlimited)')
+    group.add_argument('--trends-rpm', type=int, default=0, help='Trends requests per minute before 429 (0: unlimited)')
+    return group
+
+
+def options(args):
+    """FakeServices keyword arguments from parsed add_arguments() options"""
+    names = ['products', 'shopify_latency', 'openai_latency', 'trends_latency', 'image_latency', 'error_rate',
+             'shopify_error_rate', 'openai_error_rate', 'trends_error_rate', 'shopify_bucket', 'shopify_leak',
+             'graphql_bucket', 'graphql_restore', 'openai_rpm', 'trends_rpm']
+    return {name: getattr(args, name) for name in names}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = start(port=args.port, **options(args))
+    print(f"🧪 Fake services on {server.base_url}")
+    print(f"   SHOPIFY_API_BASE={server.base_url}{API_PREFIX}")
+    print(f"   OPENAI_BASE_URL={server.base_url}/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Disk-backed caches shared by mainZ.py and flask_backend.py
+Entries live in one SQLite file (one table per cache) with TTL and size-based eviction.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import metrics
+
+CACHE_DB_PATH = os.getenv('CACHE_DB_PATH', 'optimizer_cache.db')
+TRENDS_CACHE_TTL = float(os.getenv('TRENDS_CACHE_TTL_DAYS', '7')) * 86400
+TRENDS_CACHE_MAX_ENTRIES = int(os.getenv('TRENDS_CACHE_MAX_ENTRIES', '50000'))
+CONTENT_CACHE_TTL = float(os.getenv('CONTENT_CACHE_TTL_DAYS', '30')) * 86400
+CONTENT_CACHE_MAX_ENTRIES = int(os.getenv('CONTENT_CACHE_MAX_ENTRIES', '20000'))
+
+
+def normalize_keyword(keyword):
+    """Normalize a keyword for cache keys and deduplication"""
+    keyword = unicodedata.normalize('NFC', keyword or '')
+    return re.sub(r'\s+', ' ', keyword).strip().lower()
+
+
+class SqliteCache:
+    """Key/value cache in a SQLite table with TTL, LRU eviction and hit/miss counters"""
+    def __init__(self, table, path=None, ttl=None, max_entries=None):
+        self.table = table
+        self.path = path or CACHE_DB_PATH
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+            'created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)')
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(parts):
+        return json.dumps(list(parts), ensure_ascii=False)
+
+    def get(self, *parts, record=True):
+        """Return the cached value, or None on a miss or expired entry.
+
+        record=False leaves the hit/miss counters alone, for lookups made of several probes.
+        """
+        key = self.make_key(parts)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT value, created_at FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+            if row and self.ttl and now - row[1] > self.ttl:
+                self._conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                if record:
+                    self.record(False)
+                return None
+            self._conn.execute(f'UPDATE {self.table} SET accessed_at = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            if record:
+                self.record(True)
+        return json.loads(row[0])
+
+    def record(self, hit):
+        """Count one lookup in the hit/miss counters and the shared metrics"""
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        metrics.inc(metrics.CACHE_LOOKUPS, cache=self.table, result='hit' if hit else 'miss')
+
+    def set(self, value, *parts):
+        key = self.make_key(parts)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def delete(self, *parts):
+        with self._lock:
+            self._conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (self.make_key(parts),))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f'DELETE FROM {self.table}')
+            self._conn.commit()
+
+    def _evict(self, now):
+        if self.ttl:
+            self._conn.execute(f'DELETE FROM {self.table} WHERE created_at < ?', (now - self.ttl,))
+        if self.max_entries:
+            count = self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+            if count > self.max_entries:
+                # Drop 10% extra so eviction doesn't run on every insert
+                excess = count - self.max_entries + max(1, self.max_entries // 10)
+                self._conn.execute(
+                    f'DELETE FROM {self.table} WHERE key IN '
+                    f'(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)', (excess,)
+                )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0,
+            'entries': len(self)
+        }
+
+
+class TrendsCache(SqliteCache):
+    """Google Trends data keyed on (normalized keyword, geo, timeframe)
+
+    Interest series also carry the anchor keyword they were scaled against.
+    """
+    def __init__(self, path=None, ttl=TRENDS_CACHE_TTL, max_entries=TRENDS_CACHE_MAX_ENTRIES):
+        super().__init__('trends_cache', path, ttl, max_entries)
+
+    def get_series(self, keyword, geo, timeframe, anchor='', record=True):
+        """Cached interest values ([] means Trends had no data), or None when not cached"""
+        return self.get('interest', normalize_keyword(keyword), geo, timeframe, normalize_keyword(anchor), record=record)
+
+    def set_series(self, keyword, geo, timeframe, values, anchor=''):
+        self.set([float(v) for v in values], 'interest', normalize_keyword(keyword), geo, timeframe, normalize_keyword(anchor))
+
+    def get_related(self, keyword, geo, timeframe):
+        return self.get('related', normalize_keyword(keyword), geo, timeframe)
+
+    def set_related(self, keyword, geo, timeframe, related):
+        self.set(list(related), 'related', normalize_keyword(keyword), geo, timeframe)
+
+
+class ContentCache(SqliteCache):
+    """Generated product content keyed on a hash of everything that went into the prompt"""
+    def __init__(self, path=None, ttl=CONTENT_CACHE_TTL, max_entries=CONTENT_CACHE_MAX_ENTRIES):
+        super().__init__('content_cache', path, ttl, max_entries)
+
+    @staticmethod
+    def fingerprint(inputs):
+        """Stable sha256 of a JSON-serializable dict of generation inputs"""
+        blob = json.dumps(inputs, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    def get_content(self, fingerprint):
+        return self.get('content', fingerprint)
+
+    def set_content(self, fingerprint, content):
+        self.set(content, 'content', fingerprint)
+
+
+_trends_cache = None
+_caches_lock = threading.Lock()
+_content_cache = None
+
+
+def get_trends_cache():
+    """Process-wide TrendsCache instance"""
+    global _trends_cache
+    with _caches_lock:
+        if _trends_cache is None:
+            _trends_cache = TrendsCache()
+        return _trends_cache
+
+
+def get_content_cache():
+    """Process-wide ContentCache instance"""
+    global _content_cache
+    with _caches_lock:
+        if _content_cache is None:
+            _content_cache = ContentCache()
+        return _content_cache
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events for the web dashboard
+Backend changes (log lines, job progress, current keywords) are published once into the
+job store's events table, so they reach every web server process. Each process mirrors
+the newest events into a ring buffer with one follower thread; each /api/events
+connection sleeps until a new event arrives and sends only what it hasn't seen. A
+reconnecting browser resumes from its Last-Event-ID. Idle dashboards cost one blocked
+thread and a keepalive comment.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+EVENT_BUFFER_SIZE = int(os.getenv('EVENT_BUFFER_SIZE', '1000'))
+SSE_KEEPALIVE = 15  # seconds between keepalive comments on an idle stream
+
+
+class EventBus:
+    """Numbered events in a shared store, mirrored into a local ring buffer with blocking waits.
+
+    store is a JobStore (add_event, events_since, event_range); events published by
+    other processes show up within poll_interval seconds.
+    """
+    def __init__(self, store, size=EVENT_BUFFER_SIZE, poll_interval=0.5):
+        self.store = store
+        self.size = size
+        self.poll_interval = poll_interval
+        self._events = deque(maxlen=size)
+        self._cond = threading.Condition()
+        self._pull_lock = threading.Lock()
+        self._follower = None
+        # The mirror holds every event after floor
+        self.last_id = self._floor = max(store.event_range()[1] - size, 0)
+
+    def publish(self, event_type, data):
+        event_id = self.store.add_event(event_type, data, keep=self.size)
+        self._pull()
+        return event_id
+
+    def _pull(self):
+        with self._pull_lock:
+            events = self.store.events_since(self.last_id)
+            if not events:
+                return
+            with self._cond:
+                if events[0]['id'] > self.last_id + 1:
+                    self._floor = events[0]['id'] - 1  # Trimmed from the store before we saw them
+                for event in events:
+                    if len(self._events) == self.size:
+                        self._floor = self._events[0]['id']
+                    self._events.append(event)
+                self.last_id = events[-1]['id']
+                self._cond.notify_all()
+
+    def _follow(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self._pull()
+            except Exception:
+                pass  # The store is busy or gone for a moment; try again on the next tick
+
+    def since(self, last_id):
+        """(events after last_id, complete); complete is False when some were already dropped"""
+        self._pull()
+        with self._cond:
+            return self._since(last_id)
+
+    def _since(self, last_id):
+        return [e for e in self._events if e['id'] > last_id], last_id >= self._floor
+
+    def wait(self, last_id, timeout=SSE_KEEPALIVE):
+        """Block until there are events after last_id (or timeout); returns since(last_id)"""
+        with self._cond:
+            if self._follower is None:
+                self._follower = threading.Thread(target=self._follow, daemon=True)
+                self._follower.start()
+            self._cond.wait_for(lambda: self.last_id > last_id, timeout)
+            return self._since(last_id)
+
+
+def format_sse(event_type, data, event_id=None):
+    """One SSE message"""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def event_stream(bus, last_id, snapshot, keepalive=SSE_KEEPALIVE):
+    """SSE messages for one client: a 'status' snapshot when it has no (or a stale) position,
+    then only new events. snapshot() builds the full state."""
+    events, complete = bus.since(last_id) if last_id is not None else ([], False)
+    while True:
+        if not complete:
+            last_id = bus.last_id
+            yield format_sse('status', snapshot(), last_id)
+            events = [e for e in events if e['id'] > last_id]
+        for event in events:
+            last_id = event['id']
+            yield format_sse(event['type'], event['data'], last_id)
+        events, complete = bus.wait(last_id, keepalive)
+        if not events and complete:
+            yield ': keepalive\n\n'
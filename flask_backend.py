@@ -4,48 +4,70 @@ Enhanced Flask Backend with Smart Google Trends Integration
 Features: Advanced keyword research, related keywords discovery, persistent SEO tracking
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 import os
 import json
-import logging
-import threading
 import time
+import threading
 from datetime import datetime
-import requests
 from dotenv import load_dotenv
 import re
-from pytrends.request import TrendReq
-import pandas as pd
-import random
-from collections import defaultdict
+import functools
+from collections import defaultdict, namedtuple
+from cache_store import get_trends_cache, get_content_cache, normalize_keyword
+from shopify_client import ShopifyClient, get_client, all_bucket_status
+from image_cache import get_image_cache
+from trends_batch import fetch_interest, planned, trends_pacer, TRENDS_ANCHOR_KEYWORD
+from vendor_matcher import get_vendor_matcher
+from job_store import JobStore, JobWorkers, ACTIVE_JOB_STATUSES
+from event_stream import EventBus, event_stream
+import metrics
 
 # Import your existing functions from mainZ.py
 import sys
 sys.path.append('.')
 try:
     from mainZ import (
-        fetch_products, optimize_product, extract_keyword, 
-        AVAILABLE_FIELDS, SUBCATEGORY_MAP, VENDORS
+        fetch_products, iter_products, prefetch, optimize_product, update_product, extract_keyword, 
+        keyword_candidates, get_prompt_cache_stats, require_credentials, AVAILABLE_FIELDS, SUBCATEGORY_MAP, VENDORS
     )
     print("✅ Successfully imported from mainZ.py")
 except ImportError as e:
     print(f"⚠️ Warning: Could not import from mainZ.py: {e}")
     print("Using dummy functions for testing...")
     
-    def fetch_products(limit=None):
+    def fetch_products(limit=None, mode=None, client=None):
         return [
             {'id': '123456789', 'title': 'Test Product 1 - Kageskraber Demo', 'tags': 'needs_update'},
             {'id': '123456790', 'title': 'Test Product 2 - Kaffemaskin Demo', 'tags': 'needs_update'}
         ]
     
-    def optimize_product(prod, selected_fields):
+    def iter_products(limit=None, mode=None, client=None):
+        return iter(fetch_products(limit))
+    
+    def prefetch(iterable, buffer_size=25):
+        return iter(iterable)
+    
+    def optimize_product(prod, selected_fields, use_trends=True, apply=None):
         time.sleep(2)
         return True
     
+    def update_product(prod, data, selected_fields, client=None):
+        return True
+    
     def extract_keyword(title):
         return title.split(' ')[0] if title else 'unknown'
     
+    def keyword_candidates(products, region='DK', language='da-DK', max_related=3):
+        return {}, []
+    
+    def get_prompt_cache_stats():
+        return {}
+    
+    def require_credentials(*names):
+        pass
+    
     AVAILABLE_FIELDS = {
         'title': 'Product Title',
         'body_html': 'Product Description',
@@ -64,6 +86,12 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
+# Lowercased text, its word set and the danish_product_terms categories it names / has terms of;
+# semantic is True when one category has both on its own
+KeywordProfile = namedtuple('KeywordProfile', 'lower words categories terms semantic triggers')
+# Built once per product and shared by all of its candidate keywords
+ProductContext = namedtuple('ProductContext', 'title_lower title_words type_lower categories terms semantic bonus_triggers')
+
 # Enhanced SEO Scoring System
 class AdvancedSEOScorer:
     def __init__(self):
@@ -91,70 +119,94 @@ class AdvancedSEOScorer:
             'børn': ['legetøj', 'baby', 'sikkerhed', 'læring', 'udvikling'],
             'bil': ['transport', 'vedligeholdelse', 'tilbehør', 'sikkerhed', 'komfort']
         }
-    
-    def detect_language(self, keyword):
-        """Enhanced language detection"""
-        danish_chars = 'æøå'
-        if any(char in keyword.lower() for char in danish_chars):
-            return 'da'
         
         # Extended Danish words list
-        danish_words = [
+        self.danish_words = [
             'med', 'til', 'og', 'i', 'på', 'af', 'for', 'er', 'det', 'en', 'som',
             'køkken', 'hjem', 'have', 'børn', 'baby', 'bil', 'computer', 'telefon',
             'redskaber', 'værktøj', 'maskine', 'udstyr', 'tilbehør', 'sæt',
             'professionel', 'kvalitet', 'dansk', 'nordisk', 'moderne', 'klassisk'
         ]
         
+        # Product type specific bonuses: keyword trigger -> title words (first match wins)
+        self.product_type_bonuses = [
+            ('køkken', ['kage', 'mad', 'bagning', 'kaffe']),
+            ('baby', ['barn', 'lille', 'sikker']),
+            ('have', ['plante', 'blomst', 'udendørs'])
+        ]
+        
+        # Score tables, checked top-down: (minimum value, score)
+        self.search_volume_steps = [(90, 98), (80, 95), (70, 90), (60, 85), (50, 80),
+                                    (40, 75), (30, 70), (20, 65), (10, 55), (5, 45)]
+        self.grade_thresholds = [(88, 'A+'), (82, 'A'), (76, 'B+'), (70, 'B'), (64, 'C+'), (58, 'C')]
+        # Words in the keyword -> score; longer keywords score 55 up to 7 words, then 35
+        self.keyword_length_scores = {
+            1: 55,  # Single word - very competitive
+            2: 88,  # Sweet spot for Danish market
+            3: 95,  # Perfect for long-tail Danish SEO
+            4: 85,  # Still very good
+            5: 70   # Getting longer
+        }
+        
+        # Inverted index: related term -> categories it belongs to
+        self.term_categories = defaultdict(set)
+        for category, related_terms in self.danish_product_terms.items():
+            for term in related_terms:
+                self.term_categories[term].add(category)
+        
+        # Candidate keywords repeat across products, so their profiles are cached; so are the
+        # contexts of recent products for callers that don't pass one
+        self.keyword_profile = functools.lru_cache(maxsize=8192)(self._keyword_profile)
+        self.product_context = functools.lru_cache(maxsize=256)(self._product_context)
+    
+    def _text_categories(self, text):
+        """(categories named in text, categories with a related term in text) - substring matches"""
+        categories = frozenset(c for c in self.danish_product_terms if c in text)
+        terms = frozenset(c for term, cats in self.term_categories.items() if term in text for c in cats)
+        return categories, terms
+    
+    def _keyword_profile(self, keyword):
+        keyword_lower = keyword.lower()
+        categories, terms = self._text_categories(keyword_lower)
+        triggers = frozenset(trigger for trigger, _ in self.product_type_bonuses if trigger in keyword_lower)
+        return KeywordProfile(keyword_lower, frozenset(keyword_lower.split()), categories, terms,
+                              bool(categories & terms), triggers)
+    
+    def _product_context(self, product_title, product_type):
+        """Precompute everything score_relevance needs from the product side"""
+        title_lower = product_title.lower()
+        categories, terms = self._text_categories(title_lower)
+        bonus_triggers = frozenset(trigger for trigger, title_words in self.product_type_bonuses
+                                   if any(word in title_lower for word in title_words))
+        return ProductContext(title_lower, frozenset(title_lower.split()), (product_type or '').lower(),
+                              categories, terms, bool(categories & terms), bonus_triggers)
+    
+    def detect_language(self, keyword):
+        """Enhanced language detection"""
+        danish_chars = 'æøå'
+        if any(char in keyword.lower() for char in danish_chars):
+            return 'da'
+        
         keyword_words = keyword.lower().split()
-        if any(word in danish_words for word in keyword_words):
+        if any(word in self.danish_words for word in keyword_words):
             return 'da'
         
         return 'en'
     
     def score_search_volume(self, trends_value):
         """Enhanced search volume scoring"""
-        if trends_value >= 90:
-            return 98
-        elif trends_value >= 80:
-            return 95
-        elif trends_value >= 70:
-            return 90
-        elif trends_value >= 60:
-            return 85
-        elif trends_value >= 50:
-            return 80
-        elif trends_value >= 40:
-            return 75
-        elif trends_value >= 30:
-            return 70
-        elif trends_value >= 20:
-            return 65
-        elif trends_value >= 10:
-            return 55
-        elif trends_value >= 5:
-            return 45
-        else:
-            return max(25, trends_value * 5)
+        for threshold, score in self.search_volume_steps:
+            if trends_value >= threshold:
+                return score
+        return max(25, trends_value * 5)
     
     def score_keyword_length(self, keyword):
         """Optimized keyword length scoring"""
         length = len(keyword.split())
         
-        if length == 1:
-            return 55  # Single word - very competitive
-        elif length == 2:
-            return 88  # Sweet spot for Danish market
-        elif length == 3:
-            return 95  # Perfect for long-tail Danish SEO
-        elif length == 4:
-            return 85  # Still very good
-        elif length == 5:
-            return 70  # Getting longer
-        elif length <= 7:
-            return 55  # Too long for main keywords
-        else:
-            return 35  # Way too long
+        if length in self.keyword_length_scores:
+            return self.keyword_length_scores[length]
+        return 55 if length <= 7 else 35  # Too long for main keywords / way too long
     
     def estimate_competition(self, keyword, trends_value, related_keywords_count=0):
         """Enhanced competition estimation"""
@@ -169,7 +221,7 @@ class AdvancedSEOScorer:
             base_competition *= 0.8   # Two words = moderate competition
         
         # Brand names have lower competition
-        if any(brand.lower() in keyword.lower() for brand_list in VENDORS.values() for brand in brand_list):
+        if get_vendor_matcher(VENDORS).contains(keyword):
             base_competition *= 0.7
         
         # If we found many related keywords, competition might be higher
@@ -184,50 +236,41 @@ class AdvancedSEOScorer:
         competition_score = max(25, 100 - base_competition)
         return min(98, competition_score)
     
-    def score_relevance(self, keyword, product_title, product_type, related_keywords=None):
-        """Enhanced relevance scoring"""
-        keyword_lower = keyword.lower()
-        title_lower = product_title.lower()
-        type_lower = (product_type or '').lower()
+    def score_relevance(self, keyword, product_title, product_type, related_keywords=None, context=None):
+        """Enhanced relevance scoring; pass context=product_context(...) when scoring many keywords"""
+        context = context or self.product_context(product_title, product_type)
+        profile = self.keyword_profile(keyword)
         
         score = 40  # Lower base score, earn points
         
         # Direct matches get big bonus
-        if keyword_lower in title_lower:
+        if profile.lower in context.title_lower:
             score += 35
         
         # Word overlap analysis
-        keyword_words = set(keyword_lower.split())
-        title_words = set(title_lower.split())
-        overlap = len(keyword_words.intersection(title_words))
+        overlap = len(profile.words & context.title_words)
         score += min(25, overlap * 12)
         
         # Category relevance
-        if type_lower and any(word in type_lower for word in keyword_words):
+        if context.type_lower and any(word in context.type_lower for word in profile.words):
             score += 20
         
-        # Enhanced semantic relevance
-        for category, related_terms in self.danish_product_terms.items():
-            if category in keyword_lower or category in title_lower:
-                if any(term in keyword_lower or term in title_lower for term in related_terms):
-                    score += 15
-                    break
+        # Enhanced semantic relevance: a category named in keyword or title, with a related term in either
+        if (profile.semantic or context.semantic or profile.categories & context.terms or
+                context.categories & profile.terms):
+            score += 15
         
         # Bonus for having related keywords (shows keyword depth)
         if related_keywords and len(related_keywords) > 0:
             score += min(10, len(related_keywords) * 2)
         
         # Product type specific bonuses
-        if 'køkken' in keyword_lower and any(word in title_lower for word in ['kage', 'mad', 'bagning', 'kaffe']):
-            score += 10
-        elif 'baby' in keyword_lower and any(word in title_lower for word in ['barn', 'lille', 'sikker']):
-            score += 10
-        elif 'have' in keyword_lower and any(word in title_lower for word in ['plante', 'blomst', 'udendørs']):
+        if profile.triggers & context.bonus_triggers:
             score += 10
         
         return min(98, score)
     
-    def calculate_seo_score(self, keyword, trends_data, product_title, product_type, related_keywords=None):
+    def calculate_seo_score(self, keyword, trends_data, product_title, product_type, related_keywords=None, context=None):
         """Calculate comprehensive SEO score with enhanced factors"""
         try:
             trends_value = trends_data.get('interest', 0)
@@ -237,7 +280,7 @@ class AdvancedSEOScorer:
             search_score = self.score_search_volume(trends_value)
             length_score = self.score_keyword_length(keyword)
             competition_score = self.estimate_competition(keyword, trends_value, related_count)
-            relevance_score = self.score_relevance(keyword, product_title, product_type, related_keywords)
+            relevance_score = self.score_relevance(keyword, product_title, product_type, related_keywords, context)
             
             # Language factor with enhanced multiplier
             language = self.detect_language(keyword)
@@ -257,20 +300,7 @@ class AdvancedSEOScorer:
                 final_score *= 1.05
             
             # Grade assignment with refined thresholds
-            if final_score >= 88:
-                grade = 'A+'
-            elif final_score >= 82:
-                grade = 'A'
-            elif final_score >= 76:
-                grade = 'B+'
-            elif final_score >= 70:
-                grade = 'B'
-            elif final_score >= 64:
-                grade = 'C+'
-            elif final_score >= 58:
-                grade = 'C'
-            else:
-                grade = 'D'
+            grade = next((g for threshold, g in self.grade_thresholds if final_score >= threshold), 'D')
             
             return {
                 'total_score': round(final_score, 1),
@@ -297,14 +327,18 @@ class AdvancedSEOScorer:
                 'trends_interest': 0,
                 'related_keywords_count': 0
             }
+    
+    def calculate_seo_scores(self, pairs):
+        """Vectorized calculate_seo_score over many (keyword, product) pairs, returned as a DataFrame"""
+        from seo_batch import score_seo_batch  # NumPy/pandas load on the first batch, not at startup
+        return score_seo_batch(self, pairs, get_vendor_matcher(VENDORS))
 
 # Advanced Google Trends Integration
 class SmartTrendsAnalyzer:
     def __init__(self):
+        # Workers share one Trends session; its requests are paced by trends_pacer together with
+        # mainZ's, so jobs take turns payload by payload
         self.pytrends = None
-        self.last_request_time = 0
-        self.min_delay = 3  # Increased delay for reliability
-        self.keyword_cache = {}  # Cache for performance
         
         # Danish keyword expansions for better research
         self.danish_expansions = {
@@ -315,16 +349,23 @@ class SmartTrendsAnalyzer:
             'hjem': ['hjemmeindretning', 'møbler', 'dekoration', 'opbevaring']
         }
     
+    @property
+    def keyword_cache(self):
+        """Persistent cache shared with mainZ.py, opened on first use"""
+        return get_trends_cache()
+
     def initialize_trends(self):
         """Initialize PyTrends with enhanced error handling"""
         try:
-            self.pytrends = TrendReq(
-                hl='da-DK',
-                tz=60,
-                timeout=(10, 20),  # Increased timeout
-                retries=3,
-                backoff_factor=1.0
-            )
+            from pytrends.request import TrendReq  # Loads pandas; deferred until Trends is actually used
+            with trends_pacer:  # Fetches Google's cookie
+                self.pytrends = TrendReq(
+                    hl='da-DK',
+                    tz=60,
+                    timeout=(10, 20),  # Increased timeout
+                    retries=3,
+                    backoff_factor=1.0
+                )
             return True
         except Exception as e:
             print(f"Failed to initialize Google Trends: {e}")
@@ -398,96 +439,75 @@ class SmartTrendsAnalyzer:
         unique_related = list(set(related_keywords))
         return unique_related[:15]  # Limit to 15 related keywords
     
-    def get_trends_data_batch(self, keywords, geo='DK', timeframe='today 12-m'):
+    def summarize_interest(self, values):
+        """Turn an interest series into the trends data dict used for scoring"""
+        import pandas as pd
+        values = pd.Series(values, dtype=float).dropna()
+        if len(values) > 0:
+            return {
+                'interest': round(values.mean(), 1),
+                'peak_interest': round(values.max(), 1),
+                'trend_direction': self.calculate_trend_direction(values),
+                'data_points': len(values),
+                'reliability': 'high' if len(values) > 10 else 'medium'
+            }
+        # No data but keyword exists
+        return {
+            'interest': 0,
+            'peak_interest': 0,
+            'trend_direction': 'no_data',
+            'data_points': 0,
+            'reliability': 'low'
+        }
+    
+    def get_trends_data_batch(self, keywords, geo='DK', timeframe='today 12-m', use_cache=True):
         """Get trends data with improved batching and error handling"""
-        if not self.pytrends:
-            if not self.initialize_trends():
-                return {}
-        
         trends_data = {}
         
+        # Serve what we can from the persistent cache
+        missing = []
+        for keyword in keywords:
+            values = self.keyword_cache.get_series(keyword, geo, timeframe, TRENDS_ANCHOR_KEYWORD) if use_cache else None
+            if values is None:
+                missing.append(keyword)
+            else:
+                trends_data[keyword] = self.summarize_interest(values)
+        keywords = missing
+        if not keywords:
+            return trends_data
+        
         try:
-            # Process in smaller batches for reliability
-            batch_size = 3  # Reduced batch size for reliability
+            if not self.pytrends:
+                if not self.initialize_trends():
+                    return {**trends_data, **{keyword: self.fallback_interest() for keyword in keywords}}
             
-            for i in range(0, len(keywords), batch_size):
-                batch = keywords[i:i+batch_size]
-                
-                # Rate limiting
-                current_time = time.time()
-                if current_time - self.last_request_time < self.min_delay:
-                    wait_time = self.min_delay - (current_time - self.last_request_time)
-                    time.sleep(wait_time)
-                
-                try:
-                    self.pytrends.build_payload(
-                        batch,
-                        cat=0,
-                        timeframe=timeframe,
-                        geo=geo,
-                        gprop=''
-                    )
-                    
-                    # Get interest over time
-                    interest_df = self.pytrends.interest_over_time()
-                    
-                    if not interest_df.empty:
-                        for keyword in batch:
-                            if keyword in interest_df.columns:
-                                values = interest_df[keyword].dropna()
-                                if len(values) > 0:
-                                    avg_interest = values.mean()
-                                    max_interest = values.max()
-                                    
-                                    trends_data[keyword] = {
-                                        'interest': round(avg_interest, 1),
-                                        'peak_interest': round(max_interest, 1),
-                                        'trend_direction': self.calculate_trend_direction(values),
-                                        'data_points': len(values),
-                                        'reliability': 'high' if len(values) > 10 else 'medium'
-                                    }
-                                else:
-                                    # No data but keyword exists
-                                    trends_data[keyword] = {
-                                        'interest': 0,
-                                        'peak_interest': 0,
-                                        'trend_direction': 'no_data',
-                                        'data_points': 0,
-                                        'reliability': 'low'
-                                    }
-                    
-                    self.last_request_time = time.time()
-                    
-                    # Additional delay between batches
-                    if i + batch_size < len(keywords):
-                        time.sleep(self.min_delay)
-                        
-                except Exception as batch_error:
-                    print(f"Batch error for {batch}: {batch_error}")
-                    # Provide fallback data for failed batch
-                    for keyword in batch:
-                        trends_data[keyword] = {
-                            'interest': random.randint(15, 60),
-                            'peak_interest': random.randint(40, 80),
-                            'trend_direction': random.choice(['stable', 'rising']),
-                            'data_points': 52,
-                            'reliability': 'estimated'
-                        }
+            # Five terms per payload: four keywords plus the shared anchor keyword, rescaled so
+            # interest is comparable across payloads; rate limiting comes from trends_pacer
+            fetched = fetch_interest(self.pytrends, keywords, geo, timeframe, self.keyword_cache, use_cache=False)
+            
+            for keyword in keywords:
+                # Keywords of a failed payload get the fixed fallback
+                trends_data[keyword] = self.summarize_interest(fetched[keyword]) if keyword in fetched else self.fallback_interest()
         
         except Exception as e:
             print(f"Trends data error: {e}")
-            # Fallback with more realistic data
             for keyword in keywords:
-                trends_data[keyword] = {
-                    'interest': random.randint(20, 70),
-                    'peak_interest': random.randint(50, 90),
-                    'trend_direction': random.choice(['rising', 'stable', 'declining']),
-                    'data_points': 52,
-                    'reliability': 'demo'
-                }
+                trends_data[keyword] = self.fallback_interest()
         
         return trends_data
     
+    @staticmethod
+    def fallback_interest():
+        """Trends data for a keyword whose lookup failed: the fixed fallback mainZ.py scores
+        such keywords with, never cached and the same on every call"""
+        return {
+            'interest': 35,
+            'peak_interest': 45,
+            'trend_direction': 'stable',
+            'data_points': 0,
+            'reliability': 'fallback'
+        }
+    
     def calculate_trend_direction(self, series):
         """Enhanced trend direction calculation"""
         if len(series) < 4:
@@ -514,6 +534,38 @@ class SmartTrendsAnalyzer:
         else:
             return 'stable'
     
+    def plan_keywords(self, products, geo='DK', timeframe='today 12-m', extra_keywords=()):
+        """Keyword analysis for a window of products from one shared Trends table.
+        
+        Candidate keywords of all products, plus extra_keywords (fetched into the Trends cache
+        for other users), are normalized and deduplicated, so Trends is queried once per
+        distinct keyword. Returns {product_id: analysis} in the analyze_product_keywords format.
+        """
+        candidates = {}
+        unique = {normalize_keyword(k): k for k in extra_keywords}
+        for product in products:
+            title = product.get('title', '')
+            base_keywords = self.extract_base_keywords(title, product.get('product_type', ''))
+            related_keywords = self.generate_related_keywords(base_keywords, title)
+            candidates[product.get('id')] = (base_keywords, related_keywords)
+            for keyword in base_keywords + related_keywords:
+                unique.setdefault(normalize_keyword(keyword), keyword)
+        
+        print(f"🗺️ Keyword plan: {len(products)} products, {len(unique)} distinct keywords")
+        table = self.get_trends_data_batch(list(unique.values()), geo, timeframe)
+        table = {normalize_keyword(k): v for k, v in table.items()}
+        
+        plans = {}
+        for product_id, (base_keywords, related_keywords) in candidates.items():
+            all_keywords = base_keywords + related_keywords
+            plans[product_id] = {
+                'base_keywords': base_keywords,
+                'related_keywords': related_keywords,
+                'trends_data': {k: table[normalize_keyword(k)] for k in all_keywords if normalize_keyword(k) in table},
+                'total_analyzed': len(all_keywords)
+            }
+        return plans
+    
     def analyze_product_keywords(self, product_title, product_type):
         """Complete keyword analysis for a product"""
         print(f"🔍 Starting keyword analysis for: {product_title}")
@@ -544,25 +596,27 @@ class SmartTrendsAnalyzer:
 trends_analyzer = SmartTrendsAnalyzer()
 seo_scorer = AdvancedSEOScorer()
 
-# Enhanced global state for processing
-processing_state = {
-    'is_running': False,
-    'progress': 0,
-    'total': 0,
-    'current_product': None,
-    'current_keywords': [],
-    'product_keywords_history': [],  # Store keywords for each processed product
-    'logs': [],
-    'start_time': None,
-    'stats': {
-        'processed': 0,
-        'successful': 0,
-        'failed': 0,
-        'trends_success': 0,
-        'total_keywords_analyzed': 0,
-        'avg_seo_score': 0
-    }
-}
+# The job store, event bus and worker pool are built on first use, so importing this module
+# opens no database
+_backend = {}
+_backend_lock = threading.RLock()
+
+def get_job_store():
+    """Jobs, per-product tasks and results in SQLite; workers pull tasks from the store"""
+    with _backend_lock:
+        if 'job_store' not in _backend:
+            _backend['job_store'] = JobStore()
+            # Stage timings and call counters of every process add up in the job store for /metrics
+            metrics.share_through(_backend['job_store'])
+        return _backend['job_store']
+
+def get_events():
+    """Log lines, progress and keyword changes, shared through the job store by every process
+    and pushed to dashboards over /api/events; a log line's sequence number is its event id"""
+    with _backend_lock:
+        if 'events' not in _backend:
+            _backend['events'] = EventBus(get_job_store())
+        return _backend['events']
 
 def add_log(message, log_type='info'):
     """Add a log entry with timestamp"""
@@ -572,14 +626,35 @@ def add_log(message, log_type='info'):
         'message': message,
         'type': log_type
     }
-    processing_state['logs'].append(log_entry)
-    
-    # Keep only last 150 logs (increased for more history)
-    if len(processing_state['logs']) > 150:
-        processing_state['logs'] = processing_state['logs'][-150:]
+    get_events().publish('log', log_entry)
     
     print(f"[{timestamp}] {message}")
 
+def publish_job_progress(job_id):
+    """Push a job's status and counters to the dashboards"""
+    job = get_job_store().get_job(job_id)
+    if not job:
+        return
+    stats = get_job_store().job_stats(job_id)
+    get_events().publish('progress', {
+        'job_id': job_id,
+        'job_status': job['status'],
+        'is_running': job['status'] in ACTIVE_JOB_STATUSES,
+        'progress': stats['processed'],
+        'total': stats['total'],
+        'stats': job_stats_summary(stats),
+        'elapsed_time': job_elapsed_time(job)
+    })
+
+def set_job_current(job_id, current):
+    """Record the product and keywords a job is working on and push them to the dashboards"""
+    get_job_store().set_current(job_id, current)
+    get_events().publish('keywords', {
+        'job_id': job_id,
+        'current_product': current.get('product'),
+        'current_keywords': current.get('keywords', [])
+    })
+
 @app.route('/')
 def index():
     """Serve the UI"""
@@ -654,11 +729,12 @@ def analyze_keywords():
         all_keywords = analysis_result['base_keywords'] + analysis_result['related_keywords']
         trends_data = analysis_result['trends_data']
         
+        product_context = seo_scorer.product_context(product_title, product_type)
         for keyword in all_keywords:
             keyword_trends = trends_data.get(keyword, {})
             seo_score = seo_scorer.calculate_seo_score(
                 keyword, keyword_trends, product_title, product_type, 
-                analysis_result['related_keywords']
+                analysis_result['related_keywords'], product_context
             )
             
             keyword_analysis.append({
@@ -698,50 +774,49 @@ def analyze_keywords():
 
 @app.route('/api/start', methods=['POST'])
 def start_optimization():
-    """Start the enhanced optimization process"""
-    if processing_state['is_running']:
-        return jsonify({'success': False, 'error': 'Optimization is already running'})
+    """Queue an enhanced optimization job; the worker pool picks it up.
     
+    Jobs for different stores run side by side; shopify_store/shopify_token select the
+    store (the .env store when omitted).
+    """
     try:
         data = request.json
         selected_fields = data.get('fields', [])
         limit = data.get('limit')
         skip_trends = data.get('skip_trends', False)
+        shopify_store = (data.get('shopify_store') or '').strip()
+        shopify_token = (data.get('shopify_token') or '').strip()
         
         if not selected_fields:
             return jsonify({'success': False, 'error': 'No fields selected for update'})
         
-        # Reset enhanced state
-        processing_state.update({
-            'is_running': True,
-            'progress': 0,
-            'total': 0,
-            'current_product': None,
-            'current_keywords': [],
-            'product_keywords_history': [],
-            'start_time': datetime.now(),
-            'stats': {
-                'processed': 0,
-                'successful': 0,
-                'failed': 0,
-                'trends_success': 0,
-                'total_keywords_analyzed': 0,
-                'avg_seo_score': 0
-            }
-        })
+        # A store from the Settings tab brings its own token; the .env store needs the .env ones
+        require_credentials('OPENAI_API_KEY', *([] if shopify_store and shopify_token else
+                                                ['SHOPIFY_STORE_NAME', 'SHOPIFY_ADMIN_TOKEN']))
         
-        # Start enhanced optimization in background
-        thread = threading.Thread(
-            target=run_enhanced_optimization,
-            args=(selected_fields, limit, skip_trends)
-        )
-        thread.daemon = True
-        thread.start()
+        params = {'fields': selected_fields, 'limit': limit, 'skip_trends': skip_trends}
+        secrets = None
+        store = 'default'
+        if shopify_store and shopify_token:
+            # The token is kept out of the saved params and deleted when the job ends
+            params['shopify_store'] = shopify_store
+            secrets = {'shopify_token': shopify_token}
+            store = store_domain(shopify_store)
+            if os.getenv("SHOPIFY_STORE_NAME") and store_domain(os.getenv("SHOPIFY_STORE_NAME")) == store:
+                store = 'default'  # The .env store under its own name
+        
+        # Two jobs on one store would both pick up the same tagged products
+        if get_job_store().active_jobs(store):
+            return jsonify({'success': False, 'error': 'Optimization is already running for this store'})
+        
+        job_id = get_job_store().create_job(params, store, secrets)
+        get_job_workers().wake()
         
-        add_log('🚀 Enhanced optimization process started with smart keyword analysis', 'success')
-        add_log(f'📝 Selected fields: {", ".join(selected_fields)}', 'info')
+        log = job_logger(get_job_store().get_job(job_id))
+        log(f'🚀 Enhanced optimization job {job_id} started with smart keyword analysis', 'success')
+        log(f'📝 Selected fields: {", ".join(selected_fields)}', 'info')
         
-        return jsonify({'success': True})
+        return jsonify({'success': True, 'job_id': job_id})
         
     except Exception as e:
         error_msg = f'Error starting optimization: {str(e)}'
@@ -751,37 +826,167 @@ def start_optimization():
 @app.route('/api/stop', methods=['POST'])
 def stop_optimization():
     """Stop the optimization process"""
-    processing_state['is_running'] = False
-    processing_state['current_keywords'] = []
+    job_id = (request.get_json(silent=True) or {}).get('job_id')
+    for job in get_job_store().active_jobs():
+        if job_id in (None, job['id']):
+            get_job_store().stop_job(job['id'])
+            publish_job_progress(job['id'])
     add_log('⏹️ Optimization process stopped by user', 'warning')
     return jsonify({'success': True})
 
+def requested_job():
+    """The job named by ?job_id=, else the most recent one"""
+    job_id = request.args.get('job_id')
+    return get_job_store().get_job(job_id) if job_id else get_job_store().latest_job()
+
 @app.route('/api/status')
 def get_status():
     """Get current processing status with enhanced data"""
-    elapsed_time = 0
-    if processing_state['start_time']:
-        elapsed_time = int((datetime.now() - processing_state['start_time']).total_seconds())
+    return jsonify(status_payload(requested_job()))
+
+@app.route('/api/events')
+def stream_events():
+    """Server-Sent Events: a status snapshot, then only new log lines, progress and keyword updates.
+    
+    Browsers resume from their Last-Event-ID after a reconnect; a client that fell
+    further behind than the event buffer gets a fresh snapshot instead.
+    """
+    job_id = request.args.get('job_id')
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
     
+    def snapshot():
+        return status_payload(get_job_store().get_job(job_id) if job_id else get_job_store().latest_job())
+    
+    return Response(stream_with_context(event_stream(get_events(), last_id, snapshot)),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def status_payload(job):
+    """The /api/status body for a job (or for no job yet)"""
+    if not job:
+        return {
+            'is_running': False, 'progress': 0, 'total': 0, 'current_product': None,
+            'current_keywords': [], 'product_keywords_history': [], 'stats': job_stats_summary(None),
+            'elapsed_time': 0, 'logs': recent_logs(15)
+        }
+    
+    stats = get_job_store().job_stats(job['id'])
+    return {
+        'job_id': job['id'],
+        'job_status': job['status'],
+        'is_running': job['status'] in ACTIVE_JOB_STATUSES,
+        'progress': stats['processed'],
+        'total': stats['total'],
+        'current_product': job['current'].get('product'),
+        'current_keywords': job['current'].get('keywords', []),
+        'product_keywords_history': get_job_store().keyword_history(job['id'], limit=5),  # Last 5 products
+        'stats': job_stats_summary(stats),
+        'elapsed_time': job_elapsed_time(job),
+        'logs': recent_logs(15)  # Last 15 logs
+    }
+
+def job_elapsed_time(job):
+    if not job['started_at']:
+        return 0
+    return int((job['finished_at'] or time.time()) - job['started_at'])
+
+def job_stats_summary(stats):
+    """The stats block of /api/status"""
+    keys = ['processed', 'successful', 'failed', 'trends_success', 'total_keywords_analyzed', 'avg_seo_score']
+    return {key: (stats or {}).get(key, 0) for key in keys}
+
+def log_entries(log_events):
+    return [dict(event['data'], seq=event['id']) for event in log_events]
+
+def recent_logs(limit):
+    return log_entries(get_job_store().recent_events('log', limit))
+
+@app.route('/api/logs')
+def get_logs():
+    """Log lines after sequence number ?since= (default 0), oldest first, at most ?limit= (default 200).
+    
+    'truncated' is true when lines after since have already been trimmed.
+    """
+    since = request.args.get('since', 0, type=int)
+    limit = min(max(request.args.get('limit', 200, type=int), 1), 1000)
+    oldest, newest = get_job_store().event_range()
+    logs = log_entries(get_job_store().events_since(since, 'log', limit))
     return jsonify({
-        'is_running': processing_state['is_running'],
-        'progress': processing_state['progress'],
-        'total': processing_state['total'],
-        'current_product': processing_state['current_product'],
-        'current_keywords': processing_state['current_keywords'],
-        'product_keywords_history': processing_state['product_keywords_history'][-5:],  # Last 5 products
-        'stats': processing_state['stats'],
-        'elapsed_time': elapsed_time,
-        'logs': processing_state['logs'][-15:]  # Last 15 logs
+        'success': True,
+        'logs': logs,
+        'next': logs[-1]['seq'] if logs else max(since, newest),
+        'truncated': oldest > since + 1
     })
 
 @app.route('/api/get-product-history')
 def get_product_history():
-    """Get keyword analysis history for all processed products"""
+    """Get keyword analysis history of a job, newest first, one page at a time.
+    
+    Query parameters: page (from 1), per_page (max 200), q (product title or best keyword),
+    min_score, success (true/false) and sort (recent or score).
+    """
+    job = requested_job()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+    success = request.args.get('success')
+    history, total = [], 0
+    if job:
+        history, total = get_job_store().keyword_history_page(
+            job['id'],
+            offset=(page - 1) * per_page,
+            limit=per_page,
+            search=request.args.get('q') or None,
+            min_score=request.args.get('min_score', type=float),
+            success=None if success is None else success.lower() in ('1', 'true', 'yes'),
+            order='score' if request.args.get('sort') == 'score' else 'recent'
+        )
     return jsonify({
         'success': True,
-        'product_history': processing_state['product_keywords_history'],
-        'total_products': len(processing_state['product_keywords_history'])
+        'product_history': history,
+        'total_products': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page
+    })
+
+@app.route('/api/jobs')
+def list_jobs():
+    """Recent jobs with their progress, newest first"""
+    jobs = []
+    for job in get_job_store().recent_jobs():
+        jobs.append({
+            'job_id': job['id'],
+            'store': job['store'],
+            'status': job['status'],
+            'fields': job['params'].get('fields', []),
+            'created_at': datetime.fromtimestamp(job['created_at']).isoformat(),
+            'stats': get_job_store().job_stats(job['id'])
+        })
+    return jsonify({'success': True, 'jobs': jobs})
+
+@app.route('/api/cache-stats')
+def get_cache_stats():
+    """Hit/miss counters for the Trends, generated content and image analysis caches, OpenAI prompt cache usage"""
+    return jsonify({
+        'success': True,
+        'trends_cache': trends_analyzer.keyword_cache.stats(),
+        'content_cache': get_content_cache().stats(),
+        'image_cache': get_image_cache().stats(),
+        'prompt_cache': get_prompt_cache_stats()
+    })
+
+@app.route('/metrics')
+def get_metrics():
+    """Stage timings, external calls, retries and cache lookups of all processes, in Prometheus text format"""
+    return Response(metrics.render(get_job_store()), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/rate-limits')
+def get_rate_limits():
+    """Current Shopify leaky-bucket usage per store"""
+    return jsonify({
+        'success': True,
+        'shopify': all_bucket_status()
     })
 
 @app.route('/api/test-connection', methods=['POST'])
@@ -802,15 +1007,13 @@ def test_connection():
         
         if store and token:
             try:
-                if not store.endswith('.myshopify.com'):
-                    if store.endswith('.myshopify'):
-                        store = store + '.com'
-                    elif not '.' in store:
-                        store = store + '.myshopify.com'
-                
-                base_url = f"https://{store}/admin/api/2023-07"
-                headers = {"Content-Type": "application/json", "X-Shopify-Access-Token": token}
-                response = requests.get(f"{base_url}/shop.json", headers=headers, timeout=10)
+                # One unretried request on a throwaway client: a bad store fails fast and typed-in
+                # credentials are not kept in the shared client registry
+                probe = ShopifyClient(shopify_base_url(store), token, max_retries=0, pool_size=1)
+                try:
+                    response = probe.get("shop.json", timeout=10)
+                finally:
+                    probe.session.close()
                 results['shopify'] = response.status_code == 200
                 
                 if results['shopify']:
@@ -824,6 +1027,7 @@ def test_connection():
         openai_key = data.get('openai_key') or os.getenv("OPENAI_API_KEY")
         if openai_key:
             try:
+                import requests
                 headers = {"Authorization": f"Bearer {openai_key}"}
                 response = requests.get("https://api.openai.com/v1/models", headers=headers, timeout=10)
                 results['openai'] = response.status_code == 200
@@ -841,8 +1045,8 @@ def test_connection():
                 success = trends_analyzer.initialize_trends()
                 if success:
                     # Test with a simple Danish keyword
-                    test_data = trends_analyzer.get_trends_data_batch(['kaffe'], timeframe='today 3-m')
-                    results['trends'] = len(test_data) > 0
+                    test_data = trends_analyzer.get_trends_data_batch(['kaffe'], timeframe='today 3-m', use_cache=False)
+                    results['trends'] = any(d['reliability'] != 'fallback' for d in test_data.values())
                     
                     if results['trends']:
                         add_log('✅ Google Trends: Available and tested', 'success')
@@ -866,196 +1070,249 @@ def test_connection():
         add_log(error_msg, 'error')
         return jsonify({'success': False, 'error': error_msg})
 
-def run_enhanced_optimization(selected_fields, limit, skip_trends):
-    """Enhanced optimization process with smart keyword analysis"""
+def shopify_base_url(store):
+    """Admin API base URL for a store name or domain"""
+    if not store.endswith('.myshopify.com'):
+        if store.endswith('.myshopify'):
+            store = store + '.com'
+        elif not '.' in store:
+            store = store + '.myshopify.com'
+    return f"https://{store}/admin/api/2023-07"
+
+def store_domain(store):
+    return shopify_base_url(store).split('/')[2]
+
+def job_shopify_client(job):
+    """The job's own store client, or None for the store configured in .env"""
+    params = job['params']
+    if not params.get('shopify_store'):
+        return None
+    token = get_job_store().job_secrets(job['id']).get('shopify_token')
+    if not token:
+        raise RuntimeError('No admin token for this store: the job has already finished or been stopped')
+    return get_client(shopify_base_url(params['shopify_store']), token)
+
+def job_logger(job):
+    """add_log that names the job's store, so lines of concurrent jobs can be told apart"""
+    store = job['store'] if job and job['store'] != 'default' else None
+    def log(message, log_type='info'):
+        add_log(f'[{store}] {message}' if store else message, log_type)
+    return log
+
+def discover_job_products(job):
+    """Stream a job's tagged products into its task list, with one keyword plan per window"""
+    log = job_logger(job)
+    job_id = job['id']
+    limit = job['params'].get('limit')
+    skip_trends = job['params'].get('skip_trends', False)
+    
+    # On resume, products already queued count toward the limit
+    known = get_job_store().task_count(job_id)
+    if limit and known >= limit:
+        return
+    log('🔍 Fetching products to optimize...', 'info')
+    
+    def plan(window):
+        # Trends once per distinct keyword across the whole window of products, for the
+        # keyword analysis and for content generation (whose lookups then hit the Trends cache)
+        if skip_trends or not get_job_store().is_active(job_id):
+            return {}
+        log(f'🗺️ Planning keywords for the next {len(window)} products...', 'info')
+        with metrics.timer('trends'):
+            _, content_keywords = keyword_candidates(window)
+            return trends_analyzer.plan_keywords(window, extra_keywords=content_keywords)
+    
+    products = prefetch(iter_products(limit=limit, client=job_shopify_client(job)))
+    added = 0
     try:
-        add_log('🔍 Fetching products to optimize...', 'info')
-        
-        products = fetch_products(limit=limit)
-        processing_state['total'] = len(products)
-        
-        if not products:
-            add_log('⚠️ No products found with needs_update tag', 'warning')
-            processing_state['is_running'] = False
-            return
-        
-        add_log(f'📦 Found {len(products)} products to process with enhanced keyword analysis', 'info')
-        
-        total_keywords_analyzed = 0
-        total_score_sum = 0
-        
-        # Process each product with enhanced analysis
-        for i, product in enumerate(products):
-            if not processing_state['is_running']:
+        for product, keyword_plan in planned(products, plan):
+            if not get_job_store().is_active(job_id):
                 break
+            if get_job_store().add_task(job_id, product, keyword_plan):
+                added += 1
+                if added == 1:
+                    log('📦 Found products to process with enhanced keyword analysis, more pages load in the background', 'info')
+                if added == 1 or added % 25 == 0:
+                    publish_job_progress(job_id)
+            if limit and known + added >= limit:
+                break
+    finally:
+        products.close()
+    
+    if not known and not added:
+        log('⚠️ No products found with needs_update tag', 'warning')
+
+def process_job_task(job, task):
+    """Keyword analysis and optimization of one product; returns the task result for the store"""
+    log = job_logger(job)
+    job_id = job['id']
+    product = task['product']
+    keyword_plan = task['plan']
+    selected_fields = job['params']['fields']
+    skip_trends = job['params'].get('skip_trends', False)
+    # Taken up front: a job stopped mid-product drops its store token
+    client = job_shopify_client(job)
+    
+    product_title = product.get('title', 'No title')
+    product_type = product.get('product_type', '')
+    product_id = product.get('id')
+    current_product = {
+        'id': product_id,
+        'title': product_title[:50],
+        'index': task['position'] + 1
+    }
+    set_job_current(job_id, {'product': current_product, 'keywords': []})
+    
+    log(f'Processing {task["position"] + 1}/{get_job_store().task_count(job_id)}: {product_id} - {product_title[:50]}...', 'info')
+    
+    result = {'success': False, 'keyword_count': 0, 'score_sum': 0, 'trends_ok': False}
+    product_keyword_data = None
+    
+    # Enhanced keyword analysis (even if trends are skipped, we do basic analysis)
+    try:
+        log(f'🎯 Analyzing keywords for: {product_title[:30]}...', 'info')
+        
+        if not skip_trends:
+            # Full analysis with Google Trends, from the window's keyword plan when available
+            with metrics.timer('trends'):
+                analysis_result = keyword_plan or trends_analyzer.analyze_product_keywords(product_title, product_type)
             
-            product_title = product.get('title', 'No title')
-            product_type = product.get('product_type', '')
-            product_id = product.get('id')
+            # Calculate SEO scores
+            keyword_analysis = []
+            all_keywords = analysis_result['base_keywords'] + analysis_result['related_keywords']
+            trends_data = analysis_result['trends_data']
             
-            processing_state['current_product'] = {
-                'id': product_id,
-                'title': product_title[:50],
-                'index': i + 1
-            }
+            product_context = seo_scorer.product_context(product_title, product_type)
+            for keyword in all_keywords:
+                keyword_trends = trends_data.get(keyword, {})
+                seo_score = seo_scorer.calculate_seo_score(
+                    keyword, keyword_trends, product_title, product_type,
+                    analysis_result['related_keywords'], product_context
+                )
+                
+                keyword_analysis.append({
+                    'keyword': keyword,
+                    'seo_score': seo_score,
+                    'trends_data': keyword_trends,
+                    'is_base_keyword': keyword in analysis_result['base_keywords']
+                })
+                
+                result['score_sum'] += seo_score['total_score']
+                result['keyword_count'] += 1
             
-            add_log(f'Processing {i+1}/{len(products)}: {product_id} - {product_title[:50]}...', 'info')
+            # Sort by score
+            keyword_analysis.sort(key=lambda x: x['seo_score']['total_score'], reverse=True)
             
-            product_keyword_data = None
+            # Update current keywords for real-time display
+            set_job_current(job_id, {'product': current_product, 'keywords': keyword_analysis[:8]})  # Top 8 for display
             
-            # Enhanced keyword analysis (even if trends are skipped, we do basic analysis)
-            try:
-                add_log(f'🎯 Analyzing keywords for: {product_title[:30]}...', 'info')
-                
-                if not skip_trends:
-                    # Full analysis with Google Trends
-                    analysis_result = trends_analyzer.analyze_product_keywords(product_title, product_type)
-                    
-                    # Calculate SEO scores
-                    keyword_analysis = []
-                    all_keywords = analysis_result['base_keywords'] + analysis_result['related_keywords']
-                    trends_data = analysis_result['trends_data']
-                    
-                    for keyword in all_keywords:
-                        keyword_trends = trends_data.get(keyword, {})
-                        seo_score = seo_scorer.calculate_seo_score(
-                            keyword, keyword_trends, product_title, product_type,
-                            analysis_result['related_keywords']
-                        )
-                        
-                        keyword_analysis.append({
-                            'keyword': keyword,
-                            'seo_score': seo_score,
-                            'trends_data': keyword_trends,
-                            'is_base_keyword': keyword in analysis_result['base_keywords']
-                        })
-                        
-                        total_score_sum += seo_score['total_score']
-                        total_keywords_analyzed += 1
-                    
-                    # Sort by score
-                    keyword_analysis.sort(key=lambda x: x['seo_score']['total_score'], reverse=True)
-                    
-                    # Update current keywords for real-time display
-                    processing_state['current_keywords'] = keyword_analysis[:8]  # Top 8 for display
-                    
-                    # Store in history
-                    product_keyword_data = {
-                        'product_id': product_id,
-                        'product_title': product_title,
-                        'keywords': keyword_analysis[:10],  # Store top 10
-                        'analysis_time': datetime.now().isoformat(),
-                        'total_keywords': len(keyword_analysis),
-                        'best_keyword': keyword_analysis[0]['keyword'] if keyword_analysis else None,
-                        'best_score': keyword_analysis[0]['seo_score']['total_score'] if keyword_analysis else 0,
-                        'avg_score': sum(k['seo_score']['total_score'] for k in keyword_analysis) / len(keyword_analysis) if keyword_analysis else 0
-                    }
-                    
-                    processing_state['product_keywords_history'].append(product_keyword_data)
-                    
-                    # Log best findings
-                    if keyword_analysis:
-                        best_keyword = keyword_analysis[0]
-                        add_log(f'🏆 Best keyword: "{best_keyword["keyword"]}" (Score: {best_keyword["seo_score"]["total_score"]}, Grade: {best_keyword["seo_score"]["grade"]})', 'success')
-                        
-                        # Log related keywords found
-                        related_count = len(analysis_result['related_keywords'])
-                        add_log(f'🔗 Found {related_count} related keywords for enhanced SEO', 'info')
-                        
-                        processing_state['stats']['trends_success'] += 1
-                else:
-                    # Basic keyword analysis without trends
-                    base_keywords = trends_analyzer.extract_base_keywords(product_title, product_type)
-                    keyword_analysis = []
-                    
-                    for keyword in base_keywords:
-                        # Basic scoring without trends data
-                        seo_score = seo_scorer.calculate_seo_score(
-                            keyword, {'interest': 50}, product_title, product_type
-                        )
-                        keyword_analysis.append({
-                            'keyword': keyword,
-                            'seo_score': seo_score,
-                            'trends_data': {'interest': 50, 'trend_direction': 'not_analyzed'},
-                            'is_base_keyword': True
-                        })
-                    
-                    processing_state['current_keywords'] = keyword_analysis
-                    add_log(f'📝 Basic keyword analysis: {len(base_keywords)} keywords identified', 'info')
-            
-            except Exception as e:
-                add_log(f'⚠️ Keyword analysis failed: {str(e)}', 'warning')
-                processing_state['current_keywords'] = []
+            # Store in history
+            product_keyword_data = {
+                'product_id': product_id,
+                'product_title': product_title,
+                'keywords': keyword_analysis[:10],  # Store top 10
+                'analysis_time': datetime.now().isoformat(),
+                'total_keywords': len(keyword_analysis),
+                'best_keyword': keyword_analysis[0]['keyword'] if keyword_analysis else None,
+                'best_score': keyword_analysis[0]['seo_score']['total_score'] if keyword_analysis else 0,
+                'avg_score': sum(k['seo_score']['total_score'] for k in keyword_analysis) / len(keyword_analysis) if keyword_analysis else 0
+            }
+            result['keywords'] = product_keyword_data
             
-            # Optimize the product
-            try:
-                success = optimize_product(product, selected_fields)
+            # Log best findings
+            if keyword_analysis:
+                best_keyword = keyword_analysis[0]
+                log(f'🏆 Best keyword: "{best_keyword["keyword"]}" (Score: {best_keyword["seo_score"]["total_score"]}, Grade: {best_keyword["seo_score"]["grade"]})', 'success')
                 
-                if success:
-                    processing_state['stats']['successful'] += 1
-                    add_log(f'✅ Successfully updated product {product_id}', 'success')
-                    
-                    # Add keyword data to success log
-                    if product_keyword_data:
-                        add_log(f'📊 SEO data: {product_keyword_data["total_keywords"]} keywords, best score: {product_keyword_data["best_score"]:.1f}', 'info')
-                else:
-                    processing_state['stats']['failed'] += 1
-                    add_log(f'❌ Failed to update product {product_id}', 'error')
-                
-                processing_state['stats']['processed'] += 1
-                processing_state['progress'] = i + 1
+                # Log related keywords found
+                related_count = len(analysis_result['related_keywords'])
+                log(f'🔗 Found {related_count} related keywords for enhanced SEO', 'info')
                 
-                # Update running averages
-                if total_keywords_analyzed > 0:
-                    processing_state['stats']['total_keywords_analyzed'] = total_keywords_analyzed
-                    processing_state['stats']['avg_seo_score'] = round(total_score_sum / total_keywords_analyzed, 1)
-                
-                # Enhanced delay based on analysis complexity
-                if not skip_trends:
-                    delay = 12  # Longer delay for trends analysis
-                    add_log(f'⏳ Waiting {delay}s before next product (respecting API limits)...', 'info')
-                else:
-                    delay = 3   # Shorter delay without trends
-                
-                time.sleep(delay)
-                
-            except Exception as e:
-                processing_state['stats']['failed'] += 1
-                add_log(f'❌ Error processing product {product_id}: {str(e)}', 'error')
-        
-        # Enhanced completion summary
-        processing_state['is_running'] = False
-        processing_state['current_product'] = None
-        processing_state['current_keywords'] = []
-        
-        stats = processing_state['stats']
-        add_log('🎉 Enhanced optimization process completed!', 'success')
-        add_log(f'📊 Final stats: {stats["successful"]}/{stats["processed"]} products updated successfully', 'info')
-        
-        if stats['trends_success'] > 0:
-            add_log(f'🎯 Google Trends analyzed for {stats["trends_success"]} products', 'info')
-            add_log(f'🔍 Total keywords analyzed: {stats["total_keywords_analyzed"]}', 'info')
-            add_log(f'📈 Average SEO score: {stats["avg_seo_score"]}', 'info')
-        
-        if stats['failed'] > 0:
-            add_log(f'⚠️ {stats["failed"]} products failed to update', 'warning')
-        
-        # Final summary of best findings
-        if processing_state['product_keywords_history']:
-            best_products = sorted(
-                processing_state['product_keywords_history'], 
-                key=lambda x: x['best_score'], 
-                reverse=True
-            )[:3]
+                result['trends_ok'] = True
+        else:
+            # Basic keyword analysis without trends
+            base_keywords = trends_analyzer.extract_base_keywords(product_title, product_type)
+            keyword_analysis = []
+            product_context = seo_scorer.product_context(product_title, product_type)
+            
+            for keyword in base_keywords:
+                # Basic scoring without trends data
+                seo_score = seo_scorer.calculate_seo_score(
+                    keyword, {'interest': 50}, product_title, product_type, context=product_context
+                )
+                keyword_analysis.append({
+                    'keyword': keyword,
+                    'seo_score': seo_score,
+                    'trends_data': {'interest': 50, 'trend_direction': 'not_analyzed'},
+                    'is_base_keyword': True
+                })
+            
+            set_job_current(job_id, {'product': current_product, 'keywords': keyword_analysis})
+            log(f'📝 Basic keyword analysis: {len(base_keywords)} keywords identified', 'info')
+    
+    except Exception as e:
+        log(f'⚠️ Keyword analysis failed: {str(e)}', 'warning')
+        set_job_current(job_id, {'product': current_product, 'keywords': []})
+    
+    # Optimize the product
+    try:
+        apply = functools.partial(update_product, client=client) if client else update_product
+        result['success'] = bool(optimize_product(product, selected_fields, use_trends=not skip_trends, apply=apply))
+        
+        if result['success']:
+            log(f'✅ Successfully updated product {product_id}', 'success')
             
-            add_log('🏆 Top 3 SEO performers:', 'success')
-            for i, product in enumerate(best_products, 1):
-                add_log(f'{i}. {product["product_title"][:30]} - Best keyword: "{product["best_keyword"]}" (Score: {product["best_score"]:.1f})', 'success')
+            # Add keyword data to success log
+            if product_keyword_data:
+                log(f'📊 SEO data: {product_keyword_data["total_keywords"]} keywords, best score: {product_keyword_data["best_score"]:.1f}', 'info')
+        else:
+            log(f'❌ Failed to update product {product_id}', 'error')
         
     except Exception as e:
-        processing_state['is_running'] = False
-        processing_state['current_keywords'] = []
-        add_log(f'❌ Enhanced optimization process error: {str(e)}', 'error')
+        result['error'] = str(e)
+        log(f'❌ Error processing product {product_id}: {str(e)}', 'error')
+    
+    metrics.inc(metrics.PRODUCTS, result='success' if result['success'] else 'failed')
+    return result
+
+def log_job_summary(job_id):
+    """Enhanced completion summary, logged once when a job completes"""
+    log = job_logger(get_job_store().get_job(job_id))
+    stats = get_job_store().job_stats(job_id)
+    log('🎉 Enhanced optimization process completed!', 'success')
+    log(f'📊 Final stats: {stats["successful"]}/{stats["processed"]} products updated successfully', 'info')
+    
+    if stats['trends_success'] > 0:
+        log(f'🎯 Google Trends analyzed for {stats["trends_success"]} products', 'info')
+        log(f'🔍 Total keywords analyzed: {stats["total_keywords_analyzed"]}', 'info')
+        log(f'📈 Average SEO score: {stats["avg_seo_score"]}', 'info')
+    
+    if stats['failed'] > 0:
+        log(f'⚠️ {stats["failed"]} products failed to update', 'warning')
+    
+    # Final summary of best findings
+    best_products, _ = get_job_store().keyword_history_page(job_id, limit=3, order='score')
+    if best_products:
+        log('🏆 Top 3 SEO performers:', 'success')
+        for i, product in enumerate(best_products, 1):
+            log(f'{i}. {product["product_title"][:30]} - Best keyword: "{product["best_keyword"]}" (Score: {product["best_score"]:.1f})', 'success')
+
+def get_job_workers():
+    """Worker pool that pulls tasks from the job store"""
+    with _backend_lock:
+        if 'job_workers' not in _backend:
+            _backend['job_workers'] = JobWorkers(get_job_store(), discover_job_products, process_job_task,
+                                                 finished=log_job_summary, changed=publish_job_progress)
+        return _backend['job_workers']
+
+def health_stats():
+    job = get_job_store().latest_job()
+    stats = get_job_store().job_stats(job['id']) if job else {}
+    return {
+        'products_processed_total': stats.get('processed', 0),
+        'keywords_analyzed_total': stats.get('total_keywords_analyzed', 0),
+        'current_avg_seo_score': stats.get('avg_seo_score', 0)
+    }
 
 @app.route('/health')
 def health_check():
@@ -1075,11 +1332,8 @@ def health_check():
             'shopify_optimizer_ui.html': os.path.exists('shopify_optimizer_ui.html'),
             '.env': os.path.exists('.env')
         },
-        'stats': {
-            'products_processed_total': len(processing_state['product_keywords_history']),
-            'keywords_analyzed_total': processing_state['stats']['total_keywords_analyzed'],
-            'current_avg_seo_score': processing_state['stats']['avg_seo_score']
-        }
+        'stats': health_stats(),
+        'trends_cache': trends_analyzer.keyword_cache.stats()
     })
 
 if __name__ == '__main__':
@@ -1098,6 +1352,10 @@ if __name__ == '__main__':
     print("🛑 Press Ctrl+C to stop the server")
     print("="*60)
     
+    # debug=True runs this file twice (reloader + server); workers belong in the server process
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_job_workers().start()
+    
     try:
         app.run(debug=True, host='0.0.0.0', port=5000)
     except Exception as e:
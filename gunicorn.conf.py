@@ -0,0 +1,18 @@
+"""
+Gunicorn settings for the web backend: gunicorn -c gunicorn.conf.py wsgi:app
+Web processes only serve requests; run python job_worker.py next to them for the jobs.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv('WEB_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_WORKERS', str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+# Threaded workers: each open dashboard holds one thread for its /api/events stream
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', '16'))
+timeout = 60
+# Event streams never end by themselves; don't hold up restarts waiting for them
+graceful_timeout = 5
+# Each process opens its own SQLite connections after the fork
+preload_app = False
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Per-image analysis cache
+Dropship catalogs reuse the same supplier photos across many products. Each image
+analysis is stored under its URL, the sha256 of the downloaded bytes and a perceptual
+difference hash (dHash), so re-hosted or re-compressed copies of a photo are analyzed once.
+dHash needs Pillow; without it only URL and exact-content matches are used.
+
+Near-duplicate lookups don't scan every stored hash: each dHash is split into
+IMAGE_DHASH_DISTANCE + 1 bands and indexed by band. Two hashes at most that many bits apart
+agree on at least one whole band, so only hashes sharing a band are compared.
+"""
+
+import hashlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import threading
+
+from cache_store import SqliteCache
+
+IMAGE_CACHE_TTL = float(os.getenv('IMAGE_CACHE_TTL_DAYS', '90')) * 86400
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv('IMAGE_CACHE_MAX_ENTRIES', '100000'))
+# Max differing bits (of 64) for two images to count as the same photo
+IMAGE_DHASH_DISTANCE = int(os.getenv('IMAGE_DHASH_DISTANCE', '4'))
+IMAGE_MAX_BYTES = 15 * 1024 * 1024
+DOWNLOAD_TIMEOUT = (5, 20)
+
+
+def dhash(data, size=8):
+    """64-bit difference hash of image bytes as hex, or None without Pillow / for unreadable images"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        img = Image.open(io.BytesIO(data)).convert('L').resize((size + 1, size), Image.LANCZOS)
+    except Exception:
+        return None
+    pixels = list(img.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:0{size * size // 4}x}"
+
+
+def hamming(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def dhash_bands(max_distance, bits=64):
+    """(shift, mask) of each band, max_distance + 1 bands (at least 2, so a band fits SQLite's INTEGER)"""
+    count = min(bits, max(2, max_distance + 1))
+    layout, shift = [], bits
+    for n in range(count):
+        width = bits // count + (n < bits % count)
+        shift -= width
+        layout.append((shift, (1 << width) - 1))
+    return layout
+
+
+class ImageAnalysisCache(SqliteCache):
+    """Image analyses keyed by URL, content hash and perceptual hash"""
+    def __init__(self, path=None, ttl=IMAGE_CACHE_TTL, max_entries=IMAGE_CACHE_MAX_ENTRIES,
+                 max_distance=IMAGE_DHASH_DISTANCE):
+        super().__init__('image_analysis_cache', path, ttl, max_entries)
+        self.max_distance = max_distance
+        self.bands = dhash_bands(max_distance)
+        self.near_hits = 0
+        import requests
+        self.session = requests.Session()
+        with self._lock:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS image_dhash_bands ('
+                'bands INTEGER NOT NULL, band INTEGER NOT NULL, value INTEGER NOT NULL, dhash TEXT NOT NULL, '
+                'PRIMARY KEY (bands, band, value, dhash))'
+            )
+            # Bands of another IMAGE_DHASH_DISTANCE, or a cache written before the band index
+            self._conn.execute('DELETE FROM image_dhash_bands WHERE bands != ?', (len(self.bands),))
+            if not self._conn.execute('SELECT 1 FROM image_dhash_bands LIMIT 1').fetchone():
+                rows = self._conn.execute(f'SELECT key FROM {self.table} WHERE key LIKE ?', ('["dhash", %',)).fetchall()
+                for (key,) in rows:
+                    self._index(json.loads(key)[1])
+            self._conn.commit()
+
+    def _band_values(self, image_hash):
+        bits = int(image_hash, 16)
+        return [(bits >> shift) & mask for shift, mask in self.bands]
+
+    def _index(self, image_hash):
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO image_dhash_bands (bands, band, value, dhash) VALUES (?, ?, ?, ?)',
+            [(len(self.bands), band, value, image_hash) for band, value in enumerate(self._band_values(image_hash))]
+        )
+
+    def _evict(self, now):
+        changes = self._conn.total_changes
+        super()._evict(now)
+        if self._conn.total_changes != changes:
+            self._conn.execute(
+                f"DELETE FROM image_dhash_bands WHERE NOT EXISTS "
+                f"(SELECT 1 FROM {self.table} WHERE key = '[\"dhash\", \"' || dhash || '\"]')"
+            )
+
+    def clear(self):
+        super().clear()
+        with self._lock:
+            self._conn.execute('DELETE FROM image_dhash_bands')
+            self._conn.commit()
+
+    def fingerprint(self, url):
+        """Download an image and hash it; None when it can't be fetched"""
+        try:
+            with self.session.get(url, timeout=DOWNLOAD_TIMEOUT, stream=True) as r:
+                r.raise_for_status()
+                data = r.raw.read(IMAGE_MAX_BYTES + 1, decode_content=True)
+        except Exception as e:
+            logging.warning(f"⚠️ Could not download image {url}: {e}")
+            return None
+        if len(data) > IMAGE_MAX_BYTES:
+            logging.warning(f"⚠️ Image too large to fingerprint: {url}")
+            return None
+        return {'sha256': hashlib.sha256(data).hexdigest(), 'dhash': dhash(data)}
+
+    def find_similar(self, image_hash):
+        """Analysis of the closest stored image within max_distance bits, if any"""
+        values = self._band_values(image_hash)
+        with self._lock:
+            # One index search per band (an OR of the bands would scan them all)
+            rows = self._conn.execute(
+                ' UNION '.join(['SELECT dhash FROM image_dhash_bands WHERE bands = ? AND band = ? AND value = ?'] * len(values)),
+                [arg for band, value in enumerate(values) for arg in (len(values), band, value)]
+            ).fetchall()
+        candidates = sorted((hamming(image_hash, h), h) for (h,) in rows)
+        for distance, candidate in candidates:
+            if distance > self.max_distance:
+                break
+            analysis = self.get('dhash', candidate, record=False)
+            if analysis is not None:
+                return analysis
+        return None
+
+    def lookup(self, url):
+        """(analysis or None, fingerprint or None) for an image URL"""
+        analysis = self.get('url', url, record=False)
+        if analysis is not None:
+            self.record(True)
+            return analysis, None
+        fp = self.fingerprint(url)
+        if fp:
+            analysis = self.get('sha256', fp['sha256'], record=False)
+        if analysis is None and fp and fp['dhash']:
+            analysis = self.get('dhash', fp['dhash'], record=False) or self.find_similar(fp['dhash'])
+            self.near_hits += analysis is not None
+        if analysis is None:
+            self.record(False)
+            return None, fp
+        self.record(True)
+        self.set(analysis, 'url', url)
+        return analysis, fp
+
+    def store(self, url, fp, analysis):
+        self.set(analysis, 'url', url)
+        if fp:
+            self.set(analysis, 'sha256', fp['sha256'])
+            if fp['dhash']:
+                self.set(analysis, 'dhash', fp['dhash'])
+                with self._lock:
+                    self._index(fp['dhash'])
+                    self._conn.commit()
+
+    def stats(self):
+        stats = super().stats()
+        stats['near_duplicate_hits'] = self.near_hits
+        stats['perceptual_hashing'] = importlib.util.find_spec('PIL') is not None
+        return stats
+
+
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+
+def get_image_cache():
+    """Process-wide ImageAnalysisCache instance"""
+    global _image_cache
+    with _image_cache_lock:
+        if _image_cache is None:
+            _image_cache = ImageAnalysisCache()
+        return _image_cache
@@ -0,0 +1,601 @@
+#!/usr/bin/env python3
+"""
+Durable optimization jobs for the web backend
+Jobs, their per-product tasks and task results live in SQLite, so a restarted server
+picks up where it stopped: finished products are never processed twice. A pool of
+worker threads pulls pending tasks from the store; status reads go to the store too.
+Several jobs (one per store) run at once: workers are shared between stores in turn.
+Log lines, dashboard events and metric totals are kept here as well, so every web server
+process sees what the worker process is doing.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+JOB_DB_PATH = os.getenv('JOB_DB_PATH', 'optimizer_jobs.db')
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+# Max products of one store in flight at once (0 = no cap beyond the worker pool)
+JOB_STORE_CONCURRENCY = int(os.getenv('JOB_STORE_CONCURRENCY', '0'))
+# A task interrupted this many times (crashes mid-product) is marked failed instead of retried
+TASK_MAX_ATTEMPTS = 3
+# Workers refresh their running tasks every TASK_HEARTBEAT_INTERVAL seconds; a running task
+# not refreshed for TASK_STALE_AFTER seconds belongs to a dead worker and is requeued
+TASK_HEARTBEAT_INTERVAL = 30
+TASK_STALE_AFTER = float(os.getenv('TASK_STALE_AFTER', '180'))
+ACTIVE_JOB_STATUSES = ('queued', 'running')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    store TEXT NOT NULL DEFAULT 'default',
+    params TEXT NOT NULL,
+    discovered INTEGER NOT NULL DEFAULT 0,
+    current TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    last_claimed_at REAL
+);
+CREATE TABLE IF NOT EXISTS job_secrets (
+    job_id TEXT PRIMARY KEY,
+    secrets TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    job_id TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    product TEXT NOT NULL,
+    plan TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job_id, product_id)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, job_id, position);
+CREATE INDEX IF NOT EXISTS tasks_position ON tasks (job_id, position);
+CREATE TABLE IF NOT EXISTS results (
+    job_id TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    error TEXT,
+    keywords TEXT,
+    keyword_count INTEGER NOT NULL DEFAULT 0,
+    score_sum REAL NOT NULL DEFAULT 0,
+    trends_ok INTEGER NOT NULL DEFAULT 0,
+    finished_at REAL NOT NULL,
+    product_title TEXT,
+    best_keyword TEXT,
+    best_score REAL,
+    PRIMARY KEY (job_id, product_id)
+);
+CREATE INDEX IF NOT EXISTS results_finished ON results (job_id, finished_at);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_type ON events (type, id);
+CREATE TABLE IF NOT EXISTS metrics (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+);
+"""
+
+
+def _loads(value):
+    return json.loads(value) if value else None
+
+
+class JobStore:
+    """Jobs, per-product tasks and results in one SQLite file"""
+    def __init__(self, path=None):
+        self.path = path or JOB_DB_PATH
+        self._lock = threading.Lock()
+        # Autocommit; claims take an IMMEDIATE transaction so they are atomic across processes
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # Deleted job secrets are overwritten, not left in free pages
+        self._conn.execute('PRAGMA secure_delete=ON')
+        self._conn.executescript(SCHEMA)
+        # Job databases created before multi-store scheduling
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+        if 'store' not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN store TEXT NOT NULL DEFAULT 'default'")
+        if 'last_claimed_at' not in columns:
+            self._conn.execute('ALTER TABLE jobs ADD COLUMN last_claimed_at REAL')
+        # Results recorded before history filtering: copy the fields out of the keywords JSON
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(results)')}
+        if 'best_score' not in columns:
+            for column, kind in (('product_title', 'TEXT'), ('best_keyword', 'TEXT'), ('best_score', 'REAL')):
+                self._conn.execute(f'ALTER TABLE results ADD COLUMN {column} {kind}')
+            self._conn.execute(
+                "UPDATE results SET product_title = json_extract(keywords, '$.product_title'), "
+                "best_keyword = json_extract(keywords, '$.best_keyword'), "
+                "best_score = json_extract(keywords, '$.best_score') WHERE keywords IS NOT NULL"
+            )
+
+        # Jobs created when the store token was kept in params: move it out
+        if self._conn.execute("SELECT 1 FROM jobs WHERE json_extract(params, '$.shopify_token') IS NOT NULL LIMIT 1").fetchone():
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.execute(
+                "INSERT OR IGNORE INTO job_secrets (job_id, secrets) "
+                "SELECT id, json_object('shopify_token', json_extract(params, '$.shopify_token')) FROM jobs "
+                f"WHERE json_extract(params, '$.shopify_token') IS NOT NULL AND status IN ({','.join('?' * len(ACTIVE_JOB_STATUSES))})",
+                ACTIVE_JOB_STATUSES
+            )
+            self._conn.execute("UPDATE jobs SET params = json_remove(params, '$.shopify_token')")
+            self._conn.execute('COMMIT')
+
+    def _job(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = _loads(job['params'])
+        job['current'] = _loads(job['current']) or {}
+        return job
+
+    # Jobs
+
+    def create_job(self, params, store='default', secrets=None):
+        """Queue a job; secrets (e.g. the store's admin token) are kept apart from params,
+        never returned with the job and deleted once it is completed or stopped"""
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.execute(
+                'INSERT INTO jobs (id, status, store, params, created_at) VALUES (?, ?, ?, ?, ?)',
+                (job_id, 'queued', store, json.dumps(params, ensure_ascii=False), time.time())
+            )
+            if secrets:
+                self._conn.execute('INSERT INTO job_secrets (job_id, secrets) VALUES (?, ?)',
+                                   (job_id, json.dumps(secrets)))
+            self._conn.execute('COMMIT')
+        return job_id
+
+    def job_secrets(self, job_id):
+        """Secrets of a job that is not finished yet ({} otherwise)"""
+        with self._lock:
+            row = self._conn.execute('SELECT secrets FROM job_secrets WHERE job_id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def get_job(self, job_id):
+        with self._lock:
+            return self._job(self._conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone())
+
+    def latest_job(self):
+        with self._lock:
+            return self._job(self._conn.execute('SELECT * FROM jobs ORDER BY created_at DESC LIMIT 1').fetchone())
+
+    def active_jobs(self, store=None):
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT * FROM jobs WHERE status IN ({",".join("?" * len(ACTIVE_JOB_STATUSES))}) ORDER BY created_at',
+                ACTIVE_JOB_STATUSES
+            ).fetchall()
+        return [self._job(row) for row in rows if store is None or row['store'] == store]
+
+    def recent_jobs(self, limit=20):
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def is_active(self, job_id):
+        job = self.get_job(job_id)
+        return bool(job) and job['status'] in ACTIVE_JOB_STATUSES
+
+    def start_job(self, job_id):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?) WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+
+    def set_current(self, job_id, current):
+        """What a worker is doing right now (product and its top keywords), for status display"""
+        with self._lock:
+            self._conn.execute('UPDATE jobs SET current = ? WHERE id = ?',
+                               (json.dumps(current, ensure_ascii=False), job_id))
+
+    def discovery_done(self, job_id, error=None):
+        with self._lock:
+            self._conn.execute('UPDATE jobs SET discovered = 1, error = COALESCE(?, error) WHERE id = ?', (error, job_id))
+
+    def stop_job(self, job_id):
+        """Stop a job: pending tasks are cancelled, products already in progress still finish"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            stopped = self._conn.execute(
+                f"UPDATE jobs SET status = 'stopped', current = NULL, finished_at = ? "
+                f"WHERE id = ? AND status IN ({','.join('?' * len(ACTIVE_JOB_STATUSES))})",
+                (time.time(), job_id, *ACTIVE_JOB_STATUSES)
+            ).rowcount
+            self._conn.execute("UPDATE tasks SET status = 'cancelled', updated_at = ? WHERE job_id = ? AND status = 'pending'",
+                               (time.time(), job_id))
+            # Products in flight already hold their store client
+            self._conn.execute('DELETE FROM job_secrets WHERE job_id = ?', (job_id,))
+            self._conn.execute('COMMIT')
+        return bool(stopped)
+
+    def finish_job_if_done(self, job_id):
+        """Mark a fully discovered job with no open tasks completed; True only for the caller that did it"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            done = self._conn.execute(
+                "UPDATE jobs SET status = 'completed', current = NULL, finished_at = ? "
+                "WHERE id = ? AND status = 'running' AND discovered = 1 AND NOT EXISTS "
+                "(SELECT 1 FROM tasks WHERE job_id = ? AND status IN ('pending', 'running'))",
+                (time.time(), job_id, job_id)
+            ).rowcount
+            if done:
+                self._conn.execute('DELETE FROM job_secrets WHERE job_id = ?', (job_id,))
+            self._conn.execute('COMMIT')
+        return bool(done)
+
+    def jobs_to_discover(self):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM jobs WHERE discovered = 0 AND status IN ({','.join('?' * len(ACTIVE_JOB_STATUSES))}) "
+                "ORDER BY created_at", ACTIVE_JOB_STATUSES
+            ).fetchall()
+        return [self._job(row) for row in rows]
+
+    # Tasks
+
+    def add_task(self, job_id, product, plan=None):
+        """Queue one product of a job; False if the job already has it"""
+        with self._lock:
+            return bool(self._conn.execute(
+                'INSERT OR IGNORE INTO tasks (job_id, product_id, position, product, plan, updated_at) '
+                'VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM tasks WHERE job_id = ?), ?, ?, ?)',
+                (job_id, str(product.get('id')), job_id, json.dumps(product, ensure_ascii=False),
+                 json.dumps(plan, ensure_ascii=False) if plan else None, time.time())
+            ).rowcount)
+
+    def task_count(self, job_id):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM tasks WHERE job_id = ?', (job_id,)).fetchone()[0]
+
+    def claim_task(self, worker, store_concurrency=JOB_STORE_CONCURRENCY):
+        """Atomically take the next pending task, sharing workers fairly between stores.
+
+        The job whose store has the fewest products in flight goes first, then the job
+        with the fewest in flight, then the one served longest ago.
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                job = self._conn.execute(
+                    "SELECT j.id, "
+                    "(SELECT COUNT(*) FROM tasks t JOIN jobs s ON s.id = t.job_id "
+                    " WHERE t.status = 'running' AND s.store = j.store) AS store_running, "
+                    "(SELECT COUNT(*) FROM tasks t WHERE t.job_id = j.id AND t.status = 'running') AS job_running "
+                    "FROM jobs j WHERE j.status = 'running' AND EXISTS "
+                    "(SELECT 1 FROM tasks t WHERE t.job_id = j.id AND t.status = 'pending') "
+                    "AND (? = 0 OR store_running < ?) "
+                    "ORDER BY store_running, job_running, COALESCE(j.last_claimed_at, 0), j.created_at LIMIT 1",
+                    (store_concurrency, store_concurrency)
+                ).fetchone()
+                row = None
+                if job is not None:
+                    row = self._conn.execute(
+                        "SELECT * FROM tasks WHERE job_id = ? AND status = 'pending' ORDER BY position LIMIT 1", (job['id'],)
+                    ).fetchone()
+                    now = time.time()
+                    self._conn.execute(
+                        "UPDATE tasks SET status = 'running', attempts = attempts + 1, worker = ?, updated_at = ? "
+                        "WHERE job_id = ? AND product_id = ?",
+                        (worker, now, row['job_id'], row['product_id'])
+                    )
+                    self._conn.execute('UPDATE jobs SET last_claimed_at = ? WHERE id = ?', (now, job['id']))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        if row is None:
+            return None
+        task = dict(row)
+        task['product'] = _loads(task['product'])
+        task['plan'] = _loads(task['plan'])
+        task['attempts'] += 1
+        return task
+
+    def finish_task(self, task, result):
+        """Record a task's result: {success, error, keywords, keyword_count, score_sum, trends_ok}"""
+        now = time.time()
+        keywords = result.get('keywords') or {}
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.execute(
+                'INSERT OR REPLACE INTO results (job_id, product_id, success, error, keywords, keyword_count, '
+                'score_sum, trends_ok, finished_at, product_title, best_keyword, best_score) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (task['job_id'], task['product_id'], int(bool(result.get('success'))), result.get('error'),
+                 json.dumps(keywords, ensure_ascii=False) if keywords else None,
+                 result.get('keyword_count', 0), result.get('score_sum', 0), int(bool(result.get('trends_ok'))), now,
+                 keywords.get('product_title'), keywords.get('best_keyword'), keywords.get('best_score'))
+            )
+            self._conn.execute(
+                'UPDATE tasks SET status = ?, updated_at = ? WHERE job_id = ? AND product_id = ?',
+                ('done' if result.get('success') else 'failed', now, task['job_id'], task['product_id'])
+            )
+            self._conn.execute('COMMIT')
+
+    def heartbeat(self, workers):
+        """Mark the tasks the named workers are running as still alive"""
+        workers = list(workers)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE tasks SET updated_at = ? WHERE status = 'running' AND worker IN ({','.join('?' * len(workers))})",
+                (time.time(), *workers)
+            )
+
+    def recover(self, stale_after=TASK_STALE_AFTER):
+        """Tasks of dead workers (running, no heartbeat for stale_after seconds) go back to pending,
+        or fail after TASK_MAX_ATTEMPTS; tasks of live workers in any process are left alone"""
+        with self._lock:
+            now = time.time()
+            stale = now - stale_after
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (job_id, product_id, success, error, finished_at) "
+                    "SELECT job_id, product_id, 0, 'interrupted ' || attempts || ' times', ? FROM tasks "
+                    "WHERE status = 'running' AND updated_at < ? AND attempts >= ?", (now, stale, TASK_MAX_ATTEMPTS)
+                )
+                failed = self._conn.execute(
+                    "UPDATE tasks SET status = 'failed', updated_at = ? WHERE status = 'running' AND updated_at < ? AND attempts >= ?",
+                    (now, stale, TASK_MAX_ATTEMPTS)
+                ).rowcount
+                requeued = self._conn.execute(
+                    "UPDATE tasks SET status = 'pending', worker = NULL, updated_at = ? WHERE status = 'running' AND updated_at < ?",
+                    (now, stale)
+                ).rowcount
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return requeued, failed
+
+    # Reporting
+
+    def job_stats(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(success), 0), COALESCE(SUM(trends_ok), 0), '
+                'COALESCE(SUM(keyword_count), 0), COALESCE(SUM(score_sum), 0) FROM results WHERE job_id = ?', (job_id,)
+            ).fetchone()
+            total = self._conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE job_id = ? AND status != 'cancelled'", (job_id,)
+            ).fetchone()[0]
+        processed, successful, trends_success, keywords, score_sum = row
+        return {
+            'total': total,
+            'processed': processed,
+            'successful': successful,
+            'failed': processed - successful,
+            'trends_success': trends_success,
+            'total_keywords_analyzed': keywords,
+            'avg_seo_score': round(score_sum / keywords, 1) if keywords else 0
+        }
+
+    def keyword_history(self, job_id, limit=None):
+        """Keyword analyses of a job's finished products, oldest first (the last limit if given)"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT keywords FROM results WHERE job_id = ? AND keywords IS NOT NULL ORDER BY finished_at DESC LIMIT ?',
+                (job_id, -1 if limit is None else limit)
+            ).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def keyword_history_page(self, job_id, offset=0, limit=50, search=None, min_score=None, success=None, order='recent'):
+        """One page of a job's keyword analyses, filtered in SQL; returns (analyses, number matching).
+
+        search matches the product title or best keyword, min_score the best keyword's score,
+        success whether the product update went through. order is 'recent' or 'score'.
+        """
+        where = ['job_id = ?', 'keywords IS NOT NULL']
+        args = [job_id]
+        if search:
+            where.append("(product_title LIKE ? ESCAPE '\\' OR best_keyword LIKE ? ESCAPE '\\')")
+            pattern = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            args += [pattern, pattern]
+        if min_score is not None:
+            where.append('best_score >= ?')
+            args.append(min_score)
+        if success is not None:
+            where.append('success = ?')
+            args.append(int(bool(success)))
+        condition = ' AND '.join(where)
+        order_by = 'best_score DESC, finished_at DESC' if order == 'score' else 'finished_at DESC'
+        with self._lock:
+            total = self._conn.execute(f'SELECT COUNT(*) FROM results WHERE {condition}', args).fetchone()[0]
+            rows = self._conn.execute(
+                f'SELECT product_id, success, error, keywords FROM results WHERE {condition} '
+                f'ORDER BY {order_by} LIMIT ? OFFSET ?', args + [limit, offset]
+            ).fetchall()
+        page = []
+        for row in rows:
+            analysis = json.loads(row['keywords'])
+            analysis.update(success=bool(row['success']), error=row['error'])
+            page.append(analysis)
+        return page, total
+
+
+    # Events (log lines, progress, keyword updates), shared by every process using the store
+
+    def add_event(self, event_type, data, keep=None):
+        """Append an event; returns its id. Only the newest keep events are retained."""
+        with self._lock:
+            event_id = self._conn.execute(
+                'INSERT INTO events (type, data, created_at) VALUES (?, ?, ?)',
+                (event_type, json.dumps(data, ensure_ascii=False, default=str), time.time())
+            ).lastrowid
+            if keep and event_id % 100 == 0:
+                self._conn.execute('DELETE FROM events WHERE id <= ?', (event_id - keep,))
+        return event_id
+
+    def events_since(self, last_id, event_type=None, limit=None):
+        """Events with an id above last_id, oldest first: [{id, type, data}]"""
+        query = 'SELECT id, type, data FROM events WHERE id > ?'
+        args = [last_id]
+        if event_type:
+            query += ' AND type = ?'
+            args.append(event_type)
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY id LIMIT ?', args + [-1 if limit is None else limit]).fetchall()
+        return [{'id': row['id'], 'type': row['type'], 'data': json.loads(row['data'])} for row in rows]
+
+    def recent_events(self, event_type, limit):
+        """The last limit events of a type, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, type, data FROM events WHERE type = ? ORDER BY id DESC LIMIT ?', (event_type, limit)
+            ).fetchall()
+        return [{'id': row['id'], 'type': row['type'], 'data': json.loads(row['data'])} for row in reversed(rows)]
+
+    def event_range(self):
+        """(oldest, newest) retained event id; (0, 0) before the first event"""
+        with self._lock:
+            oldest, newest = self._conn.execute('SELECT MIN(id), MAX(id) FROM events').fetchone()
+        return oldest or 0, newest or 0
+
+    # Metrics
+
+    def add_metrics(self, increments):
+        """Add one process's metric increments [(name, labels JSON, amount)] to the shared totals"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany(
+                    'INSERT INTO metrics (name, labels, value) VALUES (?, ?, ?) '
+                    'ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value',
+                    increments
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def metric_totals(self):
+        """[(name, labels JSON, value)] summed over all processes"""
+        with self._lock:
+            return [tuple(row) for row in self._conn.execute('SELECT name, labels, value FROM metrics')]
+
+
+class JobWorkers:
+    """Worker threads pulling tasks from a JobStore.
+
+    discover(job) streams a job's products into the store (add_task); process(job, task)
+    handles one product and returns its result dict; finished(job_id) runs once per
+    completed job; changed(job_id) runs whenever a job's status or progress moved.
+    """
+    def __init__(self, store, discover, process, finished=None, size=JOB_WORKERS, poll_interval=1.0, changed=None):
+        self.store = store
+        self.discover = discover
+        self.process = process
+        self.finished = finished
+        self.changed = changed
+        self.size = size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._discovering = set()
+        self._discovering_lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        self._recover()
+        names = [f"worker-{os.getpid()}-{n}" for n in range(self.size)]
+        for name in names:
+            thread = threading.Thread(target=self._work, args=(name,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        threading.Thread(target=self._heartbeat, args=(names,), daemon=True).start()
+        self.wake()
+
+    def _recover(self):
+        requeued, failed = self.store.recover()
+        if requeued or failed:
+            logging.info(f"♻️ Resuming jobs: {requeued} interrupted products requeued, {failed} given up after {TASK_MAX_ATTEMPTS} attempts")
+            self.wake()
+
+    def _heartbeat(self, names):
+        """Keep this pool's running tasks fresh and pick up tasks of workers that died"""
+        while True:
+            time.sleep(TASK_HEARTBEAT_INTERVAL)
+            try:
+                self.store.heartbeat(names)
+                self._recover()
+            except Exception as e:
+                logging.error(f"❌ Job store error: {e}")
+
+    def wake(self):
+        """New work is available (a job was queued)"""
+        self._wake.set()
+
+    def _start_discoveries(self):
+        for job in self.store.jobs_to_discover():
+            with self._discovering_lock:
+                if job['id'] in self._discovering:
+                    continue
+                self._discovering.add(job['id'])
+            threading.Thread(target=self._discover, args=(job,), daemon=True).start()
+
+    def _discover(self, job):
+        self.store.start_job(job['id'])
+        self._changed(job['id'])
+        error = None
+        try:
+            self.discover(job)
+        except Exception as e:
+            error = str(e)
+            logging.error(f"❌ Product discovery failed for job {job['id']}: {e}")
+        finally:
+            self.store.discovery_done(job['id'], error)
+            with self._discovering_lock:
+                self._discovering.discard(job['id'])
+            self._finish(job['id'])
+
+    def _finish(self, job_id):
+        done = self.store.finish_job_if_done(job_id)
+        self._changed(job_id)
+        if done and self.finished:
+            self.finished(job_id)
+
+    def _changed(self, job_id):
+        if self.changed:
+            try:
+                self.changed(job_id)
+            except Exception as e:
+                logging.error(f"❌ Job change notification failed for job {job_id}: {e}")
+
+    def _work(self, name):
+        while True:
+            try:
+                self._start_discoveries()
+                task = self.store.claim_task(name)
+            except Exception as e:
+                logging.error(f"❌ Job store error: {e}")
+                task = None
+            if task is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            job = self.store.get_job(task['job_id'])
+            try:
+                result = self.process(job, task)
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            self.store.finish_task(task, result)
+            self._finish(task['job_id'])
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Optimization job worker for production serving
+Runs the backend's worker pool (JOB_WORKERS threads) in its own process, next to the web
+server processes started from wsgi.py. Jobs queued by any web process are picked up
+from the shared job store; progress, logs and results go back to it.
+
+Several job workers (and a development server) can share one job database: products
+left running by a worker that stopped sending heartbeats for TASK_STALE_AFTER seconds
+are requeued, while those of live workers are left alone.
+
+    python job_worker.py
+"""
+
+import signal
+import sys
+import threading
+
+from flask_backend import get_job_workers, add_log
+
+
+def main():
+    job_workers = get_job_workers()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    print(f"⚙️ Starting optimization job worker ({job_workers.size} threads)...")
+    job_workers.start()
+    add_log('⚙️ Job worker started, waiting for optimization jobs', 'info')
+
+    try:
+        while not stop.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    # Products still in flight are requeued by any worker once they go stale
+    print("🛑 Job worker stopped")
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
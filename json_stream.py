@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Incremental JSON object parser for streamed LLM output
+Text is fed in as it arrives; each top-level member of the object is decoded the moment
+its value is complete, so callers can validate fields long before the response ends.
+"""
+
+import json
+
+
+class IncrementalJSONParser:
+    """Tracks one top-level JSON object across streamed chunks"""
+    def __init__(self, max_preamble=200):
+        self.buffer = ''
+        self.fields = {}
+        self.complete = False
+        self.max_preamble = max_preamble
+        self._pos = 0
+        self._start = None
+        self._member_start = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        """Add streamed text; returns [(key, value)] for members it completed.
+
+        Raises ValueError as soon as the output can't be the expected JSON object.
+        """
+        self.buffer += text
+        buf = self.buffer
+        completed = []
+        while self._pos < len(buf) and not self.complete:
+            ch = buf[self._pos]
+            if self._start is None:
+                # Skip code fences or a short preamble before the object
+                if ch == '{':
+                    self._start = self._pos
+                    self._member_start = self._pos + 1
+                    self._depth = 1
+                elif self._pos >= self.max_preamble:
+                    raise ValueError(f"no JSON object in the first {self.max_preamble} characters")
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    completed += self._member(buf[self._member_start:self._pos])
+                    self.complete = True
+            elif ch == ',' and self._depth == 1:
+                completed += self._member(buf[self._member_start:self._pos])
+                self._member_start = self._pos + 1
+            self._pos += 1
+        return completed
+
+    def _member(self, text):
+        if not text.strip():
+            return []
+        try:
+            member = json.loads('{' + text + '}')
+        except ValueError:
+            raise ValueError(f"invalid JSON member: {text.strip()[:80]!r}")
+        self.fields.update(member)
+        return list(member.items())
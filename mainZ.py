@@ -4,22 +4,69 @@ import time
 import re
 import json
 import logging
-import requests
 import argparse
+import functools
+import hashlib
+import itertools
+import queue
+import threading
 from dotenv import load_dotenv
-from openai import OpenAI
-from pytrends.request import TrendReq
+from cache_store import get_trends_cache, get_content_cache, normalize_keyword
+from shopify_client import get_client
+from shopify_bulk import BulkUpdateCollector
+from image_cache import get_image_cache
+from json_stream import IncrementalJSONParser
+from trends_batch import fetch_interest, planned, trends_pacer, TRENDS_ANCHOR_KEYWORD
+from vendor_matcher import get_vendor_matcher
+import metrics
 
 load_dotenv()
 STORE = os.getenv("SHOPIFY_STORE_NAME")
 TOKEN = os.getenv("SHOPIFY_ADMIN_TOKEN")
 API = os.getenv("OPENAI_API_KEY")
-if not all([STORE, TOKEN, API]):
-    raise SystemExit("❌ Missing credentials in .env file")
-BASE = f"https://{STORE}/admin/api/2023-07"
+CREDENTIALS = {"SHOPIFY_STORE_NAME": STORE, "SHOPIFY_ADMIN_TOKEN": TOKEN, "OPENAI_API_KEY": API}
+BASE = os.getenv("SHOPIFY_API_BASE") or f"https://{STORE}/admin/api/2023-07"
+FETCH_MODE = os.getenv("SHOPIFY_FETCH_MODE", "graphql")
 HEADERS = {"Content-Type": "application/json", "X-Shopify-Access-Token": TOKEN}
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
-client = OpenAI(api_key=API)
+
+class MissingCredentials(RuntimeError):
+    """A service was used without its credentials in .env"""
+
+def require_credentials(*names):
+    """Raise MissingCredentials unless every named .env credential is set"""
+    missing = [name for name in names if not CREDENTIALS[name]]
+    if missing:
+        raise MissingCredentials(f"❌ Missing credentials in .env file: {', '.join(missing)}")
+
+# API clients are built on first use, so keyword tests and imports need neither credentials nor the openai package
+_api_clients = {}
+_api_clients_lock = threading.Lock()
+
+def get_openai():
+    """Shared OpenAI client"""
+    with _api_clients_lock:
+        if 'openai' not in _api_clients:
+            require_credentials("OPENAI_API_KEY")
+            from openai import OpenAI, DefaultHttpxClient
+            _api_clients['openai'] = OpenAI(api_key=API, http_client=DefaultHttpxClient(
+                event_hooks={'request': [metrics.count_openai_request]}))
+        return _api_clients['openai']
+
+def get_shopify():
+    """Shared client for the store configured in .env"""
+    require_credentials("SHOPIFY_STORE_NAME", "SHOPIFY_ADMIN_TOKEN")
+    return get_client(BASE, TOKEN)
+
+TRENDS_TIMEFRAME = 'today 12-m'
+# The Trends, content and image caches (get_trends_cache() etc.) open their database on first use too
+# 'use' reads and stores generated content, 'refresh' regenerates and overwrites, 'off' bypasses the cache
+CONTENT_CACHE_MODE = os.getenv('CONTENT_CACHE_MODE', 'use')
+# Fused mode sends the images with the content prompt: one GPT-4o call per product instead of two
+FUSED_GENERATION = os.getenv('FUSED_GENERATION', 'false').lower() in ('1', 'true', 'yes')
+# Streamed generation is parsed as it arrives and aborted as soon as the output goes off-schema
+STREAM_GENERATION = os.getenv('STREAM_GENERATION', 'false').lower() in ('1', 'true', 'yes')
+STREAM_ATTEMPTS = 2
 
 SUBCATEGORY_MAP = {
     # Hjem & Indretning
@@ -247,7 +294,7 @@ def calculate_seo_score(keyword, interest, trend_direction, is_base=True):
     """Calculate SEO score for keyword based on multiple factors"""
     base_score = 50
     
-    # Interest score (0-100) adds up to 30 points
+    # Interest (anchor-scaled, the anchor averages 50) adds up to 30 points
     interest_points = min(30, (interest / 100) * 30)
     
     # Trend direction bonus/penalty
@@ -292,30 +339,49 @@ def calculate_seo_score(keyword, interest, trend_direction, is_base=True):
         "base_bonus": base_bonus
     }
 
+class LazyTrendReq:
+    """pytrends session created on first use, so fully cached runs never contact Google"""
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._req = None
+    
+    def __getattr__(self, name):
+        if self._req is None:
+            from pytrends.request import TrendReq  # Loads pandas; only needed when a lookup misses the cache
+            self._req = TrendReq(**self._kwargs)
+        return getattr(self._req, name)
+
 def extract_smart_keywords_with_trends(title, region='DK', language='da-DK', max_related=3):
     """Faster keyword extraction with reduced complexity for better performance"""
     try:
         # Faster, more conservative settings
-        pytrends = TrendReq(hl=language, tz=360, retries=1, backoff_factor=1, timeout=(5, 15))
+        pytrends = LazyTrendReq(hl=language, tz=360, retries=1, backoff_factor=1, timeout=(5, 15))
         base_keyword = extract_keyword(title)
         keywords_data = []
         
         logging.info(f"🔍 Quick keyword analysis for: '{base_keyword}'")
         
-        # Try main keyword with timeout
-        main_data = get_keyword_trends_data_fast(pytrends, base_keyword, region, is_base=True)
+        # A base keyword already known to have no Trends data (planned or cached) has no related
+        # queries either; otherwise related keywords come first, so the main keyword and up to
+        # 2 related ones share one anchored payload
+        trends_cache = get_trends_cache()
+        if trends_cache.get_series(base_keyword, region, TRENDS_TIMEFRAME, TRENDS_ANCHOR_KEYWORD, record=False) == []:
+            related_keywords = []
+        else:
+            related_keywords = get_related_keywords_fast(pytrends, base_keyword, max_related, region)[:2]
+        interest = fetch_interest(pytrends, [base_keyword] + related_keywords, region, TRENDS_TIMEFRAME, trends_cache)
+        
+        main_data = trends_keyword_data(base_keyword, interest.get(base_keyword), is_base=True)
         if main_data:
             keywords_data.append(main_data)
             logging.info(f"✅ Main keyword: {main_data['seo_score']['total_score']}/100")
         
-        # Get fewer related keywords for speed
-        if len(keywords_data) > 0:  # Only if main keyword worked
-            related_keywords = get_related_keywords_fast(pytrends, base_keyword, max_related)
-            for related in related_keywords[:2]:  # Maximum 2 related keywords
-                related_data = get_keyword_trends_data_fast(pytrends, related, region, is_base=False)
-                if related_data:
-                    keywords_data.append(related_data)
-                    logging.info(f"✅ Related: '{related}' ({related_data['seo_score']['total_score']}/100)")
+        # Related keywords with data count even when the main keyword has none
+        for related in related_keywords:
+            related_data = trends_keyword_data(related, interest.get(related), is_base=False)
+            if related_data:
+                keywords_data.append(related_data)
+                logging.info(f"✅ Related: '{related}' ({related_data['seo_score']['total_score']}/100)")
         
         # Always add enhanced fallback keywords for consistent results
         fallback_keywords = generate_fallback_keywords(base_keyword)
@@ -371,48 +437,110 @@ def extract_smart_keywords_with_trends(title, region='DK', language='da-DK', max
         logging.info(f"📝 Fast fallback: {len(fallback_data)} enhanced SEO keywords")
         return fallback_data
 
-def get_keyword_trends_data_fast(pytrends, keyword, region, is_base=False):
-    """Fast trends data with single attempt and short timeout"""
+def plan_keywords(products, region='DK', language='da-DK', max_related=3):
+    """Planning pass: fetch Trends once for the distinct keywords of many products.
+
+    Products sharing a base keyword share its related keywords, and every distinct keyword
+    is fetched once in packed payloads. Results land in the Trends cache, so the per-product
+    analysis afterwards makes no Trends calls. Returns {product_id: keywords}.
+    """
     try:
-        pytrends.build_payload([keyword], cat=0, timeframe='today 12-m', geo=region)
-        interest_data = pytrends.interest_over_time()
-        
-        if not interest_data.empty and keyword in interest_data.columns:
-            avg_interest = max(1, int(interest_data[keyword].mean()))
-            peak_interest = max(avg_interest, int(interest_data[keyword].max()))
-            
-            # Simple trend calculation
-            recent = interest_data[keyword].tail(4).mean()
-            earlier = interest_data[keyword].head(4).mean()
-            
-            if recent > earlier * 1.1:
-                trend_direction = "rising"
-            elif recent < earlier * 0.9:
-                trend_direction = "declining"
-            else:
-                trend_direction = "stable"
-            
-            time.sleep(3)  # Reduced delay
-            
-            return {
-                'keyword': keyword,
-                'interest': avg_interest,
-                'peak_interest': peak_interest,
-                'trend_direction': trend_direction,
-                'is_base': is_base,
-                'seo_score': calculate_seo_score(keyword, avg_interest, trend_direction, is_base)
-            }
-        
+        with metrics.timer('trends'):
+            return _plan_keywords(products, region, language, max_related)
     except Exception as e:
-        logging.warning(f"⚠️ Fast trends failed for '{keyword}': {str(e)[:100]}")
+        logging.warning(f"⚠️ Keyword planning failed, products will query Trends one by one: {e}")
+        return {}
+
+def _plan_keywords(products, region, language, max_related):
+    pytrends = LazyTrendReq(hl=language, tz=360, retries=1, backoff_factor=1, timeout=(5, 15))
+    plans, keywords = _keyword_candidates(pytrends, products, region, max_related)
+    fetch_interest(pytrends, keywords, region, TRENDS_TIMEFRAME, get_trends_cache())
+    return plans
+
+def keyword_candidates(products, region='DK', language='da-DK', max_related=3):
+    """The keywords plan_keywords would fetch, without fetching their interest.
+
+    Returns ({product_id: keywords}, distinct keywords), for callers that fetch them in one
+    go with keywords of their own; ({}, []) when related keywords can't be looked up.
+    """
+    pytrends = LazyTrendReq(hl=language, tz=360, retries=1, backoff_factor=1, timeout=(5, 15))
+    try:
+        return _keyword_candidates(pytrends, products, region, max_related)
+    except Exception as e:
+        logging.warning(f"⚠️ Keyword planning failed, products will query Trends one by one: {e}")
+        return {}, []
+
+def _keyword_candidates(pytrends, products, region, max_related):
+    bases = {}
+    for prod in products:
+        base = extract_keyword(prod.get('title',''))
+        bases.setdefault(normalize_keyword(base), base)
+    
+    keywords, related = {}, {}
+    for key, base in bases.items():
+        keywords.setdefault(key, base)
+        related[key] = get_related_keywords_fast(pytrends, base, max_related, region)[:2]
+        for kw in related[key]:
+            keywords.setdefault(normalize_keyword(kw), kw)
+    
+    logging.info(f"🗺️ Keyword plan: {len(products)} products, {len(bases)} base keywords, {len(keywords)} distinct keywords")
+    plans = {}
+    for prod in products:
+        key = normalize_keyword(extract_keyword(prod.get('title','')))
+        plans[prod['id']] = [bases[key]] + related[key]
+    return plans, list(keywords.values())
+
+def plan_products(products, use_trends=True, region='DK', language='da-DK'):
+    """Products in order, with Trends keywords planned one window ahead"""
+    if not use_trends:
+        return iter(products)
+    plan = functools.partial(plan_keywords, region=region, language=language)
+    return (prod for prod, _ in planned(products, plan))
+
+def trends_keyword_data(keyword, values, is_base=False):
+    """Keyword data from an (anchor-scaled) interest series, or None without data"""
+    if not values:
+        return None
+    # Anchor-scaled values keep their decimals: long-tail keywords rank below 1
+    avg_interest = round(sum(values) / len(values), 2)
+    peak_interest = round(max(values), 2)
+    
+    # Simple trend calculation
+    recent = sum(values[-4:]) / len(values[-4:])
+    earlier = sum(values[:4]) / len(values[:4])
+    
+    if recent > earlier * 1.1:
+        trend_direction = "rising"
+    elif recent < earlier * 0.9:
+        trend_direction = "declining"
+    else:
+        trend_direction = "stable"
     
-    return None
+    return {
+        'keyword': keyword,
+        'interest': avg_interest,
+        'peak_interest': peak_interest,
+        'trend_direction': trend_direction,
+        'is_base': is_base,
+        'seo_score': calculate_seo_score(keyword, avg_interest, trend_direction, is_base)
+    }
 
-def get_related_keywords_fast(pytrends, base_keyword, max_keywords=3):
-    """Fast related keywords with reduced complexity"""
+def get_related_keywords_fast(pytrends, base_keyword, max_keywords=3, region='DK'):
+    """Fast related keywords with reduced complexity, served from the Trends cache when possible"""
+    cached = get_trends_cache().get_related(base_keyword, region, TRENDS_TIMEFRAME)
+    if cached is not None:
+        return cached[:max_keywords]
+    
     try:
-        time.sleep(5)  # Reduced delay
-        related_queries = pytrends.related_queries()
+        # Both requests wait their turn with every other Trends request of the process, which
+        # also spaces them TRENDS_MIN_DELAY apart
+        with trends_pacer:
+            if pytrends.kw_list != [base_keyword]:
+                metrics.count_call('trends')
+                pytrends.build_payload([base_keyword], cat=0, timeframe=TRENDS_TIMEFRAME, geo=region)
+        with trends_pacer:
+            metrics.count_call('trends')
+            related_queries = pytrends.related_queries()
         related_keywords = []
         
         if base_keyword in related_queries and related_queries[base_keyword]['top'] is not None:
@@ -424,6 +552,7 @@ def get_related_keywords_fast(pytrends, base_keyword, max_keywords=3):
                     if len(related_keywords) >= max_keywords:
                         break
         
+        get_trends_cache().set_related(base_keyword, region, TRENDS_TIMEFRAME, related_keywords)
         logging.info(f"🔗 Fast related: {len(related_keywords)} keywords")
         return related_keywords
         
@@ -545,6 +674,22 @@ Please analyze and describe:
 Provide a comprehensive description in Danish.
 """
 
+# Per-image prompt: no product title, so one analysis can be reused by every product sharing the photo
+IMAGE_DESCRIPTION_PROMPT = """
+Analyze this product image and describe:
+1. Material composition
+2. Shape and form factor
+3. Colors visible
+4. Size indicators
+5. Functional features
+6. Context of use
+7. Number of items in set
+8. Any variant options visible
+9. Quality indicators
+
+Describe only what is visible in the image. Provide a comprehensive description in Danish.
+"""
+
 def extract_product_attributes(product):
     """Extract all available product attributes for comprehensive analysis"""
     attributes = {
@@ -705,17 +850,12 @@ def generate_product_attributes_text(attributes):
 
     return attr_text
 
+# Static instructions and maps go first and are serialized once, so every content request
+# shares the same prefix and the provider can serve it from its prompt cache.
+# The per-product data (PRODUCT_CONTENT_PROMPT) follows in its own message.
 COMPREHENSIVE_CONTENT_GENERATION_PROMPT = """
 Du er en professionel dansk Shopify SEO specialist med ekspertise i Google Trends og keyword-optimering.
-
-=== SMART KEYWORD DATA ===
-{keywords_analysis}
-
-=== PRODUKT INFORMATION ===
-{product_attributes}
-
-=== BILLEDE ANALYSE ===
-{image_analysis}
+Produktets keyword data, produkt information og billede analyse følger i næste besked.
 
 === KATEGORI & BRAND INFO ===
 Kategori mapping: {subcategories}
@@ -814,6 +954,64 @@ Hvis vendor er "AutoFlux":
 - Hold alle brand referencer til valgte vendor
 """
 
+CONTENT_SYSTEM_PROMPT = COMPREHENSIVE_CONTENT_GENERATION_PROMPT.format(
+    subcategories=json.dumps(SUBCATEGORY_MAP, ensure_ascii=False),
+    vendors=json.dumps(VENDORS, ensure_ascii=False)
+)
+
+PRODUCT_CONTENT_PROMPT = """
+=== SMART KEYWORD DATA ===
+{keywords_analysis}
+
+=== PRODUKT INFORMATION ===
+{product_attributes}
+
+=== BILLEDE ANALYSE ===
+{image_analysis}
+"""
+
+# Part of the content cache key: editing a prompt invalidates previously generated content
+PROMPT_VERSION = hashlib.sha256(
+    (IMAGE_ANALYSIS_PROMPT + IMAGE_DESCRIPTION_PROMPT + CONTENT_SYSTEM_PROMPT + PRODUCT_CONTENT_PROMPT + 'gpt-4o').encode('utf-8')
+).hexdigest()[:16]
+
+# Input token usage of content generation requests, to confirm prompt cache hits
+prompt_cache_stats = {'requests': 0, 'prompt_tokens': 0, 'cached_tokens': 0}
+prompt_cache_lock = threading.Lock()
+
+def record_prompt_usage(usage):
+    """Add a chat completion's usage (object or Batch API dict) to prompt_cache_stats"""
+    if usage is None:
+        return
+    if isinstance(usage, dict):
+        prompt_tokens = usage.get('prompt_tokens') or 0
+        cached_tokens = (usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0
+    else:
+        prompt_tokens = usage.prompt_tokens or 0
+        cached_tokens = getattr(usage.prompt_tokens_details, 'cached_tokens', None) or 0
+    with prompt_cache_lock:
+        prompt_cache_stats['requests'] += 1
+        prompt_cache_stats['prompt_tokens'] += prompt_tokens
+        prompt_cache_stats['cached_tokens'] += cached_tokens
+
+def get_prompt_cache_stats():
+    with prompt_cache_lock:
+        stats = dict(prompt_cache_stats)
+    stats['hit_rate'] = round(stats['cached_tokens'] / stats['prompt_tokens'] * 100, 1) if stats['prompt_tokens'] else 0
+    stats['avg_prompt_tokens'] = round(stats['prompt_tokens'] / stats['requests']) if stats['requests'] else 0
+    return stats
+
+# Time to first token and generation speed of streamed content requests
+stream_stats = {'calls': 0, 'aborted': 0, 'ttft': 0.0, 'completion_tokens': 0, 'generation_time': 0.0}
+stream_lock = threading.Lock()
+
+def get_stream_stats():
+    with stream_lock:
+        stats = dict(stream_stats)
+    stats['avg_ttft'] = round(stats['ttft'] / stats['calls'], 2) if stats['calls'] else 0
+    stats['tokens_per_second'] = round(stats['completion_tokens'] / stats['generation_time'], 1) if stats['generation_time'] else 0
+    return stats
+
 def generate_keywords_analysis_text(keywords_data):
     """Generate detailed analysis text for the AI prompt"""
     if not keywords_data:
@@ -843,7 +1041,7 @@ def generate_keywords_analysis_text(keywords_data):
         
         analysis += f"{i}. {type_label} '{kw['keyword']}'\n"
         analysis += f"   SEO Score: {seo['total_score']}/100 (Grade: {seo['grade']})\n"
-        analysis += f"   Interest: {kw['interest']}/100 | Peak: {kw['peak_interest']}\n"
+        analysis += f"   Interest: {kw['interest']:g} | Peak: {kw['peak_interest']:g}\n"
         analysis += f"   Trend: {trend_emoji} {kw['trend_direction']}\n"
         analysis += f"   Score breakdown: Interest({seo['interest_points']}) + Trend({seo['trend_points']}) + Base({seo['base_bonus']})\n\n"
     
@@ -863,14 +1061,17 @@ def generate_keywords_analysis_text(keywords_data):
     return analysis
 
 def safe_json(text):
-    try:
-        clean = re.sub(r'```json\s*', '', text)
-        clean = re.sub(r'```\s*', '', clean)
-        m = re.search(r'\{.*?\}', clean, re.DOTALL)
-        if m:
-            return json.loads(m.group())
-    except:
-        pass
+    """First complete JSON object in the model's answer; code fences and prose around it are ignored"""
+    decoder = json.JSONDecoder()
+    idx = (text or '').find('{')
+    while idx != -1:
+        try:
+            obj, _ = decoder.raw_decode(text, idx)
+            if isinstance(obj, dict):
+                return obj
+        except ValueError:
+            pass
+        idx = text.find('{', idx + 1)
     return {}
 
 def create_handle(keyword):
@@ -880,41 +1081,217 @@ def create_handle(keyword):
     h = re.sub(r'\s+', '-', h)
     return h.strip('-')[:80]
 
-def fetch_products(limit=None):
-    products, since = [], 0
+# Only the fields the optimization pipeline reads. Page sizes keep the
+# query cost (products x nested connections) under Shopify's 1000-point cap.
+GRAPHQL_PAGE_SIZE = 25
+GRAPHQL_PRODUCTS_QUERY = """
+query TaggedProducts($query: String!, $first: Int!, $after: String) {
+  products(first: $first, after: $after, query: $query) {
+    pageInfo { hasNextPage endCursor }
+    edges {
+      node {
+        id title bodyHtml productType vendor tags createdAt publishedAt
+        images(first: 3) { edges { node { url } } }
+        options { name values }
+        variants(first: 25) {
+          edges {
+            node {
+              title price compareAtPrice sku barcode weight weightUnit inventoryQuantity
+              selectedOptions { value }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+WEIGHT_UNITS = {'GRAMS': 'g', 'KILOGRAMS': 'kg', 'OUNCES': 'oz', 'POUNDS': 'lb'}
+
+def gid_to_id(gid):
+    return int(str(gid).rsplit('/', 1)[-1])
+
+def graphql_product_to_rest(node):
+    """Reshape a GraphQL product node into the REST products.json shape the pipeline expects"""
+    variants = []
+    for edge in node['variants']['edges']:
+        v = edge['node']
+        options = [o['value'] for o in v.get('selectedOptions', [])] + [None, None, None]
+        variants.append({
+            'title': v.get('title'),
+            'price': v.get('price'),
+            'compare_at_price': v.get('compareAtPrice'),
+            'sku': v.get('sku'),
+            'barcode': v.get('barcode'),
+            'weight': v.get('weight'),
+            'weight_unit': WEIGHT_UNITS.get(v.get('weightUnit'), v.get('weightUnit')),
+            'inventory_quantity': v.get('inventoryQuantity', 0),
+            'option1': options[0],
+            'option2': options[1],
+            'option3': options[2]
+        })
+    return {
+        'id': gid_to_id(node['id']),
+        'admin_graphql_api_id': node['id'],
+        'title': node.get('title', ''),
+        'body_html': node.get('bodyHtml', ''),
+        'product_type': node.get('productType', ''),
+        'vendor': node.get('vendor', ''),
+        'tags': ', '.join(node.get('tags', [])),
+        'created_at': node.get('createdAt', ''),
+        'published_at': node.get('publishedAt', ''),
+        'images': [{'src': e['node']['url']} for e in node['images']['edges']],
+        'options': [{'name': o['name'], 'values': o['values']} for o in node.get('options', [])],
+        'variants': variants
+    }
+
+def iter_products_graphql(limit=None, tag='needs_update', client=None):
+    """Yield tagged products page by page, following GraphQL cursors"""
+    client = client or get_shopify()
+    count, cursor = 0, None
     while True:
-        r = requests.get(f"{BASE}/products.json", headers=HEADERS, params={'limit':250,'since_id':since})
-        r.raise_for_status()
-        batch = r.json().get('products', [])
-        if not batch: break
-        products += [p for p in batch if 'needs_update' in p.get('tags','').lower()]
+        first = min(GRAPHQL_PAGE_SIZE, limit - count) if limit else GRAPHQL_PAGE_SIZE
+        with metrics.timer('fetch'):
+            data = client.graphql(GRAPHQL_PRODUCTS_QUERY, {'query': f"tag:{tag}", 'first': first, 'after': cursor})
+        page = data['products']
+        for edge in page['edges']:
+            yield graphql_product_to_rest(edge['node'])
+            count += 1
+        if (limit and count >= limit) or not page['pageInfo']['hasNextPage']: return
+        cursor = page['pageInfo']['endCursor']
+
+def iter_products_rest(limit=None, client=None):
+    """Page through the whole catalog and yield needs_update products"""
+    client = client or get_shopify()
+    count, since = 0, 0
+    while True:
+        with metrics.timer('fetch'):
+            r = client.get("products.json", params={'limit':250,'since_id':since})
+            r.raise_for_status()
+            batch = r.json().get('products', [])
+        if not batch: return
         since = batch[-1]['id']
-        if limit and len(products) >= limit: return products[:limit]
-        time.sleep(0.3)
-    return products
+        for p in batch:
+            if 'needs_update' in p.get('tags','').lower():
+                yield p
+                count += 1
+                if limit and count >= limit: return
+
+def iter_products(limit=None, mode=None, client=None):
+    """Lazily yield needs_update products; 'graphql' filters on the server, 'rest' scans the catalog.
+
+    client is the store's ShopifyClient, the .env store when omitted.
+    """
+    if (mode or FETCH_MODE) == 'rest':
+        return iter_products_rest(limit, client=client)
+    return iter_products_graphql(limit, client=client)
+
+def fetch_products(limit=None, mode=None, client=None):
+    """Fetch all needs_update products into a list"""
+    return list(iter_products(limit, mode, client))
+
+class _PrefetchError:
+    def __init__(self, error):
+        self.error = error
+
+def prefetch(iterable, buffer_size=GRAPHQL_PAGE_SIZE):
+    """Pull items from `iterable` in a background thread so the next page loads while
+    the current products are processed. At most `buffer_size` items wait in memory."""
+    items = queue.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+    done = object()
+    
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def pump():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(_PrefetchError(e))
+        put(done)
+    
+    threading.Thread(target=pump, daemon=True).start()
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            if isinstance(item, _PrefetchError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+def image_urls(urls):
+    return [u.strip() for u in (urls or '').split('\n')[:3] if u.strip()]
+
+def image_request(url):
+    """Chat completion arguments for analyzing a single image"""
+    return dict(
+        model='gpt-4o',
+        messages=[{'role':'user','content':[
+            {'type':'text','text': IMAGE_DESCRIPTION_PROMPT},
+            {'type':'image_url','image_url':{'url': url}}
+        ]}],
+        max_tokens=500
+    )
 
-def analyze_images(keyword, urls):
+def text_analysis_request(keyword, urls):
+    """Text-only fallback when none of the images could be analyzed"""
     text_prompt = IMAGE_ANALYSIS_PROMPT.format(keyword=keyword, media=urls)
-    messages = [{'role':'user','content': text_prompt}]
-    if urls:
-        for u in urls.split("\n")[:3]:
-            if u.strip(): messages.append({'role':'user','content': u.strip()})
+    return dict(model='gpt-4o', messages=[{'role':'user','content': text_prompt}], max_tokens=500)
+
+def assemble_image_analysis(keyword, analyses):
+    """Product-level image analysis from the per-image analyses"""
+    parts = [f"Produkt: {keyword}"] + [f"Billede {i}:\n{a}" for i, a in enumerate(analyses, 1)]
+    return '\n\n'.join(parts)
+
+def describe_image(url):
+    """Analysis of one image, from the image cache when the same photo was seen before"""
+    analysis, fp = get_image_cache().lookup(url)
+    if analysis is None:
+        resp = get_openai().chat.completions.create(**image_request(url))
+        analysis = resp.choices[0].message.content
+        if analysis:
+            get_image_cache().store(url, fp, analysis)
+    return analysis
+
+def analyze_images(keyword, urls):
+    with metrics.timer('image_analysis'):
+        return _analyze_images(keyword, urls)
+
+def _analyze_images(keyword, urls):
+    analyses = []
+    for url in image_urls(urls):
+        try:
+            analysis = describe_image(url)
+        except Exception as e:
+            logging.warning(f"⚠️ Image analysis failed for {url}: {e}")
+            continue
+        if analysis:
+            analyses.append(analysis)
+    if analyses:
+        return assemble_image_analysis(keyword, analyses)
     try:
-        resp = client.chat.completions.create(model='gpt-4o', messages=messages, max_tokens=500)
+        resp = get_openai().chat.completions.create(**text_analysis_request(keyword, urls))
         return resp.choices[0].message.content
     except:
-        try:
-            resp = client.chat.completions.create(model='gpt-4o', messages=[{'role':'user','content': text_prompt}], max_tokens=500)
-            return resp.choices[0].message.content
-        except:
-            return f"Billedanalyse ikke tilgængelig for {keyword}."
+        return f"Billedanalyse ikke tilgængelig for {keyword}."
 
-def generate_smart_content(keyword, analysis, use_trends=True, region='DK', language='da-DK', product_data=None):
-    """Enhanced content generation with detailed keyword analysis and product attributes"""
-    
-    # Get smart keywords with trends data
+def get_keywords_data(keyword, use_trends=True, region='DK', language='da-DK'):
+    """Keyword data for the content prompt, with Google Trends when enabled"""
     if use_trends:
-        keywords_data = extract_smart_keywords_with_trends(keyword, region, language)
+        with metrics.timer('trends'):
+            keywords_data = extract_smart_keywords_with_trends(keyword, region, language)
         logging.info(f"📈 Smart keywords analysis: {len(keywords_data)} keywords, avg score: {sum(k['seo_score']['total_score'] for k in keywords_data)/len(keywords_data):.1f}")
         
         # Log the keywords being used (for verification)
@@ -930,7 +1307,10 @@ def generate_smart_content(keyword, analysis, use_trends=True, region='DK', lang
             'seo_score': calculate_seo_score(keyword, 20, 'unknown', True)
         }]
         logging.info("⚠️ Using basic keyword extraction (trends disabled)")
-    
+    return keywords_data
+
+def build_content_prompt(keywords_data, analysis, product_data=None):
+    """Fill the content generation prompt from keyword data, image analysis and product attributes"""
     # Generate detailed analysis for the prompt
     keywords_analysis = generate_keywords_analysis_text(keywords_data)
     
@@ -944,12 +1324,10 @@ def generate_smart_content(keyword, analysis, use_trends=True, region='DK', lang
         logging.warning("⚠️ No product data provided for attribute extraction")
     
     # Enhanced prompt with comprehensive product data
-    prompt = COMPREHENSIVE_CONTENT_GENERATION_PROMPT.format(
+    prompt = PRODUCT_CONTENT_PROMPT.format(
         keywords_analysis=keywords_analysis,
         product_attributes=product_attributes_text,
-        image_analysis=analysis,
-        subcategories=json.dumps(SUBCATEGORY_MAP, ensure_ascii=False),
-        vendors=json.dumps(VENDORS, ensure_ascii=False)
+        image_analysis=analysis
     )
     
     # Log what we're sending to ChatGPT (for verification)
@@ -957,43 +1335,166 @@ def generate_smart_content(keyword, analysis, use_trends=True, region='DK', lang
     logging.info(f"📸 Image analysis: {'✅ Included' if analysis and 'ikke tilgængelig' not in analysis else '❌ Failed'}")
     logging.info(f"📦 Product attributes: {'✅ Comprehensive data' if product_data else '❌ Basic only'}")
     logging.info(f"🎯 SEO keyword coverage: A+ grades: {len([k for k in keywords_data if k['seo_score']['grade'] == 'A+'])}, A grades: {len([k for k in keywords_data if k['seo_score']['grade'] == 'A'])}")
+    return prompt
+
+def content_request(prompt):
+    """Chat completion arguments for content generation: shared instructions, then the product prompt"""
+    return dict(
+        model='gpt-4o', 
+        messages=[
+            {'role':'system','content':CONTENT_SYSTEM_PROMPT},
+            {'role':'user','content':prompt}
+        ], 
+        max_tokens=2500, 
+        temperature=0.7
+    )
+
+def parse_smart_content(text, keywords_data):
+    """Parse the model's JSON answer and attach keyword verification data"""
+    with metrics.timer('parse'):
+        return _parse_smart_content(text, keywords_data)
+
+def _parse_smart_content(text, keywords_data):
+    result = safe_json(text)
     
-    try:
-        resp = client.chat.completions.create(
-            model='gpt-4o', 
-            messages=[{'role':'user','content':prompt}], 
-            max_tokens=2500, 
-            temperature=0.7
-        )
+    if result:
+        # Verify keywords are being used in the generated content
+        generated_title = result.get('title', '').lower()
+        generated_desc = result.get('body_html', '').lower()
         
-        result = safe_json(resp.choices[0].message.content)
+        keywords_found_in_title = sum(1 for kw in keywords_data if kw['keyword'].lower() in generated_title)
+        keywords_found_in_desc = sum(1 for kw in keywords_data if kw['keyword'].lower() in generated_desc)
         
-        if result:
-            # Verify keywords are being used in the generated content
-            generated_title = result.get('title', '').lower()
-            generated_desc = result.get('body_html', '').lower()
-            
-            keywords_found_in_title = sum(1 for kw in keywords_data if kw['keyword'].lower() in generated_title)
-            keywords_found_in_desc = sum(1 for kw in keywords_data if kw['keyword'].lower() in generated_desc)
-            
-            logging.info(f"✅ Content generated! Keywords in title: {keywords_found_in_title}/{len(keywords_data)}, in description: {keywords_found_in_desc}/{len(keywords_data)}")
-            
-            # Store keyword data in result for verification
-            result['_keyword_verification'] = {
-                'keywords_used': keywords_data,
-                'keywords_in_title': keywords_found_in_title,
-                'keywords_in_description': keywords_found_in_desc,
-                'best_keyword_used': keywords_data[0]['keyword'].lower() in generated_title
-            }
+        logging.info(f"✅ Content generated! Keywords in title: {keywords_found_in_title}/{len(keywords_data)}, in description: {keywords_found_in_desc}/{len(keywords_data)}")
         
-        return result
+        # Store keyword data in result for verification
+        result['_keyword_verification'] = {
+            'keywords_used': keywords_data,
+            'keywords_in_title': keywords_found_in_title,
+            'keywords_in_description': keywords_found_in_desc,
+            'best_keyword_used': keywords_data[0]['keyword'].lower() in generated_title
+        }
+    
+    return result
+
+def generate_smart_content(keyword, analysis, use_trends=True, region='DK', language='da-DK', product_data=None):
+    """Enhanced content generation with detailed keyword analysis and product attributes"""
+    keywords_data = get_keywords_data(keyword, use_trends, region, language)
+    return generate_content(keywords_data, analysis, product_data)
+
+def generate_content(keywords_data, analysis, product_data=None):
+    """Content generation for already collected keyword data"""
+    prompt = build_content_prompt(keywords_data, analysis, product_data)
+    
+    try:
+        return request_content(content_request(prompt), keywords_data)
         
     except Exception as e:
         logging.error(f"❌ ChatGPT content generation failed: {e}")
         return {}
 
-def update_product(prod, data, selected_fields):
-    """Update product with only the selected fields"""
+FUSED_IMAGE_NOTE = "Produktbillederne er vedhæftet denne besked. Analyser dem selv (materiale, form, farver, størrelse, funktioner, brug, antal i sæt, varianter, kvalitet) og brug analysen direkte i indholdet."
+
+def fused_content_request(prompt, urls):
+    """Content generation arguments with the product images attached to the product prompt"""
+    request = content_request(prompt)
+    request['messages'][-1]['content'] = [{'type':'text','text': prompt}] + [
+        {'type':'image_url','image_url':{'url': u}} for u in image_urls(urls)
+    ]
+    return request
+
+def generate_fused_content(keywords_data, urls, product_data=None):
+    """Image analysis and content generation in one multimodal request; {} when it fails"""
+    prompt = build_content_prompt(keywords_data, FUSED_IMAGE_NOTE, product_data)
+    try:
+        return request_content(fused_content_request(prompt, urls), keywords_data)
+    except Exception as e:
+        logging.warning(f"⚠️ Fused content generation failed: {e}")
+        return {}
+
+CONTENT_FIELDS = ('product_type', 'vendor', 'title', 'body_html', 'seo_title', 'seo_description', 'handle')
+
+def check_content_field(key, value):
+    """Raise ValueError for a streamed member that can't belong to the content JSON"""
+    if key in CONTENT_FIELDS and not isinstance(value, str):
+        raise ValueError(f"'{key}' is {type(value).__name__}, expected text")
+    if key not in CONTENT_FIELDS and isinstance(value, (dict, list)):
+        raise ValueError(f"unexpected nested field '{key}'")
+
+class ContentStream:
+    """One streamed content request: incremental parsing, schema checks and timing"""
+    def __init__(self):
+        self.parser = IncrementalJSONParser()
+        self.started = time.monotonic()
+        self.first_token = None
+        self.usage = None
+        self.chunks = 0
+
+    def add(self, chunk):
+        """Feed one stream chunk; raises ValueError when the output goes off-schema"""
+        if chunk.usage:
+            self.usage = chunk.usage
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            return
+        if self.first_token is None:
+            self.first_token = time.monotonic()
+        self.chunks += 1
+        for key, value in self.parser.feed(chunk.choices[0].delta.content):
+            check_content_field(key, value)
+
+    def finish(self, keywords_data, error=None):
+        """Record timing and return the parsed content ({} after an abort)"""
+        now = time.monotonic()
+        ttft = (self.first_token or now) - self.started
+        tokens = self.usage.completion_tokens if self.usage else self.chunks
+        with stream_lock:
+            stream_stats['calls'] += 1
+            stream_stats['ttft'] += ttft
+            if error:
+                stream_stats['aborted'] += 1
+            elif self.first_token:
+                stream_stats['completion_tokens'] += tokens
+                stream_stats['generation_time'] += now - self.first_token
+        if error:
+            logging.warning(f"✋ Aborted generation after {len(self.parser.buffer)} characters: {error}")
+            return {}
+        record_prompt_usage(self.usage)
+        speed = tokens / (now - self.first_token) if self.first_token and now > self.first_token else 0
+        logging.info(f"⚡ Streamed {tokens} tokens: first token after {ttft:.2f}s, {speed:.0f} tokens/s")
+        if not self.parser.complete:
+            logging.warning("⚠️ Streamed content ended before the JSON object was complete")
+        return parse_smart_content(self.parser.buffer, keywords_data)
+
+def stream_content(request, keywords_data):
+    """Streamed content request; an off-schema answer is cut off early and asked for again"""
+    for _ in range(STREAM_ATTEMPTS):
+        tracker = ContentStream()
+        error = None
+        with metrics.timer('generation'):
+            stream = get_openai().chat.completions.create(**request, stream=True, stream_options={'include_usage': True})
+            try:
+                for chunk in stream:
+                    tracker.add(chunk)
+            except ValueError as e:
+                stream.close()
+                error = e
+        if error:
+            tracker.finish(keywords_data, error)
+            continue
+        return tracker.finish(keywords_data)
+    return {}
+
+def request_content(request, keywords_data):
+    """Send a content generation request (streamed when enabled) and parse the answer"""
+    if STREAM_GENERATION:
+        return stream_content(request, keywords_data)
+    with metrics.timer('generation'):
+        resp = get_openai().chat.completions.create(**request)
+    record_prompt_usage(resp.usage)
+    return parse_smart_content(resp.choices[0].message.content, keywords_data)
+
+def build_update_payload(prod, data, selected_fields):
+    """Build the product update payload with only the selected fields"""
     pid = prod['id']
     kw = extract_keyword(prod.get('title',''))
     
@@ -1033,12 +1534,12 @@ def update_product(prod, data, selected_fields):
         
         # CRITICAL: Replace ALL brand names with the selected vendor for consistency
         if selected_vendor:
-            # Replace any brand names from all vendor categories with selected vendor
-            for category_vendors in VENDORS.values():
-                for brand in category_vendors:
-                    if brand != selected_vendor:
-                        body = body.replace(brand, selected_vendor)
-            logging.info(f"🔄 Brand consistency: Replaced all brands with {selected_vendor}")
+            # Replace any brand names from all vendor categories with selected vendor, in one pass
+            vendor_matcher = get_vendor_matcher(VENDORS)
+            body, replaced = vendor_matcher.replace(body, selected_vendor)
+            if replaced:
+                categories = sorted({c for brand in replaced for c in vendor_matcher.categories(brand)})
+                logging.info(f"🔄 Brand consistency: Replaced {len(replaced)} brand mentions ({', '.join(categories)}) with {selected_vendor}")
         
         # Replace placeholders
         final_handle = payload['product'].get('handle', create_handle(kw))
@@ -1060,21 +1561,107 @@ def update_product(prod, data, selected_fields):
     # Log which fields are being updated
     updated_fields = [AVAILABLE_FIELDS[field] for field in selected_fields if field in payload['product'] or field.startswith('seo_')]
     logging.info(f"Updating fields: {', '.join(updated_fields)}")
-    
-    r = requests.put(f"{BASE}/products/{pid}.json", headers=HEADERS, json=payload)
+    return payload
+
+def update_product(prod, data, selected_fields, client=None):
+    """Update product with only the selected fields (in the store of client, the .env store by default)"""
+    payload = build_update_payload(prod, data, selected_fields)
+    with metrics.timer('update'):
+        r = (client or get_shopify()).put(f"products/{prod['id']}.json", json=payload)
     r.raise_for_status()
     return True
 
-def optimize_product(prod, selected_fields, use_trends=True, region='DK', language='da-DK'):
+def queue_bulk_update(collector, prod, data, selected_fields):
+    """Bulk apply mode: queue the payload for a bulk mutation instead of sending a PUT"""
+    collector.add(prod['id'], build_update_payload(prod, data, selected_fields))
+    return True
+
+def content_fingerprint(keywords_data, prod, imgs, selected_fields):
+    """Hash of everything that shapes the generated content for a product"""
+    return get_content_cache().fingerprint({
+        'prompt_version': PROMPT_VERSION,
+        'keywords': keywords_data,
+        'attributes': generate_product_attributes_text(extract_product_attributes(prod)),
+        'images': imgs,
+        'fields': sorted(selected_fields)
+    })
+
+def get_cached_content(fingerprint):
+    if CONTENT_CACHE_MODE != 'use':
+        return None
+    return get_content_cache().get_content(fingerprint)
+
+def store_content(fingerprint, content):
+    if content and CONTENT_CACHE_MODE != 'off':
+        get_content_cache().set_content(fingerprint, content)
+
+def optimize_product(prod, selected_fields, use_trends=True, region='DK', language='da-DK', apply=update_product):
     kw = extract_keyword(prod.get('title',''))
     imgs = '\n'.join([i['src'] for i in prod.get('images',[])[:3]])
-    analysis = analyze_images(kw, imgs)
+    keywords_data = get_keywords_data(kw, use_trends, region, language)
     
-    # Pass the full product data for comprehensive attribute extraction
-    content = generate_smart_content(kw, analysis, use_trends, region, language, prod)
-    return content and update_product(prod, content, selected_fields)
+    # Unchanged inputs: reuse the stored content and skip both LLM calls
+    fingerprint = content_fingerprint(keywords_data, prod, imgs, selected_fields)
+    content = get_cached_content(fingerprint)
+    if content:
+        logging.info(f"♻️ Reusing generated content for product {prod['id']} (inputs unchanged)")
+    else:
+        if FUSED_GENERATION and image_urls(imgs):
+            content = generate_fused_content(keywords_data, imgs, prod)
+            if not content:
+                logging.info("↩️ Falling back to separate image analysis and content generation")
+        if not content:
+            analysis = analyze_images(kw, imgs)
+            # Pass the full product data for comprehensive attribute extraction
+            content = generate_content(keywords_data, analysis, prod)
+        store_content(fingerprint, content)
+    return content and apply(prod, content, selected_fields)
+
+def print_bulk_results(results):
+    applied = sum(1 for r in results.values() if r['success'])
+    print(f"📦 Bulk mutation applied {applied}/{len(results)} queued updates")
+    for pid, r in results.items():
+        if not r['success']:
+            logging.warning(f"❌ Bulk update failed for product {pid}: {'; '.join(r['errors'])}")
+    return applied
+
+def print_shopify_bucket_stats():
+    bucket = get_shopify().bucket_status()
+    print(f"🪣 Shopify bucket: REST peak {bucket['rest']['peak']}/{bucket['rest']['size']}, GraphQL peak {bucket['graphql']['peak']}/{bucket['graphql']['size']}, {bucket['retries']} retries")
+
+def print_trends_cache_stats():
+    cache = get_trends_cache().stats()
+    print(f"💾 Trends cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']}% hit rate, {cache['entries']} entries)")
+
+def print_content_cache_stats():
+    cache = get_content_cache().stats()
+    if CONTENT_CACHE_MODE != 'off':
+        print(f"♻️ Content cache: {cache['hits']} reused, {cache['misses']} generated ({cache['hit_rate']}% hit rate, {cache['entries']} entries)")
+
+def print_image_cache_stats():
+    cache = get_image_cache().stats()
+    if cache['hits'] or cache['misses']:
+        print(f"🖼️ Image analysis cache: {cache['hits']} reused ({cache['near_duplicate_hits']} near-duplicates), {cache['misses']} analyzed ({cache['hit_rate']}% hit rate)")
+
+def print_stream_stats():
+    stats = get_stream_stats()
+    if stats['calls']:
+        print(f"⚡ Streaming: {stats['avg_ttft']}s avg time to first token, {stats['tokens_per_second']} tokens/s, {stats['aborted']}/{stats['calls']} generations aborted early")
+
+def print_prompt_cache_stats():
+    stats = get_prompt_cache_stats()
+    if stats['requests']:
+        print(f"🧠 Prompt cache: {stats['cached_tokens']}/{stats['prompt_tokens']} input tokens cached ({stats['hit_rate']}%), avg {stats['avg_prompt_tokens']} input tokens per request")
+
+def print_stage_stats():
+    stages = metrics.stage_totals()
+    total = sum(seconds for _, seconds in stages.values())
+    if total:
+        parts = [f"{stage} {stages[stage][1]:.1f}s ({stages[stage][1] / total:.0%})" for stage in metrics.STAGES if stage in stages]
+        print(f"⏱️ Time per stage: {', '.join(parts)}")
 
 def main():
+    global CONTENT_CACHE_MODE, FUSED_GENERATION, STREAM_GENERATION
     p = argparse.ArgumentParser(description='Smart Shopify Product Optimizer with Google Trends & SEO Ranking')
     p.add_argument('--limit', type=int, help='Limit number of products to process')
     p.add_argument('-v', '--verbose', action='store_true', help='Enable verbose logging')
@@ -1085,11 +1672,34 @@ def main():
     p.add_argument('--language', default='da-DK', help='Language for trends (default: da-DK)')
     p.add_argument('--test-keyword', help='Test keyword analysis without processing products')
     p.add_argument('--trends-delay', type=int, default=15, help='Delay between trends requests (default: 15 seconds)')
+    p.add_argument('--fetch-mode', choices=['graphql', 'rest'], default=FETCH_MODE,
+                   help='graphql asks Shopify for tagged products only, rest scans the whole catalog (default: %(default)s)')
+    p.add_argument('--apply-mode', choices=['rest', 'bulk'], default='rest',
+                   help='rest sends one PUT per product, bulk applies all updates in Shopify bulk mutations at the end (default: rest)')
+    p.add_argument('--concurrency', type=int, default=1, help='Products in flight at once; above 1 uses the async pipeline (default: 1)')
+    p.add_argument('--openai-concurrency', type=int, default=8, help='Max parallel OpenAI requests in the async pipeline (default: 8)')
+    p.add_argument('--shopify-concurrency', type=int, default=2, help='Max parallel Shopify requests in the async pipeline (default: 2)')
+    p.add_argument('--llm-mode', choices=['interactive', 'batch'], default='interactive',
+                   help='batch sends OpenAI requests through the Batch API: cheaper, results within 24h (default: interactive)')
+    p.add_argument('--batch-size', type=int, default=1000, help='Products per OpenAI batch in batch mode (default: 1000)')
+    p.add_argument('--fused', action='store_true', default=FUSED_GENERATION,
+                   help='Analyze images and generate content in one multimodal request, falling back to two requests on failure')
+    p.add_argument('--stream', action='store_true', default=STREAM_GENERATION,
+                   help='Stream content generation, parse it as it arrives and abort off-schema answers early')
+    p.add_argument('--refresh-content', action='store_true', help='Regenerate content even when the inputs are unchanged (still stores the result)')
+    p.add_argument('--no-content-cache', action='store_true', help='Neither reuse nor store generated content')
     args = p.parse_args()
     
     if args.verbose: 
         logging.getLogger().setLevel(logging.DEBUG)
     
+    FUSED_GENERATION = args.fused
+    STREAM_GENERATION = args.stream
+    if args.no_content_cache:
+        CONTENT_CACHE_MODE = 'off'
+    elif args.refresh_content:
+        CONTENT_CACHE_MODE = 'refresh'
+    
     # Test keyword analysis feature
     if args.test_keyword:
         print(f"\n🔍 Testing keyword analysis for: '{args.test_keyword}'")
@@ -1106,14 +1716,20 @@ def main():
             type_label = "BASE" if kw['is_base'] else "RELATED"
             print(f"{i}. [{type_label}] '{kw['keyword']}'")
             print(f"   Score: {kw['seo_score']['total_score']}/100 (Grade: {kw['seo_score']['grade']})")
-            print(f"   Interest: {kw['interest']}/100 | Trend: {trend_emoji} {kw['trend_direction']}")
+            print(f"   Interest: {kw['interest']:g} | Trend: {trend_emoji} {kw['trend_direction']}")
         
         print(f"\n✅ Test complete!")
+        print_trends_cache_stats()
         if trends_count < len(keywords_data) // 2:
             print(f"💡 Rate limiting detected. Enhanced SEO keywords were used as fallbacks.")
             print(f"💡 Consider using --trends-delay 20 for better success rate with trends.")
         return
     
+    try:
+        require_credentials("SHOPIFY_STORE_NAME", "SHOPIFY_ADMIN_TOKEN", "OPENAI_API_KEY")
+    except MissingCredentials as e:
+        raise SystemExit(str(e))
+    
     # Get field selection
     if args.fields:
         selected_fields = args.fields
@@ -1134,52 +1750,106 @@ def main():
         print(f"🎯 Features: SEO scoring, related keywords, trend analysis, enhanced fallbacks")
     
     logging.info("🔍 Fetching needs_update products...")
-    prods = fetch_products(limit=args.limit)
+    prods = prefetch(iter_products(limit=args.limit, mode=args.fetch_mode))
+    first = next(prods, None)
     
-    if not prods: 
+    if first is None: 
         logging.info("No products to process.")
         return
     
-    print(f"\n📦 Found {len(prods)} products to process")
+    prods = plan_products(itertools.chain([first], prods), use_trends, args.region, args.language)
+    scope = f"up to {args.limit}" if args.limit else "all"
+    print(f"\n📦 Found products to process, more pages load while the first ones are optimized")
     
     # Final confirmation
     if not args.fields:  # Only ask for confirmation in interactive mode
-        confirm = input(f"Continue with processing {len(prods)} products? (y/n): ").lower().strip()
+        confirm = input(f"Continue with processing {scope} needs_update products? (y/n): ").lower().strip()
         if confirm not in ['y', 'yes']:
             print("Operation cancelled.")
             return
     
+    apply = update_product
+    collector = None
+    if args.apply_mode == 'bulk':
+        collector = BulkUpdateCollector(get_shopify())
+        apply = functools.partial(queue_bulk_update, collector)
+        print(f"📦 Bulk apply: updates are queued and sent as Shopify bulk mutations")
+    
+    if args.llm_mode == 'batch':
+        from openai_batch import optimize_products_batch
+        print(f"🗂️ OpenAI Batch API: {args.batch_size} products per batch, results can take up to 24h")
+        stats = optimize_products_batch(prods, selected_fields, use_trends, args.region, args.language,
+                                        apply=apply, chunk_size=args.batch_size)
+    elif args.concurrency > 1:
+        import asyncio
+        from async_pipeline import run_pipeline
+        print(f"⚡ Async pipeline: {args.concurrency} products in flight")
+        stats = asyncio.run(run_pipeline(
+            prods, selected_fields, use_trends, args.region, args.language,
+            concurrency=args.concurrency,
+            openai_concurrency=args.openai_concurrency,
+            shopify_concurrency=args.shopify_concurrency,
+            apply=None if collector is None else apply
+        ))
+    else:
+        stats = optimize_products_sequential(prods, selected_fields, use_trends, args.region, args.language,
+                                             apply, args.trends_delay)
+    print_run_summary(stats, selected_fields, use_trends, collector)
+
+def optimize_products_sequential(prods, selected_fields, use_trends, region, language, apply, trends_delay):
+    """Optimize products one at a time, pausing after products that called Trends; returns run stats"""
     cnt = 0
     trends_success = 0
-    keyword_verification_stats = {'total_products': 0, 'keywords_in_titles': 0, 'keywords_in_descriptions': 0}
     
+    idx, delay = 0, 0
     for idx, pr in enumerate(prods, 1):
-        logging.info(f"Processing {idx}/{len(prods)}: {pr['id']} - {pr.get('title', 'No title')[:50]}...")
+        if delay:
+            logging.info(f"⏳ Waiting {delay}s before next product to respect rate limits...")
+            with metrics.timer('sleep'):
+                time.sleep(delay)
+        
+        logging.info(f"Processing {idx}: {pr['id']} - {pr.get('title', 'No title')[:50]}...")
+        trends_misses = get_trends_cache().misses
         try:
-            if optimize_product(pr, selected_fields, use_trends, args.region, args.language): 
+            if optimize_product(pr, selected_fields, use_trends, region, language, apply): 
+                metrics.inc(metrics.PRODUCTS, result='success')
                 cnt += 1
                 if use_trends:
                     trends_success += 1
                 logging.info(f"✅ Successfully updated product {pr['id']}")
             else:
+                metrics.inc(metrics.PRODUCTS, result='failed')
                 logging.warning(f"❌ Failed to update product {pr['id']}")
         except Exception as e:
+            metrics.inc(metrics.PRODUCTS, result='failed')
             logging.error(f"❌ Error processing product {pr['id']}: {e}")
         
-        # Enhanced delay between products when using trends
-        if use_trends and idx < len(prods):
-            delay = args.trends_delay
-            logging.info(f"⏳ Waiting {delay}s before next product to respect rate limits...")
-            time.sleep(delay)
-        else:
-            time.sleep(2)
+        # Enhanced delay before the next product when using trends (not needed if every lookup was cached)
+        delay = trends_delay if use_trends and get_trends_cache().misses > trends_misses else 0
     
+    return {'processed': idx, 'successful': cnt, 'trends_success': trends_success}
+
+def print_run_summary(stats, selected_fields, use_trends, collector=None):
+    """Summary after any processing mode; submits what a bulk collector still holds first"""
     print(f"\n🎉 Processing complete!")
-    print(f"✅ Successfully updated: {cnt}/{len(prods)} products")
+    if collector:
+        stats['successful'] = print_bulk_results(collector.submit())
+    print(f"✅ Successfully updated: {stats['successful']}/{stats['processed']} products")
+    if 'products_per_minute' in stats:
+        print(f"⚡ Throughput: {stats['products_per_minute']:.1f} products/min in {stats['elapsed']:.0f}s")
     print(f"📊 Updated fields: {', '.join([AVAILABLE_FIELDS[f] for f in selected_fields])}")
+    print_shopify_bucket_stats()
+    print_prompt_cache_stats()
+    print_stream_stats()
+    print_content_cache_stats()
+    print_image_cache_stats()
+    print_stage_stats()
     if use_trends:
-        print(f"📈 Google Trends success rate: {trends_success}/{cnt} ({round(trends_success/cnt*100) if cnt > 0 else 0}%)")
-        print(f"🎯 Smart SEO features: keyword scoring, trend analysis, related keywords discovery, enhanced fallbacks")
+        if 'trends_success' in stats:
+            cnt = stats['successful']
+            print(f"📈 Google Trends success rate: {stats['trends_success']}/{cnt} ({round(stats['trends_success']/cnt*100) if cnt > 0 else 0}%)")
+            print(f"🎯 Smart SEO features: keyword scoring, trend analysis, related keywords discovery, enhanced fallbacks")
+        print_trends_cache_stats()
 
 if __name__=='__main__':
     main()
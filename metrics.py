@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Pipeline metrics: per-stage timings, external calls, retries and cache hits
+Instrumented code calls inc() or wraps a stage in `with timer('trends'):`; each update is a
+dict change under a lock. Stage times are exclusive: a stage nested inside another (the
+Trends pacing sleep inside keyword analysis) is counted for the inner stage only, so no
+time is counted twice.
+
+Every process keeps its own totals. Processes sharing a job store (web processes and the
+job worker) add their increments to it every METRICS_FLUSH_INTERVAL seconds, and render()
+returns the totals of all of them in Prometheus text format for /metrics.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+STAGES = ('fetch', 'trends', 'image_analysis', 'generation', 'parse', 'update', 'sleep')
+STAGE_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30, 60, 120)
+
+STAGE_SECONDS = 'optimizer_stage_seconds'
+EXTERNAL_CALLS = 'optimizer_external_calls_total'
+RETRIES = 'optimizer_retries_total'
+CACHE_LOOKUPS = 'optimizer_cache_lookups_total'
+PRODUCTS = 'optimizer_products_total'
+
+FAMILIES = {
+    STAGE_SECONDS: ('histogram', 'Time spent in each pipeline stage, nested stages excluded'),
+    EXTERNAL_CALLS: ('counter', 'Requests sent to Shopify, OpenAI and Google Trends, retries included'),
+    RETRIES: ('counter', 'Requests repeated after a rate limit, server error or connection failure'),
+    CACHE_LOOKUPS: ('counter', 'Cache lookups by cache and result'),
+    PRODUCTS: ('counter', 'Products optimized, by result'),
+}
+
+
+def _bound(value):
+    return '+Inf' if value == float('inf') else repr(float(value))
+
+
+class Registry:
+    """Counter values of one process, keyed by (series name, sorted label pairs)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._flushed = {}
+        self._histogram_keys = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, value, buckets=STAGE_BUCKETS, **labels):
+        """Record one histogram observation (cumulative buckets, like Prometheus)"""
+        base = tuple(sorted(labels.items()))
+        with self._lock:
+            keys = self._histogram_keys.get((name, base))
+            if keys is None:
+                keys = self._histogram_keys[(name, base)] = (
+                    [(bound, (f'{name}_bucket', base + (('le', _bound(bound)),))) for bound in buckets],
+                    (f'{name}_bucket', base + (('le', '+Inf'),)), (f'{name}_count', base), (f'{name}_sum', base)
+                )
+            bucket_keys, inf_key, count_key, sum_key = keys
+            values = self._values
+            for bound, key in bucket_keys:
+                values[key] = values.get(key, 0) + (value <= bound)
+            values[inf_key] = values.get(inf_key, 0) + 1
+            values[count_key] = values.get(count_key, 0) + 1
+            values[sum_key] = values.get(sum_key, 0) + value
+
+    def totals(self):
+        with self._lock:
+            return dict(self._values)
+
+    def take_increments(self):
+        """Increments since the last call: [(name, labels, amount)]"""
+        with self._lock:
+            # Series seen for the first time are sent even at 0, so histograms keep every bucket
+            increments = [(name, labels, value - self._flushed.get((name, labels), 0))
+                          for (name, labels), value in self._values.items()
+                          if (name, labels) not in self._flushed or value != self._flushed[(name, labels)]]
+            self._flushed = dict(self._values)
+        return increments
+
+    def give_back(self, increments):
+        """Undo take_increments() for increments that could not be stored"""
+        with self._lock:
+            for name, labels, amount in increments:
+                self._flushed[(name, labels)] -= amount
+                if not self._flushed[(name, labels)]:
+                    del self._flushed[(name, labels)]  # resend new series, zero buckets included
+
+
+registry = Registry()
+inc = registry.inc
+
+# [seconds spent in nested stages] of the innermost running stage
+_current_stage = contextvars.ContextVar('current_stage', default=None)
+
+
+@contextmanager
+def timer(stage):
+    """Time a pipeline stage (one of STAGES); works in threads and asyncio tasks"""
+    parent = _current_stage.get()
+    nested = [0.0]
+    token = _current_stage.set(nested)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _current_stage.reset(token)
+        registry.observe(STAGE_SECONDS, max(0.0, elapsed - nested[0]), stage=stage)
+        if parent is not None:
+            parent[0] += elapsed
+
+
+def count_call(service, retry=False):
+    """One request to an external service; retry marks a repeated attempt"""
+    registry.inc(EXTERNAL_CALLS, service=service)
+    if retry:
+        registry.inc(RETRIES, service=service)
+
+
+def count_openai_request(request):
+    """httpx request hook for the OpenAI clients; the SDK numbers its own retries in a header"""
+    count_call('openai', retry=request.headers.get('x-stainless-retry-count', '0') != '0')
+
+
+def stage_totals():
+    """{stage: (count, seconds)} of this process, for run summaries"""
+    totals = registry.totals()
+    stages = {}
+    for (name, labels), value in totals.items():
+        if name == f'{STAGE_SECONDS}_sum':
+            stage = dict(labels)['stage']
+            stages[stage] = (totals[(f'{STAGE_SECONDS}_count', labels)], value)
+    return stages
+
+
+# Sharing through the job store
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def share_through(store, interval=METRICS_FLUSH_INTERVAL):
+    """Add this process's metrics to store's shared totals every interval seconds and at exit"""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            return
+        _store = store
+    threading.Thread(target=_flush_loop, args=(interval,), daemon=True).start()
+    atexit.register(flush)
+
+
+def _flush_loop(interval):
+    while True:
+        time.sleep(interval)
+        flush()
+
+
+def flush():
+    """Write this process's increments to the shared store"""
+    if _store is None:
+        return
+    increments = registry.take_increments()
+    if not increments:
+        return
+    try:
+        _store.add_metrics([(name, json.dumps(labels, ensure_ascii=False), amount) for name, labels, amount in increments])
+    except Exception as e:
+        registry.give_back(increments)
+        logging.warning(f"⚠️ Could not store metrics: {e}")
+
+
+# Prometheus text format
+
+def _family(name):
+    for suffix in ('_bucket', '_count', '_sum'):
+        if name.endswith(suffix) and name[:-len(suffix)] in FAMILIES:
+            return name[:-len(suffix)]
+    return name
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _sort_key(series):
+    name, labels, _ = series
+    labels = dict(labels)
+    le = labels.pop('le', None)
+    suffix = ('_bucket', '_sum', '_count').index(name[len(_family(name)):]) if name != _family(name) else 0
+    return sorted(labels.items()), suffix, float(le) if le else 0
+
+
+def render(store=None):
+    """All metrics in Prometheus text format: totals of every process sharing store, else this process"""
+    if store is not None:
+        flush()
+        series = [(name, [tuple(pair) for pair in json.loads(labels)], value) for name, labels, value in store.metric_totals()]
+    else:
+        series = [(name, list(labels), value) for (name, labels), value in registry.totals().items()]
+    families = {}
+    for item in series:
+        families.setdefault(_family(item[0]), []).append(item)
+
+    lines = []
+    for family in sorted(families):
+        kind, description = FAMILIES.get(family, ('untyped', ''))
+        lines.append(f'# HELP {family} {description}')
+        lines.append(f'# TYPE {family} {kind}')
+        for name, labels, value in sorted(families[family], key=_sort_key):
+            text = ','.join(f'{key}="{_escape(v)}"' for key, v in labels)
+            value = int(value) if float(value).is_integer() else round(value, 6)
+            lines.append(f'{name}{{{text}}} {value}' if text else f'{name} {value}')
+    return '\n'.join(lines) + '\n'
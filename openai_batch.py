@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+OpenAI Batch API mode for catalog-wide content generation
+Image analysis and content generation requests for a whole chunk of products are
+written to JSONL batch files, submitted once, tracked until done and parsed back.
+No interactive latency, no per-request rate-limit stalls.
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import os
+import time
+
+import mainZ
+from image_cache import get_image_cache
+
+BATCH_WORK_DIR = os.getenv('BATCH_WORK_DIR', 'batch_jobs')
+BATCH_POLL_INTERVAL = 30
+BATCH_CHUNK_SIZE = 1000
+BATCH_FINISHED = ('completed', 'failed', 'expired', 'cancelled')
+
+
+class BatchRunner:
+    """Submits chat completion requests through the OpenAI Batch API and waits for the results"""
+    def __init__(self, client, work_dir=BATCH_WORK_DIR, poll_interval=BATCH_POLL_INTERVAL):
+        self.client = client
+        self.work_dir = work_dir
+        self.poll_interval = poll_interval
+        os.makedirs(work_dir, exist_ok=True)
+
+    def write_requests(self, name, requests):
+        """Write {custom_id: chat completion kwargs} as a batch input file"""
+        path = os.path.join(self.work_dir, f"{name}_{int(time.time())}.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            for custom_id, body in requests.items():
+                f.write(json.dumps({
+                    'custom_id': custom_id,
+                    'method': 'POST',
+                    'url': '/v1/chat/completions',
+                    'body': body
+                }, ensure_ascii=False) + '\n')
+        return path
+
+    def run(self, name, requests):
+        """Run a batch and return {custom_id: message content or None}"""
+        if not requests:
+            return {}
+        path = self.write_requests(name, requests)
+        with open(path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose='batch')
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h',
+            metadata={'source': 'shopify-optimizer', 'stage': name}
+        )
+        logging.info(f"📤 OpenAI batch {batch.id} submitted: {len(requests)} {name} requests")
+
+        while batch.status not in BATCH_FINISHED:
+            time.sleep(self.poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+            counts = batch.request_counts
+            if counts:
+                logging.info(f"⏳ Batch {batch.id} {batch.status}: {counts.completed}/{counts.total} done, {counts.failed} failed")
+
+        if batch.status != 'completed':
+            logging.error(f"❌ OpenAI batch {batch.id} ended as {batch.status}")
+
+        results = {custom_id: None for custom_id in requests}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                response = item.get('response') or {}
+                if response.get('status_code') == 200:
+                    results[item['custom_id']] = response['body']['choices'][0]['message']['content']
+                    if name in ('content', 'fused'):
+                        mainZ.record_prompt_usage(response['body'].get('usage'))
+                else:
+                    error = item.get('error') or response.get('body', {}).get('error')
+                    logging.warning(f"⚠️ Batch request {item['custom_id']} failed: {error}")
+        return results
+
+
+def optimize_products_batch(products, selected_fields, use_trends=True, region='DK', language='da-DK',
+                            apply=None, chunk_size=BATCH_CHUNK_SIZE, runner=None):
+    """Batch version of mainZ.optimize_product over a (lazy) product iterable; returns run stats"""
+    apply = apply or mainZ.update_product
+    runner = runner or BatchRunner(mainZ.get_openai())
+    stats = {'processed': 0, 'successful': 0, 'failed': 0}
+    products = iter(products)
+
+    for part in itertools.count(1):
+        chunk = list(itertools.islice(products, chunk_size))
+        if not chunk:
+            break
+        logging.info(f"📦 Batch chunk {part}: {len(chunk)} products")
+
+        # Keyword data first: products whose inputs are unchanged reuse stored content
+        # and never enter a batch
+        keywords, images, keywords_data, fingerprints, ready = {}, {}, {}, {}, {}
+        for p in chunk:
+            pid = p['id']
+            keywords[pid] = mainZ.extract_keyword(p.get('title',''))
+            images[pid] = '\n'.join([i['src'] for i in p.get('images',[])[:3]])
+            keywords_data[pid] = mainZ.get_keywords_data(keywords[pid], use_trends, region, language)
+            fingerprints[pid] = mainZ.content_fingerprint(keywords_data[pid], p, images[pid], selected_fields)
+            content = mainZ.get_cached_content(fingerprints[pid])
+            if content:
+                ready[pid] = content
+        pending = [p for p in chunk if p['id'] not in ready]
+        if ready:
+            logging.info(f"♻️ Reusing generated content for {len(ready)} products (inputs unchanged)")
+
+        if mainZ.FUSED_GENERATION:
+            fused_requests = {}
+            for p in pending:
+                if mainZ.image_urls(images[p['id']]):
+                    prompt = mainZ.build_content_prompt(keywords_data[p['id']], mainZ.FUSED_IMAGE_NOTE, p)
+                    fused_requests[f"fused-{p['id']}"] = mainZ.fused_content_request(prompt, images[p['id']])
+            fused = runner.run('fused', fused_requests)
+            for p in pending:
+                text = fused.get(f"fused-{p['id']}")
+                content = mainZ.parse_smart_content(text, keywords_data[p['id']]) if text else {}
+                if content:
+                    ready[p['id']] = content
+                    mainZ.store_content(fingerprints[p['id']], content)
+            # Whatever the fused batch couldn't answer goes through the two-step batches below
+            pending = [p for p in pending if p['id'] not in ready]
+
+        # One request per distinct uncached photo, shared by every product that shows it
+        image_analyses, image_requests, waiting = {}, {}, {}
+        for url in dict.fromkeys(u for p in pending for u in mainZ.image_urls(images[p['id']])):
+            analysis, fp = get_image_cache().lookup(url)
+            if analysis is not None:
+                image_analyses[url] = analysis
+                continue
+            photo = (fp['dhash'] or fp['sha256']) if fp else hashlib.sha256(url.encode('utf-8')).hexdigest()
+            image_requests.setdefault(f"image-{photo}", mainZ.image_request(url))
+            waiting.setdefault(f"image-{photo}", []).append((url, fp))
+        results = runner.run('image_analysis', image_requests)
+        for custom_id, urls in waiting.items():
+            if results.get(custom_id):
+                for url, fp in urls:
+                    get_image_cache().store(url, fp, results[custom_id])
+                    image_analyses[url] = results[custom_id]
+
+        content_requests = {}
+        for p in pending:
+            kw = keywords[p['id']]
+            analyses = [image_analyses[u] for u in mainZ.image_urls(images[p['id']]) if u in image_analyses]
+            analysis = mainZ.assemble_image_analysis(kw, analyses) if analyses else f"Billedanalyse ikke tilgængelig for {kw}."
+            prompt = mainZ.build_content_prompt(keywords_data[p['id']], analysis, p)
+            content_requests[f"content-{p['id']}"] = mainZ.content_request(prompt)
+        contents = runner.run('content', content_requests)
+
+        for p in chunk:
+            stats['processed'] += 1
+            text = contents.get(f"content-{p['id']}")
+            try:
+                content = ready.get(p['id'])
+                if content is None and text:
+                    content = mainZ.parse_smart_content(text, keywords_data[p['id']])
+                    mainZ.store_content(fingerprints[p['id']], content)
+                ok = bool(content) and apply(p, content, selected_fields)
+            except Exception as e:
+                ok = False
+                logging.error(f"❌ Error processing product {p['id']}: {e}")
+            if ok:
+                stats['successful'] += 1
+                logging.info(f"✅ Successfully updated product {p['id']}")
+            else:
+                stats['failed'] += 1
+                logging.warning(f"❌ Failed to update product {p['id']}")
+    return stats
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Vectorized SEO scoring for catalog-wide audits
+Scores many (keyword, product) pairs at once with the rules of AdvancedSEOScorer.
+String work runs once per distinct keyword, title and product type; everything per
+pair is NumPy array arithmetic in the same operation order as the scalar path, so the
+results are identical to calling calculate_seo_score pair by pair.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _ladder(values, steps, default):
+    """np.select over (threshold, score) steps checked top-down, like the scorer's scalar methods"""
+    return np.select([values >= threshold for threshold, _ in steps], [score for _, score in steps], default)
+
+
+def _round1(values):
+    """Python's round(x, 1) (not np.round, which can differ in the last digit), once per distinct value"""
+    uniques, inverse = np.unique(values, return_inverse=True)
+    return np.array([round(x, 1) for x in uniques.tolist()], dtype=float)[inverse]
+
+
+def _pairs_frame(pairs):
+    frame = pairs if isinstance(pairs, pd.DataFrame) else pd.DataFrame(pairs)
+    if 'related_count' not in frame:
+        if 'related_keywords' in frame:
+            frame = frame.assign(related_count=[len(r) if r else 0 for r in frame['related_keywords']])
+        else:
+            frame = frame.assign(related_count=0)
+    if 'interest' not in frame:
+        frame = frame.assign(interest=0)
+    if 'product_type' not in frame:
+        frame = frame.assign(product_type='')
+    return frame
+
+
+def score_seo_batch(scorer, pairs, vendor_matcher=None):
+    """Score (keyword, product) pairs with scorer's weights and terms.
+
+    pairs is a DataFrame (or dict of arrays) with columns keyword and product_title, and
+    optionally product_type, interest (Trends value, default 0) and related_count (or
+    related_keywords lists). vendor_matcher detects brand keywords (none without it). Returns a DataFrame on the same index with total_score,
+    grade, the five components, language, trends_interest and related_keywords_count.
+    """
+    frame = _pairs_frame(pairs)
+    kw_codes, keywords = pd.factorize(frame['keyword'], sort=False)
+    title_codes, titles = pd.factorize(frame['product_title'], sort=False)
+    type_codes, types = pd.factorize(frame['product_type'].fillna(''), sort=False)
+    interest = frame['interest'].to_numpy(dtype=float)
+    related = frame['related_count'].to_numpy(dtype=np.int64)
+
+    # Per distinct keyword
+    kw_lower = [k.lower() for k in keywords]
+    kw_words = [list(dict.fromkeys(k.split())) for k in kw_lower]
+    word_count = np.array([len(k.split()) for k in keywords], dtype=np.int64)
+    danish_words = set(scorer.danish_words)
+    is_danish = np.array([any(c in k for c in 'æøå') or any(w in danish_words for w in words)
+                          for k, words in zip(kw_lower, kw_words)], dtype=bool)
+    has_brand = np.array([bool(vendor_matcher and vendor_matcher.contains(k)) for k in keywords], dtype=bool)
+    categories = list(scorer.danish_product_terms.items())
+    bonuses = scorer.product_type_bonuses
+
+    def term_flags(texts):
+        category = np.array([[c in t for c, _ in categories] for t in texts], dtype=bool).reshape(len(texts), len(categories))
+        terms = np.array([[any(term in t for term in related_terms) for _, related_terms in categories] for t in texts],
+                         dtype=bool).reshape(len(texts), len(categories))
+        return category, terms
+
+    kw_category, kw_terms = term_flags(kw_lower)
+    kw_trigger = np.array([[trigger in k for trigger, _ in bonuses] for k in kw_lower], dtype=bool).reshape(len(kw_lower), len(bonuses))
+
+    # Per distinct title
+    title_lower = [t.lower() for t in titles]
+    title_category, title_terms = term_flags(title_lower)
+    title_bonus = np.array([[any(w in t for w in words) for _, words in bonuses] for t in title_lower],
+                           dtype=bool).reshape(len(title_lower), len(bonuses))
+
+    # Keyword words as ids into a vocabulary, padded with -1
+    vocab = {w: i for i, w in enumerate(dict.fromkeys(w for words in kw_words for w in words))}
+    vocab_words = list(vocab)
+    size = max(len(vocab), 1)
+    width = max((len(words) for words in kw_words), default=0)
+    kw_word_ids = np.full((len(kw_words), max(width, 1)), -1, dtype=np.int64)
+    for i, words in enumerate(kw_words):
+        kw_word_ids[i, :len(words)] = [vocab[w] for w in words]
+    word_ids = kw_word_ids[kw_codes]
+    has_word = word_ids >= 0
+
+    # Word overlap: a pair's (title, word) keys looked up among the titles' own word keys
+    title_keys = np.array([t * size + vocab[w] for t, text in enumerate(title_lower)
+                           for w in set(text.split()) if w in vocab], dtype=np.int64)
+    overlap = (has_word & np.isin(title_codes[:, None] * size + word_ids, title_keys)).sum(axis=1)
+
+    # Category relevance: any keyword word is a substring of the product type
+    types_lower = [(t or '').lower() for t in types]
+    type_keys = type_codes[:, None] * size + word_ids
+    type_valid = has_word & np.array([bool(t) for t in types_lower], dtype=bool)[type_codes][:, None]
+    matched = np.array([k for k in np.unique(type_keys[type_valid]).tolist()
+                        if vocab_words[k % size] in types_lower[k // size]], dtype=np.int64)
+    type_match = (type_valid & np.isin(type_keys, matched)).any(axis=1)
+
+    kw_arr = np.array(kw_lower, dtype=str)[kw_codes] if len(frame) else np.array([], dtype=str)
+    title_arr = np.array(title_lower, dtype=str)[title_codes] if len(frame) else np.array([], dtype=str)
+    direct = np.char.find(title_arr, kw_arr) >= 0
+
+    semantic = ((kw_category[kw_codes] | title_category[title_codes]) &
+                (kw_terms[kw_codes] | title_terms[title_codes])).any(axis=1)
+    type_bonus = (kw_trigger[kw_codes] & title_bonus[title_codes]).any(axis=1)
+
+    words = word_count[kw_codes]
+    danish = is_danish[kw_codes]
+
+    # Components, in the scalar path's operation order
+    volume_five = interest * 5
+    search = _ladder(interest, scorer.search_volume_steps, 0).astype(float)
+    search = np.where(interest >= 5, search, np.where(volume_five > 25, volume_five, 25))
+
+    length_scores = scorer.keyword_length_scores.items()
+    length = np.select([words == n for n, _ in length_scores], [s for _, s in length_scores],
+                       np.where(words <= 7, 55, 35))
+
+    volume_competition = interest * 1.3
+    competition = np.where(volume_competition < 95, volume_competition, 95)
+    competition = np.where(words >= 3, competition * 0.65, np.where(words == 2, competition * 0.8, competition))
+    competition = np.where(has_brand[kw_codes], competition * 0.7, competition)
+    competition = np.where(related > 5, competition * 1.1, competition)
+    competition = np.where(danish, competition * 0.8, competition)
+    competition = 100 - competition
+    competition = np.where(competition > 25, competition, 25)
+    competition = np.where(competition < 98, competition, 98)
+
+    relevance = (40 + 35 * direct + np.minimum(25, overlap * 12) + 20 * type_match + 15 * semantic +
+                 np.where(related > 0, np.minimum(10, related * 2), 0) + 10 * type_bonus)
+    relevance = np.minimum(98, relevance)
+
+    local_da = 80 * scorer.danish_multipliers.get('da', 1.0)
+    local_en = 80 * scorer.danish_multipliers.get('en', 1.0)
+    local = np.where(danish, local_da, local_en)
+
+    weights = scorer.weights
+    final = (
+        search * weights['search_volume'] +
+        length.astype(float) * weights['keyword_length'] +
+        competition * weights['competition'] +
+        relevance.astype(float) * weights['relevance'] +
+        local * weights['local_factor']
+    )
+    final = np.where((interest > 50) & danish & (words <= 3), final * 1.05, final)
+    grade = _ladder(final, scorer.grade_thresholds, 'D')
+
+    return pd.DataFrame({
+        'total_score': _round1(final),
+        'grade': grade,
+        'search_volume': _round1(search),
+        'keyword_length': length,
+        'competition': _round1(competition),
+        'relevance': relevance,
+        'local_factor': np.where(danish, round(local_da, 1), round(local_en, 1)),
+        'language': np.where(danish, 'da', 'en'),
+        'trends_interest': frame['interest'].to_numpy(),
+        'related_keywords_count': related,
+    }, index=frame.index)
+
+
+def score_records(scores):
+    """Batch scores as calculate_seo_score-shaped dicts"""
+    components = ['search_volume', 'keyword_length', 'competition', 'relevance', 'local_factor']
+    return [{
+        'total_score': row['total_score'],
+        'grade': row['grade'],
+        'components': {c: row[c] for c in components},
+        'language': row['language'],
+        'trends_interest': row['trends_interest'],
+        'related_keywords_count': row['related_keywords_count']
+    } for row in scores.to_dict('records')]
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Bulk apply of generated content through Shopify bulk mutations
+Update payloads built by mainZ.build_update_payload are written to a JSONL file,
+uploaded once (stagedUploadsCreate) and applied with bulkOperationRunMutation.
+Thousands of product writes become a handful of API calls.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+BULK_WORK_DIR = os.getenv('BULK_WORK_DIR', 'bulk_operations')
+# Shopify accepts bulk mutation files up to 20MB; stay below it and split larger runs
+BULK_MAX_BYTES = 18 * 1024 * 1024
+BULK_POLL_INTERVAL = 5
+BULK_TIMEOUT = 6 * 3600
+
+STAGED_UPLOAD_MUTATION = """
+mutation StagedUpload($filename: String!) {
+  stagedUploadsCreate(input: [{resource: BULK_MUTATION_VARIABLES, filename: $filename, mimeType: "text/jsonl", httpMethod: POST}]) {
+    stagedTargets { url resourceUrl parameters { name value } }
+    userErrors { field message }
+  }
+}
+"""
+
+PRODUCT_UPDATE_MUTATION = """mutation call($input: ProductInput!) { productUpdate(input: $input) { product { id } userErrors { field message } } }"""
+
+BULK_RUN_MUTATION = """
+mutation RunBulk($mutation: String!, $path: String!) {
+  bulkOperationRunMutation(mutation: $mutation, stagedUploadPath: $path) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+BULK_STATUS_QUERY = """
+query BulkStatus($id: ID!) {
+  node(id: $id) { ... on BulkOperation { id status errorCode objectCount url partialDataUrl } }
+}
+"""
+
+BULK_FINISHED = ('COMPLETED', 'FAILED', 'CANCELED', 'EXPIRED')
+
+
+def payload_to_product_input(payload):
+    """Convert a REST product update payload into a GraphQL ProductInput"""
+    product = payload['product']
+    product_input = {'id': f"gid://shopify/Product/{product['id']}"}
+    fields = {
+        'title': 'title',
+        'body_html': 'descriptionHtml',
+        'product_type': 'productType',
+        'vendor': 'vendor',
+        'handle': 'handle'
+    }
+    for rest_key, gql_key in fields.items():
+        if rest_key in product:
+            product_input[gql_key] = product[rest_key]
+    if 'tags' in product:
+        product_input['tags'] = [t.strip() for t in product['tags'].split(',') if t.strip()]
+    seo = {}
+    if 'metafields_global_title_tag' in product:
+        seo['title'] = product['metafields_global_title_tag']
+    if 'metafields_global_description_tag' in product:
+        seo['description'] = product['metafields_global_description_tag']
+    if seo:
+        product_input['seo'] = seo
+    return product_input
+
+
+def check_user_errors(result, operation):
+    if result.get('userErrors'):
+        raise RuntimeError(f"Shopify {operation} failed: {result['userErrors']}")
+
+
+def run_bulk_mutation(shopify, path, poll_interval=BULK_POLL_INTERVAL, timeout=BULK_TIMEOUT):
+    """Upload a JSONL variables file, run the product update mutation over it and wait.
+
+    Returns the finished BulkOperation dict plus the parsed result lines.
+    """
+    import requests
+    filename = os.path.basename(path)
+    staged = shopify.graphql(STAGED_UPLOAD_MUTATION, {'filename': filename})['stagedUploadsCreate']
+    check_user_errors(staged, 'stagedUploadsCreate')
+    target = staged['stagedTargets'][0]
+    params = {p['name']: p['value'] for p in target['parameters']}
+
+    # The staged target is cloud storage, not the Admin API: no Shopify token here
+    with open(path, 'rb') as f:
+        r = requests.post(target['url'], data=params, files={'file': (filename, f, 'text/jsonl')}, timeout=(10, 300))
+    r.raise_for_status()
+
+    run = shopify.graphql(BULK_RUN_MUTATION, {'mutation': PRODUCT_UPDATE_MUTATION, 'path': params['key']})
+    run = run['bulkOperationRunMutation']
+    check_user_errors(run, 'bulkOperationRunMutation')
+    operation = run['bulkOperation']
+    logging.info(f"📤 Bulk operation {operation['id']} started for {filename}")
+
+    deadline = time.monotonic() + timeout
+    while operation['status'] not in BULK_FINISHED:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Bulk operation {operation['id']} still {operation['status']} after {timeout}s")
+        time.sleep(poll_interval)
+        operation = shopify.graphql(BULK_STATUS_QUERY, {'id': operation['id']})['node']
+        logging.info(f"⏳ Bulk operation {operation['status'].lower()}: {operation.get('objectCount', 0)} objects")
+
+    results = []
+    result_url = operation.get('url') or operation.get('partialDataUrl')
+    if result_url:
+        r = requests.get(result_url, timeout=(10, 300))
+        r.raise_for_status()
+        results = [json.loads(line) for line in r.text.splitlines() if line.strip()]
+    return operation, results
+
+
+class BulkUpdateCollector:
+    """Collects update payloads into JSONL files and applies them as bulk mutations.
+
+    Files are split before they reach Shopify's size limit; each full file is
+    submitted as soon as it is closed, since a store runs one bulk mutation at a time.
+    add() and submit() may be called from several threads; an add() that fills a file
+    blocks its caller while the bulk mutation runs, so call it off the event loop.
+    """
+    def __init__(self, shopify, work_dir=BULK_WORK_DIR, max_bytes=BULK_MAX_BYTES, poll_interval=BULK_POLL_INTERVAL):
+        self.shopify = shopify
+        self.work_dir = work_dir
+        self.max_bytes = max_bytes
+        self.poll_interval = poll_interval
+        self.results = {}
+        self._file = None
+        self._path = None
+        self._product_ids = []
+        self._parts = 0
+        self._lock = threading.RLock()
+        os.makedirs(work_dir, exist_ok=True)
+
+    def add(self, product_id, payload):
+        with self._lock:
+            self._add(product_id, payload)
+
+    def _add(self, product_id, payload):
+        if self._file is None:
+            self._parts += 1
+            self._path = os.path.join(self.work_dir, f"bulk_update_{int(time.time())}_{self._parts}.jsonl")
+            self._file = open(self._path, 'w', encoding='utf-8')
+            self._product_ids = []
+        line = json.dumps({'input': payload_to_product_input(payload)}, ensure_ascii=False) + '\n'
+        if self._product_ids and self._file.tell() + len(line.encode('utf-8')) > self.max_bytes:
+            self.submit()
+            return self._add(product_id, payload)
+        self._file.write(line)
+        self._product_ids.append(product_id)
+
+    def submit(self):
+        """Apply everything collected so far; returns {product_id: {'success', 'errors'}}"""
+        with self._lock:
+            return self._submit()
+
+    def _submit(self):
+        if self._file is None:
+            return self.results
+        self._file.close()
+        path, product_ids = self._path, self._product_ids
+        self._file = None
+        logging.info(f"📦 Applying {len(product_ids)} product updates in one bulk mutation")
+        try:
+            operation, lines = run_bulk_mutation(self.shopify, path, self.poll_interval)
+        except Exception as e:
+            for pid in product_ids:
+                self.results[pid] = {'success': False, 'errors': [str(e)]}
+            logging.error(f"❌ Bulk mutation failed: {e}")
+            return self.results
+
+        # Result lines carry the 0-based line number of the input they answer
+        answered = set()
+        for line in lines:
+            idx = line.get('__lineNumber')
+            if idx is None or idx >= len(product_ids):
+                continue
+            answered.add(idx)
+            update = ((line.get('data') or {}).get('productUpdate')) or {}
+            errors = [e['message'] for e in update.get('userErrors') or []] + [e.get('message', str(e)) for e in line.get('errors') or []]
+            self.results[product_ids[idx]] = {'success': not errors and bool(update.get('product')), 'errors': errors}
+        for idx, pid in enumerate(product_ids):
+            if idx not in answered:
+                self.results[pid] = {'success': False, 'errors': [f"No result (bulk operation {operation['status']})"]}
+        return self.results
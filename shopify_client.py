@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Shared Shopify Admin API client
+Keep-alive connection pooling, default timeouts and bounded retries. Requests are
+paced by Shopify's leaky bucket (REST call limit header, GraphQL query cost) instead
+of fixed sleeps.
+"""
+
+import logging
+import threading
+import time
+
+import metrics
+
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+MAX_RETRIES = 4
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class LeakyBucket:
+    """Client-side model of one Shopify leaky bucket.
+
+    Shopify reports the bucket after every response; between responses we assume it
+    drains at `leak_rate` per second. `reserve()` books capacity and returns how long
+    the caller has to wait before sending.
+    """
+    def __init__(self, size, leak_rate, headroom=0):
+        self.size = size
+        self.leak_rate = leak_rate
+        self.headroom = headroom
+        self.used = 0.0
+        self.peak = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _drain(self, now):
+        self.used = max(0.0, self.used - (now - self._updated) * self.leak_rate)
+        self._updated = now
+
+    def reserve(self, cost=1):
+        with self._lock:
+            now = time.monotonic()
+            self._drain(now)
+            limit = self.size - self.headroom
+            wait = max(0.0, (self.used + cost - limit) / self.leak_rate)
+            self.used += cost
+            self.peak = max(self.peak, min(self.used, self.size))
+            return wait
+
+    def observe(self, used, size=None, leak_rate=None):
+        """Sync with what Shopify reported"""
+        with self._lock:
+            self._drain(time.monotonic())
+            if size:
+                self.size = size
+            if leak_rate:
+                self.leak_rate = leak_rate
+            self.used = float(used)
+            self.peak = max(self.peak, self.used)
+
+    def status(self):
+        with self._lock:
+            self._drain(time.monotonic())
+            return {
+                'used': round(self.used, 1),
+                'size': self.size,
+                'leak_rate': self.leak_rate,
+                'utilization': round(self.used / self.size * 100, 1) if self.size else 0,
+                'peak': round(self.peak, 1)
+            }
+
+
+class ShopifyRateLimiter:
+    """REST and GraphQL buckets for one store"""
+    def __init__(self):
+        # Standard plan defaults until the first response tells us otherwise
+        self.rest = LeakyBucket(size=40, leak_rate=2, headroom=2)
+        self.graphql = LeakyBucket(size=1000, leak_rate=50, headroom=50)
+        self.query_costs = {}
+        self.retries = 0
+
+    def observe_rest(self, headers):
+        limit = headers.get('X-Shopify-Shop-Api-Call-Limit')
+        if not limit:
+            return
+        try:
+            used, size = (int(x) for x in limit.split('/'))
+        except ValueError:
+            return
+        # Plus stores have a 400-call bucket leaking 20/s; standard is 40 at 2/s
+        self.rest.observe(used, size, size / 20)
+
+    def observe_graphql(self, query, body):
+        cost = (body.get('extensions') or {}).get('cost')
+        if not cost:
+            return
+        throttle = cost.get('throttleStatus') or {}
+        if throttle:
+            size = throttle.get('maximumAvailable')
+            self.graphql.observe(size - throttle.get('currentlyAvailable', size), size, throttle.get('restoreRate'))
+        if cost.get('requestedQueryCost'):
+            self.query_costs[query] = cost['requestedQueryCost']
+
+    def graphql_cost(self, query):
+        return self.query_costs.get(query, 50)
+
+    def status(self):
+        return {'rest': self.rest.status(), 'graphql': self.graphql.status(), 'retries': self.retries}
+
+
+def retry_delay(response, attempt):
+    """Seconds to wait before retrying: Retry-After when given, else exponential backoff"""
+    if response is not None and response.headers.get('Retry-After'):
+        try:
+            return float(response.headers['Retry-After'])
+        except ValueError:
+            pass
+    return min(30, 2 ** attempt)
+
+
+def is_throttled(body):
+    return any((e.get('extensions') or {}).get('code') == 'THROTTLED' for e in body.get('errors') or [])
+
+
+class ShopifyClient:
+    """Pooled, rate-aware requests client for one store"""
+    def __init__(self, base_url, token, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES, pool_size=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.limiter = ShopifyRateLimiter()
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json", "X-Shopify-Access-Token": token})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, path, **kwargs):
+        """Send a REST request, waiting for bucket capacity and retrying 429/5xx"""
+        return self._send(method, path, self.limiter.rest, **kwargs)
+
+    def _send(self, method, path, bucket, **kwargs):
+        import requests
+        kwargs.setdefault('timeout', self.timeout)
+        url = path if path.startswith('http') else f"{self.base_url}/{path.lstrip('/')}"
+        for attempt in range(self.max_retries + 1):
+            wait = bucket.reserve() if bucket else 0
+            if wait:
+                with metrics.timer('sleep'):
+                    time.sleep(wait)
+            response = None
+            metrics.count_call('shopify', retry=attempt > 0)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                logging.warning(f"⚠️ Shopify {method} {path} failed ({e}), retrying...")
+            else:
+                self.limiter.observe_rest(response.headers)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+            self.limiter.retries += 1
+            delay = retry_delay(response, attempt)
+            logging.info(f"⏳ Shopify {response.status_code if response is not None else 'timeout'} on {path}, retrying in {delay:.1f}s")
+            with metrics.timer('sleep'):
+                time.sleep(delay)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def graphql(self, query, variables=None):
+        """Run a GraphQL query paced by its cost, retrying when Shopify throttles it"""
+        for attempt in range(self.max_retries + 1):
+            wait = self.limiter.graphql.reserve(self.limiter.graphql_cost(query))
+            if wait:
+                with metrics.timer('sleep'):
+                    time.sleep(wait)
+            if attempt:
+                metrics.inc(metrics.RETRIES, service='shopify')
+            r = self._send('POST', 'graphql.json', None, json={'query': query, 'variables': variables or {}})
+            r.raise_for_status()
+            body = r.json()
+            self.limiter.observe_graphql(query, body)
+            if is_throttled(body) and attempt < self.max_retries:
+                self.limiter.retries += 1
+                continue  # the bucket now reflects Shopify's numbers, so reserve() waits
+            if body.get('errors'):
+                raise RuntimeError(f"Shopify GraphQL error: {body['errors']}")
+            return body['data']
+
+    def bucket_status(self):
+        return self.limiter.status()
+
+
+class AsyncShopifyClient:
+    """httpx-based counterpart of ShopifyClient sharing its rate limiter"""
+    def __init__(self, sync_client, max_connections=10):
+        import httpx  # Only the async pipeline needs httpx and asyncio; keep them out of every other import
+        self.base_url = sync_client.base_url
+        self.limiter = sync_client.limiter
+        self.max_retries = sync_client.max_retries
+        self.http = httpx.AsyncClient(
+            headers=dict(sync_client.session.headers),
+            timeout=httpx.Timeout(sync_client.timeout[1], connect=sync_client.timeout[0]),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    async def request(self, method, path, **kwargs):
+        import asyncio
+        import httpx
+        url = path if path.startswith('http') else f"{self.base_url}/{path.lstrip('/')}"
+        for attempt in range(self.max_retries + 1):
+            wait = self.limiter.rest.reserve()
+            if wait:
+                with metrics.timer('sleep'):
+                    await asyncio.sleep(wait)
+            response = None
+            metrics.count_call('shopify', retry=attempt > 0)
+            try:
+                response = await self.http.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                logging.warning(f"⚠️ Shopify {method} {path} failed ({e}), retrying...")
+            else:
+                self.limiter.observe_rest(response.headers)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+            self.limiter.retries += 1
+            with metrics.timer('sleep'):
+                await asyncio.sleep(retry_delay(response, attempt))
+
+    async def put(self, path, **kwargs):
+        return await self.request('PUT', path, **kwargs)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url, token):
+    """One pooled client (and bucket) per store and token"""
+    with _clients_lock:
+        key = (base_url.rstrip('/'), token)
+        if key not in _clients:
+            _clients[key] = ShopifyClient(base_url, token)
+        return _clients[key]
+
+
+def all_bucket_status():
+    with _clients_lock:
+        return {base_url: client.bucket_status() for (base_url, _), client in _clients.items()}
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Modules read their database paths at import; keep anything a test opens by default out of the repo
+_scratch = tempfile.mkdtemp(prefix='optimizer_tests_')
+os.environ.setdefault('CACHE_DB_PATH', os.path.join(_scratch, 'cache.db'))
+os.environ.setdefault('JOB_DB_PATH', os.path.join(_scratch, 'jobs.db'))
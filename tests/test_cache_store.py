@@ -0,0 +1,82 @@
+import pytest
+
+import cache_store
+from cache_store import ContentCache, SqliteCache, TrendsCache, normalize_keyword
+
+
+class Clock:
+    """Stand-in for the time module with a clock the test moves"""
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_store, 'time', clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = SqliteCache('test_cache', str(tmp_path / 'cache.db'), ttl=60)
+    cache.set({'a': 1}, 'key')
+    clock.now += 59
+    assert cache.get('key') == {'a': 1}
+    clock.now += 2
+    assert cache.get('key') is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = SqliteCache('test_cache', str(tmp_path / 'cache.db'), max_entries=10)
+    for n in range(10):
+        clock.now += 1
+        cache.set(n, 'key', n)
+    clock.now += 1
+    assert cache.get('key', 0) == 0  # key 0 is now the most recently used
+    clock.now += 1
+    cache.set(10, 'key', 10)
+    # Going over the limit drops 10% extra: the two least recently used entries
+    assert len(cache) == 9
+    assert cache.get('key', 1) is None
+    assert cache.get('key', 2) is None
+    assert cache.get('key', 0) == 0
+    assert cache.get('key', 10) == 10
+
+
+def test_hit_and_miss_counters(tmp_path):
+    cache = SqliteCache('test_cache', str(tmp_path / 'cache.db'))
+    cache.set('value', 'present')
+    cache.get('present')
+    cache.get('absent')
+    cache.get('absent')
+    cache.get('present', record=False)
+    cache.get('absent', record=False)
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'hit_rate': 33.3, 'entries': 1}
+
+
+def test_trends_series_are_keyed_on_normalized_keyword_and_anchor(tmp_path):
+    cache = TrendsCache(str(tmp_path / 'cache.db'))
+    cache.set_series('  Køkken   Kniv ', 'DK', 'today 12-m', [1, 2.5], 'Skærebræt')
+    assert cache.get_series('køkken kniv', 'DK', 'today 12-m', 'skærebræt') == [1.0, 2.5]
+    assert cache.get_series('køkken kniv', 'DK', 'today 12-m', 'køkken') is None
+    assert cache.get_series('køkken kniv', 'SE', 'today 12-m', 'skærebræt') is None
+
+
+def test_empty_series_is_cached(tmp_path):
+    cache = TrendsCache(str(tmp_path / 'cache.db'))
+    cache.set_series('sjælden', 'DK', 'today 12-m', [], 'skærebræt')
+    assert cache.get_series('sjælden', 'DK', 'today 12-m', 'skærebræt') == []
+
+
+def test_content_fingerprint_ignores_key_order():
+    assert ContentCache.fingerprint({'a': 1, 'b': [1, 2]}) == ContentCache.fingerprint({'b': [1, 2], 'a': 1})
+    assert ContentCache.fingerprint({'a': 1}) != ContentCache.fingerprint({'a': 2})
+
+
+def test_normalize_keyword():
+    assert normalize_keyword('  Stor\tKØKKEN\nkniv ') == 'stor køkken kniv'
+    assert normalize_keyword(None) == ''
@@ -0,0 +1,49 @@
+from mainZ import graphql_product_to_rest
+
+
+def product_node(**overrides):
+    node = {
+        'id': 'gid://shopify/Product/8123456789',
+        'title': 'Skærebræt',
+        'bodyHtml': '<p>Bambus</p>',
+        'productType': 'Køkken',
+        'vendor': 'Nordic',
+        'tags': ['needs_update', 'køkken'],
+        'createdAt': '2024-01-02T10:00:00Z',
+        'publishedAt': None,
+        'images': {'edges': [{'node': {'url': 'https://cdn.example/1.jpg'}}, {'node': {'url': 'https://cdn.example/2.jpg'}}]},
+        'options': [{'name': 'Størrelse', 'values': ['S', 'L']}, {'name': 'Farve', 'values': ['Natur']}],
+        'variants': {'edges': [{'node': {
+            'title': 'S / Natur', 'price': '149.00', 'compareAtPrice': None, 'sku': 'SKB-S', 'barcode': '570000',
+            'weight': 0.8, 'weightUnit': 'KILOGRAMS', 'inventoryQuantity': 12,
+            'selectedOptions': [{'name': 'Størrelse', 'value': 'S'}, {'name': 'Farve', 'value': 'Natur'}],
+        }}]},
+    }
+    node.update(overrides)
+    return node
+
+
+def test_graphql_node_becomes_rest_product():
+    product = graphql_product_to_rest(product_node())
+    assert product['id'] == 8123456789
+    assert product['admin_graphql_api_id'] == 'gid://shopify/Product/8123456789'
+    assert product['body_html'] == '<p>Bambus</p>'
+    assert product['product_type'] == 'Køkken'
+    assert product['tags'] == 'needs_update, køkken'
+    assert product['images'] == [{'src': 'https://cdn.example/1.jpg'}, {'src': 'https://cdn.example/2.jpg'}]
+    assert product['options'] == [{'name': 'Størrelse', 'values': ['S', 'L']}, {'name': 'Farve', 'values': ['Natur']}]
+    assert product['variants'] == [{
+        'title': 'S / Natur', 'price': '149.00', 'compare_at_price': None, 'sku': 'SKB-S', 'barcode': '570000',
+        'weight': 0.8, 'weight_unit': 'kg', 'inventory_quantity': 12,
+        'option1': 'S', 'option2': 'Natur', 'option3': None,
+    }]
+
+
+def test_missing_fields_get_rest_defaults():
+    node = {'id': 'gid://shopify/Product/1', 'images': {'edges': []}, 'variants': {'edges': [{'node': {'weightUnit': 'STONES'}}]}}
+    product = graphql_product_to_rest(node)
+    assert (product['title'], product['body_html'], product['tags'], product['options']) == ('', '', '', [])
+    variant = product['variants'][0]
+    assert variant['weight_unit'] == 'STONES'
+    assert variant['inventory_quantity'] == 0
+    assert (variant['option1'], variant['option2'], variant['option3']) == (None, None, None)
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from image_cache import ImageAnalysisCache, dhash_bands, hamming
+
+
+def flip(image_hash, positions):
+    bits = int(image_hash, 16)
+    for position in positions:
+        bits ^= 1 << position
+    return f'{bits:016x}'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ImageAnalysisCache(str(tmp_path / 'cache.db'), max_distance=4)
+
+
+def test_bands_cover_all_bits():
+    for max_distance in range(0, 10):
+        layout = dhash_bands(max_distance)
+        assert len(layout) == max(2, max_distance + 1)
+        covered = 0
+        for shift, mask in layout:
+            assert not covered & (mask << shift)
+            covered |= mask << shift
+        assert covered == (1 << 64) - 1
+
+
+def test_near_duplicates_within_the_distance_are_found(cache):
+    original = 'f0e1d2c3b4a59687'
+    cache.store('https://cdn.example/a.jpg', {'sha256': 'a', 'dhash': original}, 'a bamboo cutting board')
+    # One flipped bit in each of four bands: only the fifth band still matches exactly
+    copy = flip(original, [2, 15, 28, 41])
+    assert hamming(original, copy) == 4
+    assert cache.find_similar(copy) == 'a bamboo cutting board'
+    assert cache.find_similar(flip(original, [2, 15, 28, 41, 54])) is None
+
+
+def test_closest_match_wins(cache):
+    base = '0123456789abcdef'
+    cache.store('https://cdn.example/far.jpg', {'sha256': 'far', 'dhash': flip(base, [0, 1, 2])}, 'far')
+    cache.store('https://cdn.example/near.jpg', {'sha256': 'near', 'dhash': flip(base, [63])}, 'near')
+    assert cache.find_similar(base) == 'near'
+
+
+def test_random_hashes_match_a_full_scan(cache):
+    rng = random.Random(7)
+    stored = [f'{rng.getrandbits(64):016x}' for _ in range(300)]
+    for n, image_hash in enumerate(stored):
+        cache.store(f'https://cdn.example/{n}.jpg', {'sha256': str(n), 'dhash': image_hash}, n)
+    for _ in range(300):
+        source = rng.choice(stored)
+        probe = flip(source, rng.sample(range(64), rng.randint(0, 6)))
+        distances = sorted((hamming(probe, h), n) for n, h in enumerate(stored))
+        expected = distances[0][1] if distances[0][0] <= 4 else None
+        assert cache.find_similar(probe) == expected
+
+
+def test_evicted_hashes_leave_the_band_index(tmp_path):
+    cache = ImageAnalysisCache(str(tmp_path / 'cache.db'), max_entries=10, max_distance=4)
+    for n in range(6):
+        cache.store(f'https://cdn.example/{n}.jpg', {'sha256': str(n), 'dhash': f'{n:016x}'}, n)
+    indexed = {row[0] for row in cache._conn.execute('SELECT DISTINCT dhash FROM image_dhash_bands')}
+    stored = {row[0] for row in cache._conn.execute(
+        f"SELECT substr(key, 12, 16) FROM {cache.table} WHERE key LIKE '[\"dhash\", %'")}
+    assert indexed == stored
+    assert len(indexed) < 6
+
+
+def test_existing_hashes_are_indexed_on_open(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    old = ImageAnalysisCache(path, max_distance=4)
+    old.set('old analysis', 'dhash', 'aaaaaaaaaaaaaaaa')
+    old._conn.execute('DELETE FROM image_dhash_bands')
+    old._conn.commit()
+    assert ImageAnalysisCache(path, max_distance=4).find_similar(flip('aaaaaaaaaaaaaaaa', [0])) == 'old analysis'
+    # Another distance rebuilds the bands
+    assert ImageAnalysisCache(path, max_distance=2).find_similar(flip('aaaaaaaaaaaaaaaa', [0, 40])) == 'old analysis'
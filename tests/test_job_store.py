@@ -0,0 +1,132 @@
+import pytest
+
+from job_store import JobStore, TASK_MAX_ATTEMPTS
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / 'jobs.db'))
+
+
+def running_job(store, store_name, product_ids, secrets=None):
+    job_id = store.create_job({'limit': len(product_ids)}, store_name, secrets)
+    for pid in product_ids:
+        store.add_task(job_id, {'id': pid, 'title': f'Product {pid}'})
+    store.start_job(job_id)
+    return job_id
+
+
+def make_stale(store, product_id, age=3600):
+    store._conn.execute('UPDATE tasks SET updated_at = updated_at - ? WHERE product_id = ?', (age, product_id))
+
+
+def test_claim_task_takes_products_in_position_order(store):
+    job_id = running_job(store, 'a', [3, 1, 2])
+    claimed = [store.claim_task('w')['product_id'] for _ in range(3)]
+    assert claimed == ['3', '1', '2']
+    assert store.claim_task('w') is None
+    assert store.get_job(job_id)['status'] == 'running'
+
+
+def test_claim_task_alternates_between_stores(store):
+    job_a = running_job(store, 'a', [1, 2, 3])
+    job_b = running_job(store, 'b', [4, 5, 6])
+    claimed = [store.claim_task(f'w{n}')['job_id'] for n in range(4)]
+    assert claimed == [job_a, job_b, job_a, job_b]
+
+
+def test_claim_task_respects_store_concurrency(store):
+    job_a = running_job(store, 'a', [1, 2])
+    running_job(store, 'a', [3, 4])
+    assert store.claim_task('w1', store_concurrency=1)['job_id'] == job_a
+    assert store.claim_task('w2', store_concurrency=1) is None
+
+
+def test_claim_task_skips_queued_and_stopped_jobs(store):
+    queued = store.create_job({}, 'a')
+    store.add_task(queued, {'id': 1})
+    stopped = running_job(store, 'b', [2])
+    store.stop_job(stopped)
+    assert store.claim_task('w') is None
+
+
+def test_recover_requeues_only_stale_tasks(store):
+    running_job(store, 'a', [1, 2])
+    store.claim_task('dead')
+    store.claim_task('alive')
+    make_stale(store, '1')
+    assert store.recover(stale_after=60) == (1, 0)
+    statuses = dict(store._conn.execute('SELECT product_id, status FROM tasks').fetchall())
+    assert statuses == {'1': 'pending', '2': 'running'}
+
+
+def test_heartbeat_keeps_tasks_of_live_workers(store):
+    running_job(store, 'a', [1, 2])
+    store.claim_task('dead')
+    store.claim_task('alive')
+    make_stale(store, '1')
+    make_stale(store, '2')
+    store.heartbeat(['alive'])
+    assert store.recover(stale_after=60) == (1, 0)
+    assert store.claim_task('other')['product_id'] == '1'
+
+
+def test_recover_fails_tasks_after_max_attempts(store):
+    job_id = running_job(store, 'a', [1])
+    store.claim_task('w')
+    store._conn.execute('UPDATE tasks SET attempts = ?', (TASK_MAX_ATTEMPTS,))
+    make_stale(store, '1')
+    assert store.recover(stale_after=60) == (0, 1)
+    stats = store.job_stats(job_id)
+    assert (stats['processed'], stats['failed']) == (1, 1)
+
+
+def test_secrets_are_kept_out_of_params(store):
+    job_id = running_job(store, 'a', [1], secrets={'shopify_token': 'shpat_secret'})
+    assert store.job_secrets(job_id) == {'shopify_token': 'shpat_secret'}
+    assert 'shopify_token' not in store.get_job(job_id)['params']
+
+
+def test_secrets_are_deleted_when_the_job_completes(store):
+    job_id = running_job(store, 'a', [1], secrets={'shopify_token': 'shpat_secret'})
+    store.discovery_done(job_id)
+    task = store.claim_task('w')
+    assert not store.finish_job_if_done(job_id)
+    assert store.job_secrets(job_id)
+    store.finish_task(task, {'success': True})
+    assert store.finish_job_if_done(job_id)
+    assert store.job_secrets(job_id) == {}
+
+
+def test_secrets_are_deleted_when_the_job_is_stopped(store):
+    job_id = running_job(store, 'a', [1, 2], secrets={'shopify_token': 'shpat_secret'})
+    assert store.stop_job(job_id)
+    assert store.job_secrets(job_id) == {}
+    assert store.claim_task('w') is None
+
+
+def test_tokens_in_old_params_move_to_secrets(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    old = JobStore(path)
+    active = old.create_job({'shopify_token': 'shpat_active'}, 'a')
+    done = old.create_job({'shopify_token': 'shpat_done'}, 'b')
+    old._conn.execute("UPDATE jobs SET status = 'completed' WHERE id = ?", (done,))
+    store = JobStore(path)
+    assert store.job_secrets(active) == {'shopify_token': 'shpat_active'}
+    assert store.job_secrets(done) == {}
+    assert 'shopify_token' not in store.get_job(active)['params']
+    assert 'shopify_token' not in store.get_job(done)['params']
+
+
+def test_events_are_trimmed_to_the_newest(store):
+    for n in range(1, 251):
+        store.add_event('log', {'n': n}, keep=50)
+    # Trimming runs every 100th event, so up to keep + 99 events are retained
+    assert store.event_range() == (151, 250)
+    assert [e['data']['n'] for e in store.events_since(245)] == [246, 247, 248, 249, 250]
+
+
+def test_events_are_kept_without_a_limit(store):
+    for n in range(200):
+        store.add_event('log', {'n': n})
+    assert store.event_range() == (1, 200)
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+from json_stream import IncrementalJSONParser
+from mainZ import ContentStream
+
+
+def feed_all(parser, chunks):
+    completed = []
+    for chunk in chunks:
+        completed += parser.feed(chunk)
+    return completed
+
+
+def test_members_complete_as_they_arrive():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"title": "Skærebræt", "seo_') == [('title', 'Skærebræt')]
+    assert parser.feed('title": "Bambus"') == []
+    assert parser.feed('}') == [('seo_title', 'Bambus')]
+    assert parser.complete
+    assert parser.fields == {'title': 'Skærebræt', 'seo_title': 'Bambus'}
+
+
+def test_preamble_and_code_fence_are_skipped():
+    parser = IncrementalJSONParser()
+    completed = feed_all(parser, ['Here is the content:\n```json\n', '{"title": "Kniv"}', '\n```'])
+    assert completed == [('title', 'Kniv')]
+    assert parser.complete
+
+
+def test_long_preamble_is_rejected():
+    parser = IncrementalJSONParser(max_preamble=20)
+    with pytest.raises(ValueError):
+        parser.feed('I am sorry, but I cannot write product descriptions today.')
+
+
+def test_strings_split_across_chunks_keep_commas_braces_and_escapes():
+    parser = IncrementalJSONParser()
+    chunks = ['{"body_html": "<p>Stærk, let', ' {og} [flot]', ' \\"skål\\"', '</p>", "han', 'dle": "skal"}']
+    completed = feed_all(parser, chunks)
+    assert completed == [('body_html', '<p>Stærk, let {og} [flot] "skål"</p>'), ('handle', 'skal')]
+
+
+def test_nested_values_are_one_member():
+    parser = IncrementalJSONParser()
+    completed = feed_all(parser, ['{"tags": ["a", ', '"b"], "meta": {"x": 1}}'])
+    assert completed == [('tags', ['a', 'b']), ('meta', {'x': 1})]
+
+
+def test_invalid_member_raises():
+    parser = IncrementalJSONParser()
+    with pytest.raises(ValueError):
+        parser.feed('{"title": Kniv, ')
+
+
+def chunk(text):
+    return SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def test_content_stream_aborts_on_off_schema_field():
+    stream = ContentStream()
+    stream.add(chunk('{"title": "Kniv", '))
+    with pytest.raises(ValueError):
+        stream.add(chunk('"seo_title": {"text": "Kniv"}, '))
+    # Aborted before the rest of the answer arrived
+    assert not stream.parser.complete
+    assert stream.finish({}, error='off-schema') == {}
+
+
+def test_content_stream_accepts_schema_fields():
+    stream = ContentStream()
+    for text in ['{"title": "Kniv", ', '"seo_description": "Skarp kniv"', '}']:
+        stream.add(chunk(text))
+    assert stream.parser.complete
+    assert stream.parser.fields == {'title': 'Kniv', 'seo_description': 'Skarp kniv'}
@@ -0,0 +1,129 @@
+import json
+
+import pytest
+
+from shopify_bulk import BulkUpdateCollector, payload_to_product_input
+
+
+def test_rest_payload_becomes_product_input():
+    payload = {'product': {
+        'id': 42,
+        'title': 'Skærebræt i bambus',
+        'body_html': '<p>Stærkt og let</p>',
+        'product_type': 'Køkken',
+        'vendor': 'Nordic',
+        'handle': 'skaerebraet-bambus',
+        'tags': 'køkken, bambus, ,gave',
+        'metafields_global_title_tag': 'Skærebræt | Nordic',
+        'metafields_global_description_tag': 'Køb et skærebræt',
+    }}
+    assert payload_to_product_input(payload) == {
+        'id': 'gid://shopify/Product/42',
+        'title': 'Skærebræt i bambus',
+        'descriptionHtml': '<p>Stærkt og let</p>',
+        'productType': 'Køkken',
+        'vendor': 'Nordic',
+        'handle': 'skaerebraet-bambus',
+        'tags': ['køkken', 'bambus', 'gave'],
+        'seo': {'title': 'Skærebræt | Nordic', 'description': 'Køb et skærebræt'},
+    }
+
+
+def test_only_fields_in_the_payload_are_sent():
+    product_input = payload_to_product_input({'product': {'id': 7, 'metafields_global_title_tag': 'SEO'}})
+    assert product_input == {'id': 'gid://shopify/Product/7', 'seo': {'title': 'SEO'}}
+
+
+class FakeShopify:
+    """Admin GraphQL stand-in for one bulk mutation that finishes on the first poll"""
+    def __init__(self):
+        self.calls = []
+
+    def graphql(self, query, variables=None):
+        self.calls.append(query)
+        if 'stagedUploadsCreate' in query:
+            return {'stagedUploadsCreate': {'userErrors': [], 'stagedTargets': [{
+                'url': 'https://upload.example/bucket', 'resourceUrl': None,
+                'parameters': [{'name': 'key', 'value': 'tmp/bulk.jsonl'}]}]}}
+        if 'bulkOperationRunMutation' in query:
+            return {'bulkOperationRunMutation': {'userErrors': [], 'bulkOperation': {'id': 'gid://op/1', 'status': 'CREATED'}}}
+        return {'node': {'id': 'gid://op/1', 'status': 'COMPLETED', 'objectCount': 3, 'url': 'https://results.example/1'}}
+
+
+class FakeResponse:
+    def __init__(self, text=''):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeRequests:
+    """Staged upload and result download: records the upload, serves result lines"""
+    def __init__(self, result_lines):
+        self.result_lines = result_lines
+        self.uploaded = None
+
+    def post(self, url, data=None, files=None, timeout=None):
+        self.uploaded = files['file'][1].read().decode('utf-8')
+        return FakeResponse()
+
+    def get(self, url, timeout=None):
+        return FakeResponse('\n'.join(json.dumps(line) for line in self.result_lines))
+
+
+def use_fake_requests(monkeypatch, fake):
+    import requests
+    monkeypatch.setattr(requests, 'post', fake.post)
+    monkeypatch.setattr(requests, 'get', fake.get)
+    return fake
+
+
+def update_line(number, product=True, errors=()):
+    return {'__lineNumber': number, 'data': {'productUpdate': {
+        'product': {'id': f'gid://shopify/Product/{number}'} if product else None,
+        'userErrors': [{'field': ['title'], 'message': message} for message in errors]}}}
+
+
+@pytest.fixture
+def collector(tmp_path):
+    return BulkUpdateCollector(FakeShopify(), work_dir=str(tmp_path), poll_interval=0)
+
+
+def test_results_are_mapped_back_by_line_number(monkeypatch, collector):
+    # Results come back out of order, one with user errors and one missing
+    fake = FakeRequests([update_line(2, product=False, errors=['Title is too long']), update_line(0)])
+    use_fake_requests(monkeypatch, fake)
+    for pid in (101, 102, 103):
+        collector.add(pid, {'product': {'id': pid, 'title': f'Title {pid}'}})
+    results = collector.submit()
+
+    assert [json.loads(line)['input']['id'] for line in fake.uploaded.splitlines()] == [
+        'gid://shopify/Product/101', 'gid://shopify/Product/102', 'gid://shopify/Product/103']
+    assert results[101] == {'success': True, 'errors': []}
+    assert results[102] == {'success': False, 'errors': ['No result (bulk operation COMPLETED)']}
+    assert results[103] == {'success': False, 'errors': ['Title is too long']}
+
+
+def test_full_files_are_submitted_before_adding_more(monkeypatch, tmp_path):
+    shopify = FakeShopify()
+    fake = FakeRequests([update_line(0)])
+    use_fake_requests(monkeypatch, fake)
+    collector = BulkUpdateCollector(shopify, work_dir=str(tmp_path), max_bytes=150, poll_interval=0)
+    collector.add(1, {'product': {'id': 1, 'title': 'x' * 60}})
+    collector.add(2, {'product': {'id': 2, 'title': 'y' * 60}})
+    # The second line did not fit: the first file went out on its own
+    assert sum('bulkOperationRunMutation' in q for q in shopify.calls) == 1
+    assert len(fake.uploaded.splitlines()) == 1
+    results = collector.submit()
+    assert sum('bulkOperationRunMutation' in q for q in shopify.calls) == 2
+    assert results[1]['success'] and results[2]['success']
+
+
+def test_failed_bulk_mutation_fails_every_product(monkeypatch, collector):
+    def broken(query, variables=None):
+        raise RuntimeError('Throttled')
+    collector.shopify.graphql = broken
+    use_fake_requests(monkeypatch, FakeRequests([]))
+    collector.add(1, {'product': {'id': 1, 'title': 'a'}})
+    assert collector.submit() == {1: {'success': False, 'errors': ['Throttled']}}
@@ -0,0 +1,120 @@
+import pandas as pd
+import pytest
+
+import trends_batch
+from cache_store import TrendsCache
+from trends_batch import anchor_batches, fetch_interest, planned, rescale
+
+ANCHOR = 'skærebræt'
+
+
+class FakeTrends:
+    """pytrends stand-in: interest per term, a term list that makes a payload fail"""
+    def __init__(self, interest, fail_with=None):
+        self.interest = interest
+        self.fail_with = fail_with
+        self.payloads = []
+
+    def build_payload(self, terms, cat=0, timeframe='', geo=''):
+        self.payloads.append(list(terms))
+        self.terms = list(terms)
+
+    def interest_over_time(self):
+        if self.fail_with and self.fail_with in self.terms:
+            raise RuntimeError('429 Too Many Requests')
+        return pd.DataFrame({term: self.interest.get(term, [0, 0, 0, 0]) for term in self.terms})
+
+
+@pytest.fixture(autouse=True)
+def no_pacing(monkeypatch):
+    monkeypatch.setattr(trends_batch.trends_pacer, 'min_delay', 0)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TrendsCache(str(tmp_path / 'cache.db'))
+
+
+def test_anchor_batches_add_the_anchor_to_every_payload():
+    batches = anchor_batches([f'k{n}' for n in range(9)], ANCHOR)
+    assert batches == [['k0', 'k1', 'k2', 'k3', ANCHOR], ['k4', 'k5', 'k6', 'k7', ANCHOR], ['k8', ANCHOR]]
+
+
+def test_anchor_batches_do_not_repeat_the_anchor():
+    assert anchor_batches(['kniv', 'Skærebræt '], ANCHOR) == [['kniv', ANCHOR]]
+    assert anchor_batches([ANCHOR], ANCHOR) == [[ANCHOR]]
+    assert anchor_batches([], ANCHOR) == []
+
+
+def test_rescale_puts_the_anchor_at_the_reference_without_a_cap():
+    assert rescale([10, 80, 100], [20, 30], reference=50) == [20.0, 160.0, 200.0]
+
+
+def test_rescale_keeps_values_when_the_anchor_has_no_data():
+    assert rescale([10, 80], [0, 0]) == [10.0, 80.0]
+    assert rescale([10, 80], []) == [10.0, 80.0]
+
+
+def test_fetch_interest_rescales_and_caches(cache):
+    trends = FakeTrends({'kniv': [100, 100, 100, 100], 'gaffel': [5, 5, 5, 5], ANCHOR: [25, 25, 25, 25]})
+    result = fetch_interest(trends, ['kniv', 'gaffel'], 'DK', 'today 12-m', cache, anchor=ANCHOR)
+    assert result == {'kniv': [200.0] * 4, 'gaffel': [10.0] * 4}
+    assert cache.get_series('kniv', 'DK', 'today 12-m', ANCHOR) == [200.0] * 4
+
+    again = fetch_interest(trends, ['kniv', 'gaffel'], 'DK', 'today 12-m', cache, anchor=ANCHOR)
+    assert again == result
+    assert len(trends.payloads) == 1
+
+
+def test_fetch_interest_does_not_cache_without_anchor_data(cache):
+    trends = FakeTrends({'kniv': [40, 60, 40, 60]})
+    result = fetch_interest(trends, ['kniv'], 'DK', 'today 12-m', cache, anchor=ANCHOR)
+    assert result == {'kniv': [40.0, 60.0, 40.0, 60.0]}
+    assert cache.get_series('kniv', 'DK', 'today 12-m', ANCHOR) is None
+
+
+def test_fetch_interest_leaves_out_keywords_of_a_failed_payload(cache):
+    keywords = ['k0', 'k1', 'k2', 'k3', 'k4']
+    trends = FakeTrends({ANCHOR: [50] * 4, 'k4': [10] * 4}, fail_with='k0')
+    result = fetch_interest(trends, keywords, 'DK', 'today 12-m', cache, anchor=ANCHOR)
+    assert result == {'k4': [10.0] * 4}
+    assert cache.get_series('k0', 'DK', 'today 12-m', ANCHOR) is None
+    assert len(trends.payloads) == 2
+
+
+def test_fetch_interest_returns_empty_series_for_keywords_without_data(cache):
+    trends = FakeTrends({ANCHOR: [50] * 4})
+    assert fetch_interest(trends, ['sjælden'], 'DK', 'today 12-m', cache, anchor=ANCHOR) == {'sjælden': [0.0] * 4}
+
+
+def record_plans(calls):
+    def plan(chunk):
+        calls.append([p['id'] for p in chunk])
+        return {p['id']: f"plan {p['id']}" for p in chunk}
+    return plan
+
+
+def test_planned_windows_grow_to_the_window_size():
+    calls = []
+    pairs = list(planned(({'id': n} for n in range(20)), record_plans(calls), window=6))
+    assert [len(chunk) for chunk in calls] == [1, 2, 4, 6, 6, 1]
+    assert pairs == [({'id': n}, f'plan {n}') for n in range(20)]
+
+
+def test_planned_yields_the_first_product_before_loading_more():
+    loaded = []
+
+    def products():
+        for n in range(100):
+            loaded.append(n)
+            yield {'id': n}
+
+    pairs = planned(products(), record_plans([]), window=50)
+    assert next(pairs) == ({'id': 0}, 'plan 0')
+    assert loaded == [0]
+
+
+def test_planned_first_window_is_capped_by_the_window():
+    calls = []
+    list(planned(({'id': n} for n in range(5)), record_plans(calls), window=2, first_window=4))
+    assert [len(chunk) for chunk in calls] == [2, 2, 1]
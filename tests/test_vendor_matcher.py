@@ -0,0 +1,50 @@
+from vendor_matcher import VendorMatcher, get_vendor_matcher
+
+VENDORS = {
+    'køkken': ['Nordic', 'Nordic Seasons', 'Chef+'],
+    'hjem': ['Nordic Seasons', 'Hygge Home'],
+}
+
+
+def test_longest_brand_wins():
+    matcher = VendorMatcher(VENDORS)
+    text, replaced = matcher.replace('Nordic Seasons skål fra Nordic', 'Acme')
+    assert text == 'Acme skål fra Acme'
+    assert replaced == ['Nordic Seasons', 'Nordic']
+    assert matcher.find('Nordic Seasons og Chef+') == ['Nordic Seasons', 'Chef+']
+
+
+def test_replacing_with_the_same_brand_reports_nothing():
+    matcher = VendorMatcher(VENDORS)
+    assert matcher.replace('Hygge Home lampe', 'Hygge Home') == ('Hygge Home lampe', [])
+
+
+def test_contains_ignores_case_but_find_does_not():
+    matcher = VendorMatcher(VENDORS)
+    assert matcher.contains('nordic seasons skål')
+    assert matcher.contains('HYGGE HOME')
+    assert not matcher.contains('ikea lampe')
+    assert matcher.find('nordic seasons skål') == []
+
+
+def test_categories_of_a_brand():
+    matcher = VendorMatcher(VENDORS)
+    assert matcher.categories('Nordic Seasons') == ['køkken', 'hjem']
+    assert matcher.categories('Unknown') == []
+
+
+def test_empty_config_matches_nothing():
+    matcher = VendorMatcher({})
+    assert matcher.replace('Nordic', 'Acme') == ('Nordic', [])
+    assert not matcher.contains('Nordic')
+    assert matcher.find('Nordic') == []
+
+
+def test_shared_matcher_is_rebuilt_when_the_config_changes():
+    vendors = {'køkken': ['Nordic']}
+    first = get_vendor_matcher(vendors)
+    assert get_vendor_matcher({'køkken': ['Nordic']}) is first
+    vendors['køkken'].append('Chef+')
+    second = get_vendor_matcher(vendors)
+    assert second is not first
+    assert second.contains('chef+ kniv')
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Anchored Google Trends batching
+Trends compares up to five terms per payload, scaling each payload to its own maximum.
+Every payload here carries four keywords plus one shared anchor keyword, and all series
+are rescaled so the anchor's average interest equals ANCHOR_REFERENCE. Values from
+different payloads (and different runs) are then on one scale and comparable. The scale is
+open-ended: a keyword four times as popular as the anchor averages 200.
+
+Every Trends request of a process, from the CLI, the backend's keyword analysis and its
+content generation alike, waits its turn at trends_pacer: requests are sent one at a time,
+in arrival order and at least TRENDS_MIN_DELAY seconds apart.
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+
+import metrics
+from cache_store import normalize_keyword
+
+TRENDS_BATCH_SIZE = 5
+# A mid-volume product term: a head term like 'køkken' squashes product keywords to 0 in
+# its payloads, while a rare one has no data of its own in many weeks
+TRENDS_ANCHOR_KEYWORD = os.getenv('TRENDS_ANCHOR_KEYWORD', 'skærebræt')
+# A keyword as popular as the anchor averages this much interest after rescaling
+ANCHOR_REFERENCE = 50.0
+# Products whose keywords are planned (and fetched) together
+KEYWORD_PLAN_WINDOW = int(os.getenv('KEYWORD_PLAN_WINDOW', '50'))
+# Seconds between two Trends requests of one process
+TRENDS_MIN_DELAY = float(os.getenv('TRENDS_MIN_DELAY', '3'))
+
+
+class FairLock:
+    """A lock granted in request order, so jobs waiting on a shared resource take turns"""
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+
+    def __enter__(self):
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while ticket != self._serving:
+                self._cond.wait()
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._serving += 1
+            self._cond.notify_all()
+
+
+class TrendsPacer:
+    """One Trends request at a time per process, in arrival order and min_delay seconds apart.
+
+    Wrap each request (or build_payload plus the read that uses it) in `with trends_pacer:`.
+    """
+    def __init__(self, min_delay=TRENDS_MIN_DELAY):
+        self.min_delay = min_delay
+        self._lock = FairLock()
+        self._last = None
+
+    def __enter__(self):
+        self._lock.__enter__()
+        if self._last is not None:
+            wait = self._last + self.min_delay - time.monotonic()
+            if wait > 0:
+                with metrics.timer('sleep'):
+                    time.sleep(wait)
+        return self
+
+    def __exit__(self, *exc):
+        self._last = time.monotonic()
+        self._lock.__exit__(*exc)
+
+
+trends_pacer = TrendsPacer()
+
+
+def anchor_batches(keywords, anchor, size=TRENDS_BATCH_SIZE):
+    """Split keywords into payload term lists of at most size-1 keywords plus the anchor"""
+    anchor_key = normalize_keyword(anchor)
+    others = [k for k in keywords if normalize_keyword(k) != anchor_key]
+    step = size - 1
+    batches = [others[i:i + step] + [anchor] for i in range(0, len(others), step)]
+    if not batches and len(others) < len(keywords):
+        batches = [[anchor]]  # only the anchor itself was asked for
+    return batches
+
+
+def rescale(values, anchor_values, reference=ANCHOR_REFERENCE):
+    """Move a payload's values onto the anchor scale (uncapped, so popular keywords keep their order)"""
+    anchor_mean = sum(anchor_values) / len(anchor_values) if anchor_values else 0
+    if not anchor_mean:
+        return [float(v) for v in values]
+    factor = reference / anchor_mean
+    return [round(v * factor, 2) for v in values]
+
+
+def fetch_interest(pytrends, keywords, geo, timeframe, cache, anchor=TRENDS_ANCHOR_KEYWORD, use_cache=True):
+    """Anchor-scaled interest series for keywords: {keyword: values}.
+
+    Cached series are served first; the rest are fetched five terms per payload, each
+    payload one turn at trends_pacer. [] means Trends had no data; keywords of a failed
+    payload are left out. A payload whose anchor has no data is returned on its own scale
+    but not cached.
+    """
+    results = {}
+    missing = []
+    for keyword in dict.fromkeys(keywords):
+        values = cache.get_series(keyword, geo, timeframe, anchor) if use_cache else None
+        if values is None:
+            missing.append(keyword)
+        else:
+            results[keyword] = values
+    if not missing:
+        return results
+
+    anchor_key = normalize_keyword(anchor)
+    for terms in anchor_batches(missing, anchor):
+        try:
+            with trends_pacer:
+                metrics.count_call('trends')
+                pytrends.build_payload(terms, cat=0, timeframe=timeframe, geo=geo)
+                metrics.count_call('trends')
+                interest = pytrends.interest_over_time()
+        except Exception as e:
+            logging.warning(f"⚠️ Trends payload failed for {terms}: {str(e)[:100]}")
+            continue
+
+        def series(term):
+            if interest.empty or term not in interest.columns:
+                return []
+            return interest[term].dropna().tolist()
+
+        anchor_values = series(anchor)
+        anchored = any(anchor_values)
+        if not anchored:
+            logging.warning(f"⚠️ Anchor keyword '{anchor}' has no Trends data in {geo}; values stay on the payload's own scale")
+        for keyword in missing:
+            if keyword in terms or (normalize_keyword(keyword) == anchor_key and anchor in terms):
+                values = rescale(series(keyword if keyword in terms else anchor), anchor_values)
+                if anchored:
+                    cache.set_series(keyword, geo, timeframe, values, anchor)
+                results[keyword] = values
+    return results
+
+
+def planned(products, plan, window=KEYWORD_PLAN_WINDOW, first_window=1):
+    """Yield (product, plan) pairs, calling plan(products) once per window of products.
+
+    plan returns {product_id: plan}; products stream through, so only one window is held.
+    Windows start at first_window products and double up to window, so the first product
+    is yielded without waiting for a full window to load and be planned.
+    """
+    products = iter(products)
+    size = max(1, min(first_window, window))
+    while True:
+        chunk = list(itertools.islice(products, size))
+        if not chunk:
+            return
+        plans = plan(chunk) or {}
+        for product in chunk:
+            yield product, plans.get(product.get('id'))
+        size = min(size * 2, window)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Single-pass brand matching over the VENDORS config
+All brand names are compiled into one alternation regex (longest first), so a
+description is rewritten and a keyword checked in one scan, however many brands
+there are. The matcher is rebuilt only when the vendor config changes.
+"""
+
+import re
+import threading
+
+
+def vendor_config_key(vendors):
+    """Hashable snapshot of a {category: [brands]} config"""
+    return tuple((category, tuple(brands)) for category, brands in vendors.items())
+
+
+def _alternation(brands):
+    # Longest first, so 'Nordic Seasons' wins over a shorter brand it contains
+    brands = sorted(set(brands), key=len, reverse=True)
+    return re.compile('|'.join(map(re.escape, brands))) if brands else None
+
+
+class VendorMatcher:
+    """Brand replacement, case-insensitive detection and a brand -> categories index"""
+    def __init__(self, vendors):
+        self.key = vendor_config_key(vendors)
+        self.brand_categories = {}
+        for category, brands in vendors.items():
+            for brand in brands:
+                if brand:
+                    self.brand_categories.setdefault(brand, []).append(category)
+        self._pattern = _alternation(self.brand_categories)
+        self._lower_pattern = _alternation(b.lower() for b in self.brand_categories)
+
+    def replace(self, text, brand):
+        """Replace every brand mention in text with brand; returns (text, brands replaced)"""
+        if self._pattern is None:
+            return text, []
+        replaced = []
+
+        def swap(match):
+            if match.group(0) != brand:
+                replaced.append(match.group(0))
+            return brand
+        return self._pattern.sub(swap, text), replaced
+
+    def contains(self, text):
+        """True if any brand appears in text, ignoring case"""
+        return bool(self._lower_pattern and self._lower_pattern.search(text.lower()))
+
+    def find(self, text):
+        """Brands mentioned in text (exact case), in order of appearance"""
+        return self._pattern.findall(text) if self._pattern else []
+
+    def categories(self, brand):
+        """Vendor categories a brand belongs to"""
+        return self.brand_categories.get(brand, [])
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_vendor_matcher(vendors):
+    """Shared VendorMatcher for vendors, rebuilt when the config has changed"""
+    global _matcher
+    key = vendor_config_key(vendors)
+    with _matcher_lock:
+        if _matcher is None or _matcher.key != key:
+            _matcher = VendorMatcher(vendors)
+        return _matcher
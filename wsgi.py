@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+Production entry point for the web backend
+Several web server processes serve the UI and API; jobs, logs and dashboard events are
+read from the shared job store, so any process can answer any request. Optimization
+jobs run in a separate job worker process:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    python job_worker.py
+"""
+
+from flask_backend import app